@@ -24,6 +24,7 @@ from app.core.db import (
     UserModel,
     WebChatLog,
     _create_async_engine_from_database_url,
+    get_db_manager,
     init_db,
 )
 
@@ -45,6 +46,7 @@ __all__ = [
     "UserModel",
     "WebChatLog",
     "_create_async_engine_from_database_url",
+    "get_db_manager",
     "init_db",
     "generate_bot_profile",
     "generate_sidewrite_and_backlog",
@@ -19,6 +19,7 @@ from app.core.db.database import (
     init_db,
 )
 from app.core.db.local_store import LocalStoreManager
+from app.core.db.singleton import get_db_manager
 
 __all__ = [
     "Base",
@@ -38,5 +39,6 @@ __all__ = [
     "UserModel",
     "WebChatLog",
     "_create_async_engine_from_database_url",
+    "get_db_manager",
     "init_db",
 ]
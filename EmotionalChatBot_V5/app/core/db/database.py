@@ -41,6 +41,21 @@ from app.core.bot.profile_factory import generate_bot_profile, generate_user_pro
 from app.core.bot.relationship_templates import get_random_relationship_template
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _env_int_or_none(name: str) -> Optional[int]:
+    """环境变量未设置或非整数时返回 None（由调用方沿用库默认值）。"""
+    try:
+        return int(os.getenv(name, "") or "")
+    except ValueError:
+        return None
+
+
 def _create_async_engine_from_database_url(database_url: str) -> AsyncEngine:
     """
     Render 等平台常提供形如 `postgres://...` 或 `postgresql://...` 的 URL，
@@ -73,6 +88,21 @@ def _create_async_engine_from_database_url(database_url: str) -> AsyncEngine:
         # asyncpg: ssl=True 会创建默认 SSLContext（best-effort）
         connect_args["ssl"] = True
 
+    engine_kwargs: dict[str, Any] = {}
+    if u.drivername == "postgresql+asyncpg":
+        # 每轮 loader / memory_manager / memory_writer 共 5+ 条同形 SQL：开大 SQLAlchemy 侧的
+        # prepared statement 缓存，省去服务端重复 parse/plan；走 pgbouncer transaction 模式时设为 0 关闭
+        cache_size = _env_int("DB_STATEMENT_CACHE_SIZE", 1024)
+        query.setdefault("prepared_statement_cache_size", str(cache_size))
+        if cache_size == 0:
+            connect_args["statement_cache_size"] = 0
+        engine_kwargs["pool_recycle"] = _env_int("DB_POOL_RECYCLE_SECONDS", 1800)
+        # 连接池上限只在显式配置时覆盖 SQLAlchemy 默认（5 + 10）：多 worker / 小规格库上不放大 Postgres 连接数
+        for env_name, kwarg in (("DB_POOL_SIZE", "pool_size"), ("DB_POOL_MAX_OVERFLOW", "max_overflow")):
+            value = _env_int_or_none(env_name)
+            if value is not None:
+                engine_kwargs[kwarg] = value
+
     u = u.set(query=query)
     # IMPORTANT: `str(URL)` hides password by default ("***"), which will break auth.
     # Use the full rendered URL string for actual connections.
@@ -81,7 +111,8 @@ def _create_async_engine_from_database_url(database_url: str) -> AsyncEngine:
     except Exception:
         # Fallback: best-effort; should still work for simple URLs
         url_str = str(u)
-    return create_async_engine(url_str, echo=False, future=True, connect_args=connect_args)
+    return create_async_engine(url_str, echo=False, future=True, connect_args=connect_args, **engine_kwargs)
+
 
 # -----------------------------
 # ORM Base
@@ -431,6 +462,40 @@ class DBManager:
                 score += min(3, c)
         return float(score)
 
+    @staticmethod
+    def _new_transcript(uid: uuid.UUID, fields: Dict[str, Any]) -> Transcript:
+        return Transcript(
+            user_id=uid,
+            session_id=fields.get("session_id"),
+            thread_id=fields.get("thread_id"),
+            turn_index=fields.get("turn_index"),
+            user_text=str(fields.get("user_text") or ""),
+            bot_text=str(fields.get("bot_text") or ""),
+            entities=fields.get("entities") or {},
+            topic=fields.get("topic"),
+            importance=fields.get("importance"),
+            short_context=fields.get("short_context"),
+        )
+
+    @staticmethod
+    def _new_notes(rid: uuid.UUID, tid: uuid.UUID, notes: List[Dict[str, Any]]) -> List[DerivedNote]:
+        out: List[DerivedNote] = []
+        for row in notes or []:
+            content = str(row.get("content") or "").strip()
+            if not content:
+                continue
+            out.append(
+                DerivedNote(
+                    user_id=rid,
+                    transcript_id=tid,
+                    note_type=(row.get("note_type") or row.get("type")),
+                    content=content,
+                    importance=row.get("importance"),
+                    source_pointer=str(row.get("source_pointer") or f"transcript:{tid}"),
+                )
+            )
+        return out
+
     async def append_transcript(
         self,
         *,
@@ -452,17 +517,19 @@ class DBManager:
                 uid = _to_uuid_or_none(relationship_id)
                 if not uid:
                     raise ValueError("relationship_id (user_id) must be a valid UUID")
-                tr = Transcript(
-                    user_id=uid,
-                    session_id=session_id,
-                    thread_id=thread_id,
-                    turn_index=turn_index,
-                    user_text=str(user_text or ""),
-                    bot_text=str(bot_text or ""),
-                    entities=entities or {},
-                    topic=topic,
-                    importance=importance,
-                    short_context=short_context,
+                tr = self._new_transcript(
+                    uid,
+                    {
+                        "session_id": session_id,
+                        "thread_id": thread_id,
+                        "turn_index": turn_index,
+                        "user_text": user_text,
+                        "bot_text": bot_text,
+                        "entities": entities,
+                        "topic": topic,
+                        "importance": importance,
+                        "short_context": short_context,
+                    },
                 )
                 session.add(tr)
                 await session.flush()
@@ -483,22 +550,35 @@ class DBManager:
             return 0
         async with self.Session() as session:
             async with session.begin():
-                n = 0
-                for row in notes or []:
-                    content = str(row.get("content") or "").strip()
-                    if not content:
-                        continue
-                    note = DerivedNote(
-                        user_id=rid,
-                        transcript_id=tid,
-                        note_type=(row.get("note_type") or row.get("type")),
-                        content=content,
-                        importance=row.get("importance"),
-                        source_pointer=str(row.get("source_pointer") or f"transcript:{transcript_id}"),
-                    )
-                    session.add(note)
-                    n += 1
-                return n
+                rows = self._new_notes(rid, tid, notes)
+                session.add_all(rows)
+                return len(rows)
+
+    async def append_transcript_with_notes(
+        self,
+        *,
+        relationship_id: str,
+        notes: List[Dict[str, Any]],
+        **transcript_fields: Any,
+    ) -> Tuple[str, int]:
+        """
+        Store A + Store B 同一事务写入：一次连接、一次提交，transcript 与其 notes 要么都在要么都不在。
+        transcript_fields 与 append_transcript 的关键字参数一致；notes 未带 source_pointer 时默认指向本条 transcript。
+        返回 (transcript_id, notes 写入条数)。
+        """
+        await self.ensure_memory_schema()
+        uid = _to_uuid_or_none(relationship_id)
+        if not uid:
+            raise ValueError("relationship_id (user_id) must be a valid UUID")
+        async with self.Session() as session:
+            async with session.begin():
+                tr = self._new_transcript(uid, transcript_fields)
+                session.add(tr)
+                # 先 flush 拿到 transcript 主键并满足 derived_notes 外键；同一事务内不额外提交
+                await session.flush()
+                rows = self._new_notes(uid, tr.id, notes)
+                session.add_all(rows)
+                return str(tr.id), len(rows)
 
     async def search_transcripts(
         self,
@@ -0,0 +1,37 @@
+"""进程级 DBManager 单例：loader / memory_manager / memory_writer 共用同一个引擎与连接池。"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from app.core.db.database import DBManager
+
+
+_DB_MANAGER: Optional["DBManager"] = None
+_LOCK = threading.Lock()
+
+
+def get_db_manager() -> Optional["DBManager"]:
+    """
+    懒加载 DBManager（双重检查加锁）。
+    - 已初始化：直接返回，不再读环境变量
+    - 未配置 DATABASE_URL 时返回 None（走 LocalStore 分支）
+    - 并发首调（多线程 / 多个事件循环）只会创建一个引擎，避免重复建连接池
+    """
+    global _DB_MANAGER
+    db = _DB_MANAGER
+    if db is not None:
+        return db
+    if not os.getenv("DATABASE_URL"):
+        return None
+    with _LOCK:
+        if _DB_MANAGER is None:
+            try:
+                from app.core.db.database import DBManager
+
+                _DB_MANAGER = DBManager.from_env()
+            except Exception:
+                return None
+        return _DB_MANAGER
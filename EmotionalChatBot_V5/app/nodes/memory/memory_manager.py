@@ -13,12 +13,12 @@ stage_manager 结束后，已经有 user_input + final_response/draft_response
 from __future__ import annotations
 
 import logging
-import os
 import uuid
 from typing import Any, Callable, Dict, List, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from app.core.db.singleton import get_db_manager
 from app.state import AgentState
 from src.schemas import MemoryManagerOutput
 from utils.llm_json import parse_json_from_llm
@@ -46,24 +46,6 @@ def _digit_to_chinese_numeral(s: str) -> str:
     a, b = divmod(n, 10)
     return _CN_TENS_LIST[a] + (_CN_ONES[b] if b else "")
 
-_DB_MANAGER = None
-
-
-def _get_db_manager():
-    global _DB_MANAGER
-    if _DB_MANAGER is not None:
-        return _DB_MANAGER
-    if not os.getenv("DATABASE_URL"):
-        return None
-    try:
-        from app.core import DBManager
-
-        _DB_MANAGER = DBManager.from_env()
-        return _DB_MANAGER
-    except Exception:
-        return None
-
-
 def _safe_float(x: Any) -> Optional[float]:
     try:
         if x is None:
@@ -91,48 +73,8 @@ def _as_str(x: Any) -> str:
     return str(x) if x is not None else ""
 
 
-def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
-    """
-    记忆管理节点（每轮更新）：
-    - 用一次 LLM 调用同时做：
-      1) 更新 conversation_summary（running summary）
-      2) 抽取 derived notes（稳定事实/偏好/决策/正在做什么）
-      3) 生成 transcript 元数据（entities/topic/importance/short_context）
-      4) 严格抽取基础信息 basic_info（name/age/gender/occupation/location）：必须来自“最新 user_input”
-         - LLM 输出值 + confidence + evidence（evidence 必须逐字出现在 user_input 中）
-         - Python 侧只做最小门控：evidence 子串校验 + 置信度阈值 + 不覆盖已有字段
-      5) 可选抽取 new_inferred_entries（少而精），用于 user_inferred_profile 增量沉淀
-    - 落盘：优先 DB（transcripts/derived_notes），无 DB 时用 LocalStore jsonl。
-    """
-
-    async def node(state: AgentState) -> Dict[str, Any]:
-        user_id = str(state.get("user_id") or "default_user")
-        bot_id = str(state.get("bot_id") or "default_bot")
-        relationship_id = state.get("relationship_id")
-
-        now = str(state.get("current_time") or "")
-        user_input = str(state.get("user_input") or "")
-        bot_text = str(state.get("final_response") or state.get("draft_response") or "").strip()
-        prev_summary = str(state.get("conversation_summary") or "").strip()
-        turn_count_in_session = int(state.get("turn_count_in_session") or 0)
-
-        session_id = state.get("session_id")
-        thread_id = state.get("thread_id")
-        turn_index = state.get("turn_index")
-
-        # 防御：没有内容就不更新
-        if not user_input and not bot_text:
-            return {}
-
-        # 现有 relationship_assets 与 topic_history（用于话题历史更新）
-        existing_assets = state.get("relationship_assets") or {}
-        existing_topic_history = list(existing_assets.get("topic_history") or [])
-
-        # 现有画像（用于“只补空不覆盖”）
-        existing_basic: Dict[str, Any] = dict(state.get("user_basic_info") or {})
-        existing_profile: Dict[str, Any] = dict(state.get("user_inferred_profile") or {})
-
-        sys_prompt = """你是经验丰富的记录总结专家，擅长从对话中提炼关键信息并形成结构化记录。
+# 系统提示为纯静态文本：模块级常量，避免每轮重建；会话边界版本预先拼好
+_MM_SYS_PROMPT = """你是经验丰富的记录总结专家，擅长从对话中提炼关键信息并形成结构化记录。
 你将基于【旧摘要】+【本轮对话】输出严格 JSON，用于更新摘要、沉淀稳定记忆与抽取用户基础信息。
 
 通用要求（影响稳定性）：
@@ -192,10 +134,7 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
 - 如果对话内容可以归入一个已有话题，则不要添加；但如果涉及了一个明显不同领域的中层主题，应识别为新话题
 - 如果本轮没有新话题，返回空数组 []"""
 
-        # 会话边界时，附加 SPT 评估指令（基于旧摘要评估上一会话最大自我披露深度）
-        is_session_boundary = turn_count_in_session == 0 and bool(prev_summary)
-        if is_session_boundary:
-            sys_prompt += """
+_MM_SPT_ADDENDUM = """
 
 【自我披露深度（SPT）— 仅限会话边界，根据【旧摘要】评估】
 这是新会话的第一轮，请根据旧摘要评估上一个 session 中用户自我披露的最大深度，填入 spt_depth_last_session（1-5）：
@@ -213,6 +152,54 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
 - 格式：自然语言段落，无需分条列表
 - 旧摘要内容很浅（仅寒暄）时可缩短至 100-200 字"""
 
+_MM_SYS_PROMPT_BOUNDARY = _MM_SYS_PROMPT + _MM_SPT_ADDENDUM
+
+
+def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
+    """
+    记忆管理节点（每轮更新）：
+    - 用一次 LLM 调用同时做：
+      1) 更新 conversation_summary（running summary）
+      2) 抽取 derived notes（稳定事实/偏好/决策/正在做什么）
+      3) 生成 transcript 元数据（entities/topic/importance/short_context）
+      4) 严格抽取基础信息 basic_info（name/age/gender/occupation/location）：必须来自“最新 user_input”
+         - LLM 输出值 + confidence + evidence（evidence 必须逐字出现在 user_input 中）
+         - Python 侧只做最小门控：evidence 子串校验 + 置信度阈值 + 不覆盖已有字段
+      5) 可选抽取 new_inferred_entries（少而精），用于 user_inferred_profile 增量沉淀
+    - 落盘：优先 DB（transcripts/derived_notes），无 DB 时用 LocalStore jsonl。
+    """
+
+    async def node(state: AgentState) -> Dict[str, Any]:
+        user_id = str(state.get("user_id") or "default_user")
+        bot_id = str(state.get("bot_id") or "default_bot")
+        relationship_id = state.get("relationship_id")
+
+        now = str(state.get("current_time") or "")
+        user_input = str(state.get("user_input") or "")
+        bot_text = str(state.get("final_response") or state.get("draft_response") or "").strip()
+        prev_summary = str(state.get("conversation_summary") or "").strip()
+        turn_count_in_session = int(state.get("turn_count_in_session") or 0)
+
+        session_id = state.get("session_id")
+        thread_id = state.get("thread_id")
+        turn_index = state.get("turn_index")
+
+        # 防御：没有内容就不更新
+        if not user_input and not bot_text:
+            return {}
+
+        # 现有 relationship_assets 与 topic_history（用于话题历史更新）
+        existing_assets = state.get("relationship_assets") or {}
+        existing_topic_history = list(existing_assets.get("topic_history") or [])
+
+        # 现有画像（用于“只补空不覆盖”）
+        existing_basic: Dict[str, Any] = dict(state.get("user_basic_info") or {})
+        existing_profile: Dict[str, Any] = dict(state.get("user_inferred_profile") or {})
+
+        # 会话边界时，附加 SPT 评估指令（基于旧摘要评估上一会话最大自我披露深度）
+        is_session_boundary = turn_count_in_session == 0 and bool(prev_summary)
+        sys_prompt = _MM_SYS_PROMPT_BOUNDARY if is_session_boundary else _MM_SYS_PROMPT
+
         existing_topic_history_str = ", ".join(existing_topic_history) if existing_topic_history else "（空）"
         human_prompt = f"""【旧摘要】
 {prev_summary if prev_summary else "（空）"}
@@ -253,7 +240,11 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
             data = {}
 
         # 2) 解析 LLM 结果（摘要 + 元数据 + notes）
-        print(f"[MemoryManager][DEBUG] data keys={list(data.keys()) if data else 'EMPTY'}, new_topics_in_data={data.get('new_topics', 'MISSING')}")
+        logger.debug(
+            "[MemoryManager] data keys=%s, new_topics_in_data=%s",
+            list(data.keys()) if data else "EMPTY",
+            data.get("new_topics", "MISSING"),
+        )
         new_summary = str(data.get("new_summary") or prev_summary or "").strip()
 
         # 方案C：会话边界时解析精华摘要
@@ -321,7 +312,12 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
             ts = str(t).strip()
             if ts and len(ts) <= 20:
                 new_topics.append(ts)
-        print(f"[MemoryManager] new_topics_raw={new_topics_raw}, filtered={new_topics}, existing_history={existing_topic_history}")
+        logger.info(
+            "[MemoryManager] new_topics_raw=%s, filtered=%s, existing_history=%s",
+            new_topics_raw,
+            new_topics,
+            existing_topic_history,
+        )
 
         # 3) 基础信息：LLM 输出 + Python 最小门控（不用正则）
         basic_updates_raw = data.get("basic_info_updates")
@@ -467,29 +463,12 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
                 break
 
         # 5) Store A/B 落盘
-        db = _get_db_manager()
+        db = get_db_manager()
         if db and relationship_id:
             # DB 模式：写 transcripts + derived_notes
             try:
-                transcript_id = await db.append_transcript(
-                    relationship_id=str(relationship_id),
-                    user_text=user_input,
-                    bot_text=bot_text,
-                    session_id=str(session_id) if session_id else None,
-                    thread_id=str(thread_id) if thread_id else None,
-                    turn_index=int(turn_index) if isinstance(turn_index, int) else None,
-                    entities={"entities": entities},
-                    topic=str(topic) if topic else None,
-                    importance=importance,
-                    short_context=str(short_context) if short_context else None,
-                )
-
-                # notes 写入（带 source_pointer）
-                notes_for_db: List[Dict[str, Any]] = []
-                for n in cleaned_notes:
-                    nn = dict(n)
-                    nn.setdefault("source_pointer", f"transcript:{transcript_id}")
-                    notes_for_db.append(nn)
+                # notes 写入（source_pointer 缺省由 DB 层指向本条 transcript）
+                notes_for_db: List[Dict[str, Any]] = [dict(n) for n in cleaned_notes]
 
                 # 若本轮写入了 basic_info，也额外落一条 note（可溯源）
                 if wrote_basic_keys:
@@ -498,16 +477,23 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
                             "note_type": "fact",
                             "content": f"用户基础信息更新：{', '.join(wrote_basic_keys)}",
                             "importance": 0.8,
-                            "source_pointer": f"transcript:{transcript_id}",
                         }
                     )
 
-                if notes_for_db:
-                    await db.append_notes(
-                        relationship_id=str(relationship_id),
-                        transcript_id=str(transcript_id),
-                        notes=notes_for_db,  # type: ignore[arg-type]
-                    )
+                # transcript + notes 同一事务落盘：一次提交，避免只写入一半
+                await db.append_transcript_with_notes(
+                    relationship_id=str(relationship_id),
+                    notes=notes_for_db,  # type: ignore[arg-type]
+                    user_text=user_input,
+                    bot_text=bot_text,
+                    session_id=str(session_id) if session_id else None,
+                    thread_id=str(thread_id) if thread_id else None,
+                    turn_index=int(turn_index) if isinstance(turn_index, int) else None,
+                    entities={"entities": entities},
+                    topic=str(topic) if topic else None,
+                    importance=importance,
+                    short_context=str(short_context) if short_context else None,
+                )
             except Exception:
                 logger.exception("[MemoryManager] DB 写入失败")
         else:
@@ -570,24 +556,19 @@ def create_memory_manager_node(llm_invoker: Any) -> Callable[[AgentState], dict]
                 "content": archive_content,
                 "importance": 0.9,
             }
-            _db_for_archive = _get_db_manager()
+            _db_for_archive = get_db_manager()
             if _db_for_archive and relationship_id:
                 try:
-                    # 创建一个"锚点" transcript 以满足 FK 约束，不含实际对话内容
-                    _anchor_tid = await _db_for_archive.append_transcript(
+                    # 创建一个"锚点" transcript 以满足 FK 约束，不含实际对话内容；与存档 note 同一事务写入
+                    await _db_for_archive.append_transcript_with_notes(
                         relationship_id=str(relationship_id),
+                        notes=[_archive_note],
                         user_text="",
                         bot_text="",
                         topic="session_archive",
                         importance=0.9,
                         short_context=f"会话存档 {archive_date}",
                     )
-                    _archive_note["source_pointer"] = f"transcript:{_anchor_tid}"
-                    await _db_for_archive.append_notes(
-                        relationship_id=str(relationship_id),
-                        transcript_id=_anchor_tid,
-                        notes=[_archive_note],
-                    )
                     logger.info("[MemoryManager] session_archive written for date=%s", archive_date)
                 except Exception:
                     logger.exception("[MemoryManager] session_archive DB 写入失败")
@@ -1,37 +1,61 @@
 """出口写入节点：优先写 DB（Commit Late），无 DB 时回退 Memory Service。"""
 
+import os
 from typing import TYPE_CHECKING, Callable
 
-import os
 from datetime import datetime, timezone
 
+from app.core.db.singleton import get_db_manager
+from app.services.memory.write_queue import memory_write_queue
 from app.state import AgentState
+from utils.tracing import _truthy
 
 if TYPE_CHECKING:
     from app.services.memory.base import MemoryBase
 
 
-_DB_MANAGER = None
-
-
-def _get_db_manager():
-    global _DB_MANAGER
-    if _DB_MANAGER is not None:
-        return _DB_MANAGER
-    if not os.getenv("DATABASE_URL"):
-        return None
-    try:
-        from app.core import DBManager
-
-        _DB_MANAGER = DBManager.from_env()
-        return _DB_MANAGER
-    except Exception:
-        return None
+# DBManager.save_turn / LocalStoreManager.save_turn 实际读取的字段；新增读取字段时需同步此处
+# （tests/test_memory_writer_persisted_keys.py 校验两处 save_turn 读取的 key 都在其中）
+_PERSISTED_KEYS = (
+    "_urgent_tasks_consumed",
+    "ai_sent_at",
+    "bot_basic_info",
+    "bot_big_five",
+    "bot_persona",
+    "bot_task_list",
+    "conversation_momentum",
+    "conversation_summary",
+    "current_session_tasks",
+    "current_stage",
+    "current_time",
+    "detection_category",
+    "detection_result",
+    "draft_response",
+    "final_response",
+    "final_segments",
+    "generated_new_memory_text",
+    "humanized_output",
+    "mood_state",
+    "new_memory_content",
+    "relationship_assets",
+    "relationship_state",
+    "reply_duration_seconds_list",
+    "skip_bot_message_write",
+    "skip_user_message_write",
+    "spt_info",
+    "turn_count_in_session",
+    "user_basic_info",
+    "user_inferred_profile",
+    "user_input",
+    "user_received_at",
+)
 
 
 def create_memory_writer_node(memory_service: "MemoryBase") -> Callable[[AgentState], dict]:
     """创建 memory_writer 节点。返回 async 节点，与 loader 配合 ainvoke 使用同一事件循环。"""
 
+    background = _truthy(os.getenv("MEMORY_WRITER_ASYNC"))
+
     async def node(state: AgentState) -> dict:
         user_id = state.get("user_id") or "default_user"
 
@@ -39,14 +63,23 @@ def create_memory_writer_node(memory_service: "MemoryBase") -> Callable[[AgentSt
         if not state.get("ai_sent_at"):
             out["ai_sent_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
 
-        # 合并 ai_sent_at，确保 save_turn 拿到最新时间戳
-        merged_state = {**state, **out}
+        # 只取落盘字段 + 合并 ai_sent_at（确保 save_turn 拿到最新时间戳）；
+        # 后台写入排队期间不持有整份 state（chat_buffer、召回片段、prompt 等）
+        merged_state = {k: state[k] for k in _PERSISTED_KEYS if k in state}
+        merged_state.update(out)
 
-        db = _get_db_manager()
+        db = get_db_manager()
         if db:
             bot_id = state.get("bot_id") or (state.get("bot_basic_info") or {}).get("name") or "default_bot"
             new_memory = state.get("generated_new_memory_text") or state.get("new_memory_content")
-            await db.save_turn(str(user_id), str(bot_id), merged_state, new_memory=new_memory)
+
+            async def _save() -> None:
+                await db.save_turn(str(user_id), str(bot_id), merged_state, new_memory=new_memory)
+
+            # MEMORY_WRITER_ASYNC=1：落盘交给后台队列，图立即返回（仅限长驻事件循环的入口）
+            if background and memory_write_queue.submit(f"{user_id}:{bot_id}", _save):
+                return out
+            await _save()
             return out
 
         # local store (default)
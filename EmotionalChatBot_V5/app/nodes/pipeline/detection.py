@@ -10,18 +10,20 @@ Detection 节点：对当轮对方消息输出客观量（不依赖角色/Bot 
 """
 from __future__ import annotations
 
+import logging
 from typing import Any, Callable, Dict
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from utils.tracing import trace_if_enabled
 from utils.detailed_logging import log_prompt_and_params, log_llm_response
 from utils.llm_json import parse_json_from_llm
-from app.prompts.prompt_utils import safe_text
+from app.prompts.prompt_utils import is_user_message, recent_messages, safe_text
 from app.state import AgentState
 from src.schemas import DetectionOutput
 
-_STAGE_PACING_VALID = frozenset({"正常", "过分亲密", "过分生疏"})
+logger = logging.getLogger(__name__)
 
+_STAGE_PACING_VALID = frozenset({"正常", "过分亲密", "过分生疏"})
 
 def _clip_int(x: Any, lo: int, hi: int) -> int:
     try:
@@ -45,6 +47,14 @@ def _default_detection() -> Dict[str, Any]:
 def create_detection_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
     """创建 Detection 节点：单次 LLM 产出 5 个字段。"""
 
+    # 结构化输出包装只依赖 schema，创建节点时构建一次，每轮复用
+    structured = None
+    if hasattr(llm_invoker, "with_structured_output"):
+        try:
+            structured = llm_invoker.with_structured_output(DetectionOutput)
+        except Exception:
+            structured = None
+
     @trace_if_enabled(
         name="Perception/Detection",
         run_type="chain",
@@ -52,22 +62,18 @@ def create_detection_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
         metadata={"state_outputs": ["detection"]},
     )
     def detection_node(state: AgentState) -> dict:
-        chat_buffer = list(state.get("chat_buffer") or state.get("messages", [])[-30:])
+        chat_buffer = recent_messages(state, 30)
         stage_id = str(state.get("current_stage") or "initiating")
 
         if not chat_buffer:
             return {"detection": _default_detection()}
 
-        def _is_user(m) -> bool:
-            t = getattr(m, "type", "") or ""
-            return "human" in t.lower() or "user" in t.lower()
-
         last_msg = chat_buffer[-1]
         latest_user_text_raw = (
             (state.get("user_input") or "").strip()
             or (getattr(last_msg, "content", "") or str(last_msg)).strip()
         )
-        if not _is_user(last_msg):
+        if not is_user_message(last_msg):
             latest_user_text_raw = latest_user_text_raw or "(无对方新句)"
 
         latest_user_text = safe_text(latest_user_text_raw)
@@ -100,18 +106,24 @@ def create_detection_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
         msg = None
         try:
             result = None
-            if hasattr(llm_invoker, "with_structured_output"):
+            if structured is not None:
                 try:
-                    structured = llm_invoker.with_structured_output(DetectionOutput)
                     result = structured.invoke(messages)
                 except Exception:
                     result = None
             if result is None:
                 msg = llm_invoker.invoke(messages)
                 content = (getattr(msg, "content", "") or str(msg)).strip()
-                raw = parse_json_from_llm(content)
-                if isinstance(raw, dict):
-                    result = raw
+                # 快路径：干净 JSON 由 pydantic-core 一次解析+类型校验；代码块/杂文/多余字段再走容错解析
+                if content:
+                    try:
+                        result = DetectionOutput.model_validate_json(content)
+                    except Exception:
+                        result = None
+                if result is None:
+                    raw = parse_json_from_llm(content)
+                    if isinstance(raw, dict):
+                        result = raw
             if result is not None:
                 if hasattr(result, "model_dump"):
                     result = result.model_dump()
@@ -131,12 +143,16 @@ def create_detection_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
                         parsed_result=out,
                     )
         except Exception as e:
-            print(f"[Detection] 解析异常: {e}，使用默认值")
-
-        print(
-            f"[Detection] hostility={out['hostility_level']}, engagement={out['engagement_level']}, "
-            f"stage_pacing={out['stage_pacing']}, urgency={out['urgency']}, "
-            f"knowledge_gap={out['knowledge_gap']}, search_keywords={out['search_keywords']!r}"
+            logger.warning("[Detection] 解析异常: %s，使用默认值", e)
+
+        logger.info(
+            "[Detection] hostility=%s, engagement=%s, stage_pacing=%s, urgency=%s, knowledge_gap=%s, search_keywords=%r",
+            out["hostility_level"],
+            out["engagement_level"],
+            out["stage_pacing"],
+            out["urgency"],
+            out["knowledge_gap"],
+            out["search_keywords"],
         )
         return {"detection": out}
 
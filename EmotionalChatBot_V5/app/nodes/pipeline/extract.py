@@ -8,7 +8,7 @@ from __future__ import annotations
 import logging
 import os
 import random
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
@@ -18,7 +18,7 @@ from src.schemas import MonologueExtractOutput
 from utils.detailed_logging import log_prompt_and_params, log_llm_response
 from utils.llm_json import parse_json_from_llm
 from utils.tracing import trace_if_enabled
-from utils.yaml_loader import load_pure_content_transformations
+from utils.yaml_loader import load_pure_content_transformations_cached
 
 logger = logging.getLogger(__name__)
 
@@ -123,23 +123,39 @@ def _bucket_closeness(v: float) -> str:
     return "close"
 
 
-def _apply_rules(weights: Dict[int, float], blocked: set, rules: Dict[str, list]):
-    """应用一组规则到权重和 blocked 集合。"""
-    for key, ids in rules.items():
-        if key == "blocked":
-            blocked.update(ids)
-        elif key == "+2":
-            for mid in ids:
-                weights[mid] = weights.get(mid, 0) + 2
-        elif key == "+1":
-            for mid in ids:
-                weights[mid] = weights.get(mid, 0) + 1
-        elif key == "-1":
-            for mid in ids:
-                weights[mid] = weights.get(mid, 0) - 1
-        elif key == "-2":
-            for mid in ids:
-                weights[mid] = weights.get(mid, 0) - 2
+_RULE_DELTAS: Dict[str, int] = {"+2": 2, "+1": 1, "-1": -1, "-2": -2}
+
+# 编译后的单条规则：((move_id, delta), ...) + blocked 集合
+_CompiledRule = Tuple[Tuple[Tuple[int, int], ...], FrozenSet[int]]
+_NO_RULE: _CompiledRule = ((), frozenset())
+
+
+def _compile_rules(table: Dict[str, Dict[str, list]]) -> Dict[str, _CompiledRule]:
+    """import 时把 {"+2": [...], "blocked": [...]} 展平成 (move_id, delta) 序列，每轮只做加法。"""
+    out: Dict[str, _CompiledRule] = {}
+    for bucket, rules in table.items():
+        deltas = tuple(
+            (mid, _RULE_DELTAS[key]) for key, ids in rules.items() if key in _RULE_DELTAS for mid in ids
+        )
+        out[bucket] = (deltas, frozenset(rules.get("blocked") or ()))
+    return out
+
+
+_USER_ACT_COMPILED = _compile_rules(_USER_ACT_RULES)
+_URGENCY_COMPILED = _compile_rules(_URGENCY_RULES)
+_HOSTILITY_COMPILED = _compile_rules(_HOSTILITY_RULES)
+_ENGAGEMENT_COMPILED = _compile_rules(_ENGAGEMENT_RULES)
+_MOMENTUM_COMPILED = _compile_rules(_MOMENTUM_RULES)
+_CLOSENESS_COMPILED = _compile_rules(_CLOSENESS_RULES)
+
+
+def _apply_rules(weights: Dict[int, float], blocked: set, rule: _CompiledRule):
+    """应用一条编译后的规则到权重和 blocked 集合。"""
+    deltas, block = rule
+    if block:
+        blocked.update(block)
+    for mid, delta in deltas:
+        weights[mid] = weights.get(mid, 0) + delta
 
 
 def select_moves(
@@ -152,18 +168,18 @@ def select_moves(
     blocked: set = set()
 
     # 维度1：user_act
-    _apply_rules(weights, blocked, _USER_ACT_RULES.get(user_act, {}))
+    _apply_rules(weights, blocked, _USER_ACT_COMPILED.get(user_act, _NO_RULE))
 
     # 维度2-3：urgency / hostility（from detection）
     detection = state.get("detection") or {}
     urgency = float(detection.get("urgency", 0))
     hostility = float(detection.get("hostility_level", 0))
-    _apply_rules(weights, blocked, _URGENCY_RULES.get(_bucket_urgency(urgency), {}))
-    _apply_rules(weights, blocked, _HOSTILITY_RULES.get(_bucket_hostility(hostility), {}))
+    _apply_rules(weights, blocked, _URGENCY_COMPILED[_bucket_urgency(urgency)])
+    _apply_rules(weights, blocked, _HOSTILITY_COMPILED[_bucket_hostility(hostility)])
 
     # 维度4：engagement
     engagement = float(detection.get("engagement_level", 5))
-    _apply_rules(weights, blocked, _ENGAGEMENT_RULES.get(_bucket_engagement(engagement), {}))
+    _apply_rules(weights, blocked, _ENGAGEMENT_COMPILED[_bucket_engagement(engagement)])
 
     # 维度5：momentum
     momentum = 0.5
@@ -171,12 +187,12 @@ def select_moves(
         momentum = float(state.get("conversation_momentum", 0.5))
     except (TypeError, ValueError):
         pass
-    _apply_rules(weights, blocked, _MOMENTUM_RULES.get(_bucket_momentum(momentum), {}))
+    _apply_rules(weights, blocked, _MOMENTUM_COMPILED[_bucket_momentum(momentum)])
 
     # 维度6：closeness
     rel = state.get("relationship_state") or {}
     closeness = float(rel.get("closeness", 0.3))
-    _apply_rules(weights, blocked, _CLOSENESS_RULES.get(_bucket_closeness(closeness), {}))
+    _apply_rules(weights, blocked, _CLOSENESS_COMPILED[_bucket_closeness(closeness)])
 
     # 维度7：recent_moves
     history: List[List[int]] = list(state.get("recent_move_history") or [])
@@ -299,7 +315,7 @@ def _gender_unknown(state: AgentState) -> bool:
 def _run_extract(state: AgentState, monologue: str, llm_invoker: Any) -> Dict[str, Any]:
     # 加载 content moves（仅用于日志，不注入 LLM prompt）
     try:
-        transformations = _normalize_pure_content_transformations(load_pure_content_transformations())
+        transformations = _normalize_pure_content_transformations(load_pure_content_transformations_cached())
     except Exception as e:
         logger.warning("[Extract] load_pure_content_transformations failed: %s", e)
         transformations = []
@@ -15,12 +15,12 @@ from typing import Any, Callable, Dict, List, Optional
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from app.prompts.prompt_utils import format_style_as_param_list, safe_text
+from app.prompts.prompt_utils import format_style_as_param_list, is_user_message, recent_messages, safe_text
 from app.state import AgentState
 from utils.detailed_logging import log_prompt_and_params
 from utils.time_context import _parse_ts, _to_local
 from utils.tracing import trace_if_enabled
-from utils.yaml_loader import load_pure_content_transformations
+from utils.yaml_loader import load_pure_content_transformations_cached
 
 _WEEKDAY_ZH = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
 
@@ -32,11 +32,6 @@ LATEST_USER_TEXT_MAX = 800
 CANDIDATES_PER_ROUTE = 4
 
 
-def _is_user_message(m: Any) -> bool:
-    t = getattr(m, "type", "") or ""
-    return "human" in t.lower() or "user" in t.lower()
-
-
 def _momentum_to_direction(momentum: float) -> str:
     """将 conversation_momentum 值映射为信息密度 + 深度指令（不指定具体手法，由 bot 自由选择）。"""
     if momentum >= 0.80:
@@ -63,9 +58,9 @@ def _normalize_pure_content_transformations(raw: Any) -> List[Dict[str, Any]]:
 
 
 def _load_move_descriptions() -> Dict[int, Dict[str, str]]:
-    """返回 {move_id: {name, description}} 字典。"""
+    """返回 {move_id: {name, description}} 字典（与 extract 读同一份按 mtime 缓存的 move 表）。"""
     try:
-        transformations = _normalize_pure_content_transformations(load_pure_content_transformations())
+        transformations = _normalize_pure_content_transformations(load_pure_content_transformations_cached())
         return {
             int(m["id"]): {"name": (m.get("name") or "").strip(), "desc": (m.get("content_operation") or "").strip()}
             for m in transformations
@@ -77,13 +72,11 @@ def _load_move_descriptions() -> Dict[int, Dict[str, str]]:
 
 
 def _build_dialogue_context(state: AgentState) -> str:
-    chat_buffer: List[BaseMessage] = list(
-        state.get("chat_buffer") or state.get("messages", [])[-RECENT_DIALOGUE_LAST_N * 2:]
-    )[-RECENT_DIALOGUE_LAST_N * 2:]
+    chat_buffer: List[BaseMessage] = recent_messages(state, RECENT_DIALOGUE_LAST_N * 2)
 
     lines: List[str] = []
     for m in chat_buffer:
-        role = "Human" if _is_user_message(m) else "AI"
+        role = "Human" if is_user_message(m) else "AI"
         content = (getattr(m, "content", "") or str(m)).strip()
         if len(content) > RECENT_MSG_CONTENT_MAX:
             content = content[:RECENT_MSG_CONTENT_MAX] + "…"
@@ -140,6 +133,31 @@ def _build_profile_block(state: AgentState, selected_keys: List[str]) -> str:
     return "## 关于对方的已知信息（自然融入，不要生硬列举）\n" + "\n".join(items) + "\n"
 
 
+_REPLY_RULES = """## 回复规则
+- 第一人称，你就是这个人在社交软件上聊天，说话口语自然，不要暴露是AI
+- 回复要和内心独白的情绪/态度保持一致，**信息密度指令优先于其他规则**
+- 如果本轮消息里有「你刚查到的事实」，必须在回复中自然地融入核心信息，不要回避或含糊——对方在问你这个问题，你要直接回答
+- 不要使用"作为AI"、"根据您的请求"等客服套话
+- 自然、有个性，符合写作风格参数
+- 每条消息开头应自然变化，不要以固定词语重复起句
+- **严禁**：任何括号形式的动作描写，如（戳戳脸颊）[轻轻拍你]——聊天消息里不会出现这种写法
+- **严禁一切文学化表达**（违反即废稿，零容忍）：
+  ① 文学性修辞=禁止：禁止比喻、拟人、排比、对偶、夸张、通感、借代、反复等文学性修辞
+  ② 文学性=zero，散文感=zero：禁止散文化句子、金句、哲理感悟、诗意总结
+  ③ 抒情性=zero：禁止抒情，不要"感叹人生"、不要"总结情感"、不要升华
+  ④ 书面语体=禁止：只用口语，禁止书面语。"我觉得挺好的"可以，"这便是最好的答案"不行
+  ⑤ 意象=禁止：禁止一切意象化描写，如"光"、"风"、"雨"、"路"等用作隐喻
+  ⑥ 押韵=禁止：句尾不允许押韵、对仗、节奏工整
+  你是普通人在微信上打字，不是在写作文。说人话，短句，口语，不完整也没关系。
+  × "旧东西才肯说真话" ← 金句，禁止
+  × "人和猫之间，靠的都是这种不刻意的记得" ← 散文化总结，禁止
+  × "因为不急着赶路，才听得见" ← 文学性抒情，禁止
+  × "偷偷留住那点安静" ← 意象化，禁止
+  × "像在偷听别人的故事" ← 比喻，禁止
+  ✓ "哈哈那挺好的" ✓ "你说的对，我也这么觉得" ✓ "行吧，回头再说"
+- 回复直接输出，不要任何前缀或格式标记"""
+
+
 def _build_messages_for_route(
     state: AgentState,
     move_desc: Optional[str],
@@ -217,9 +235,14 @@ def _build_messages_for_route(
             f"{ext_knowledge}\n\n"
         )
 
+    # 静态前缀（身份 + 人设 + 回复规则）放在 system，跨轮次、跨路由保持一致以命中 provider 前缀缓存；
+    # 逐轮变化的内容（独白/风格/事实/素材/move 约束）全部放进 user 消息。
     system_content = f"""你是 {bot_name}。你正在和 {user_name} 对话。
 {persona_text}
-{profile_block}
+
+{_REPLY_RULES}"""
+
+    user_content = f"""{profile_block}
 {time_fact_block}{ext_facts_block}## 你的内心活动（情绪/态度/意愿）——用于调节回复基调，不是要说出口的内容
 {monologue}
 
@@ -227,32 +250,8 @@ def _build_messages_for_route(
 ## 写作风格参数
 {style_text}
 {daily_topics_block}
-{move_block}{task_hint}## 回复规则
-- 第一人称，你就是这个人在社交软件上聊天，说话口语自然，不要暴露是AI
-- 回复要和内心独白的情绪/态度保持一致，**信息密度指令优先于其他规则**
-- 如果上面有「你刚查到的事实」，必须在回复中自然地融入核心信息，不要回避或含糊——对方在问你这个问题，你要直接回答
-- 不要使用"作为AI"、"根据您的请求"等客服套话
-- 自然、有个性，符合写作风格参数
-- 每条消息开头应自然变化，不要以固定词语重复起句
-- **严禁**：任何括号形式的动作描写，如（戳戳脸颊）[轻轻拍你]——聊天消息里不会出现这种写法
-- **严禁一切文学化表达**（违反即废稿，零容忍）：
-  ① 文学性修辞=禁止：禁止比喻、拟人、排比、对偶、夸张、通感、借代、反复等文学性修辞
-  ② 文学性=zero，散文感=zero：禁止散文化句子、金句、哲理感悟、诗意总结
-  ③ 抒情性=zero：禁止抒情，不要"感叹人生"、不要"总结情感"、不要升华
-  ④ 书面语体=禁止：只用口语，禁止书面语。"我觉得挺好的"可以，"这便是最好的答案"不行
-  ⑤ 意象=禁止：禁止一切意象化描写，如"光"、"风"、"雨"、"路"等用作隐喻
-  ⑥ 押韵=禁止：句尾不允许押韵、对仗、节奏工整
-  你是普通人在微信上打字，不是在写作文。说人话，短句，口语，不完整也没关系。
-  × "旧东西才肯说真话" ← 金句，禁止
-  × "人和猫之间，靠的都是这种不刻意的记得" ← 散文化总结，禁止
-  × "因为不急着赶路，才听得见" ← 文学性抒情，禁止
-  × "偷偷留住那点安静" ← 意象化，禁止
-  × "像在偷听别人的故事" ← 比喻，禁止
-  ✓ "哈哈那挺好的" ✓ "你说的对，我也这么觉得" ✓ "行吧，回头再说"
-- 回复直接输出，不要任何前缀或格式标记
-"""
-
-    user_content = f"""## 历史对话（最近 {RECENT_DIALOGUE_LAST_N} 条）
+{move_block}{task_hint}
+## 历史对话（最近 {RECENT_DIALOGUE_LAST_N} 条）
 {dialogue_context}
 
 ## 当前用户消息
@@ -302,7 +301,6 @@ async def _generate_route(
 
 def create_generate_node(llm_gen: Any) -> Callable[[AgentState], Any]:
     """创建并行生成节点（async）。"""
-
     @trace_if_enabled(
         name="Response/Generate",
         run_type="chain",
@@ -314,9 +312,6 @@ def create_generate_node(llm_gen: Any) -> Callable[[AgentState], Any]:
         move_ids: List[int] = list(extract.get("selected_content_move_ids") or [])[:4]
         monologue = (state.get("inner_monologue") or "按常理接话即可。").strip()
 
-        # 加载 move 描述
-        move_map = _load_move_descriptions()
-
         # 构建共享上下文
         bot_basic_info = state.get("bot_basic_info") or {}
         user_basic_info = state.get("user_basic_info") or {}
@@ -335,12 +330,13 @@ def create_generate_node(llm_gen: Any) -> Callable[[AgentState], Any]:
         _max_tokens = int(_max_chars * 4) + 40    # 宽松安全网，不干扰正常生成
         logger.info("[Generate] momentum=%.2f max_chars=%d max_tokens=%d", momentum, _max_chars, _max_tokens)
 
+        # 两条路径共用的 extract 派生块：只算一次
+        _selected_profile_keys: List[str] = list(extract.get("selected_profile_keys") or [])
+        _profile_block = _build_profile_block(state, _selected_profile_keys)
+        _task_hint = _build_basic_info_task_block(state)
+
         # ── ABLATION_MODE：跳过多路 Move 生成 + Judge，单次 LLM 直接生成 ──
         if os.getenv("ABLATION_MODE"):
-            _extract = dict(state.get("monologue_extract") or {})
-            _selected_profile_keys: List[str] = list(_extract.get("selected_profile_keys") or [])
-            _profile_block = _build_profile_block(state, _selected_profile_keys)
-            _task_hint = _build_basic_info_task_block(state)
             free_msgs = _build_messages_for_route(
                 state, None, None, dialogue_context, style_text, monologue, bot_name, user_name,
                 task_hint=_task_hint, profile_block=_profile_block,
@@ -356,17 +352,12 @@ def create_generate_node(llm_gen: Any) -> Callable[[AgentState], Any]:
 
         # ── 正常模式：多路并行生成 ──
 
-        # 提取共享的 extract 信号
-        _extract = dict(state.get("monologue_extract") or {})
-        _bot_stance = str(_extract.get("bot_stance") or "")
-        _selected_profile_keys: List[str] = list(_extract.get("selected_profile_keys") or [])
-        _profile_block = _build_profile_block(state, _selected_profile_keys)
-
         # 为每路构建任务（同时收集路由信息供日志使用）
         route_infos: List[tuple] = []  # (label, mid, name, desc, msgs)
         tasks = []
 
         # Move 路（2-4 个）
+        move_map = _load_move_descriptions()
         for mid in move_ids:
             move_info = move_map.get(mid, {})
             move_name = move_info.get("name", f"move_{mid}")
@@ -380,7 +371,6 @@ def create_generate_node(llm_gen: Any) -> Callable[[AgentState], Any]:
             tasks.append(_generate_route(llm_gen, msgs, mid, label, max_tokens=_max_tokens))
 
         # FREE 路（无 move 约束，附带基础信息问询任务提示）
-        _task_hint = _build_basic_info_task_block(state)
         free_msgs = _build_messages_for_route(
             state, None, None, dialogue_context, style_text, monologue, bot_name, user_name,
             task_hint=_task_hint, profile_block=_profile_block,
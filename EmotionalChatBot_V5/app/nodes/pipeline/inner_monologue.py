@@ -14,7 +14,7 @@ from typing import Any, Callable, List, Dict, Optional
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from app.prompts.prompt_utils import safe_text
+from app.prompts.prompt_utils import is_user_message, recent_messages, safe_text
 from utils.tracing import trace_if_enabled
 from utils.state_to_text import convert_state_to_context_text
 from datetime import datetime, timezone
@@ -31,11 +31,6 @@ RECENT_MSG_CONTENT_MAX = 200  # 每条对话只显示 200 字，减少噪声
 RECENT_DIALOGUE_LAST_N = 15   # 保留 15 轮，保证上下文连贯
 
 
-def _is_user_message(m: BaseMessage) -> bool:
-    t = getattr(m, "type", "") or ""
-    return "human" in t.lower() or "user" in t.lower()
-
-
 def _build_user_profile_summary(state: AgentState) -> str:
     """从user_inferred_profile生成简短的用户画像总结。"""
     user_profile = state.get("user_inferred_profile") or {}
@@ -52,9 +47,8 @@ def _build_user_profile_summary(state: AgentState) -> str:
 
 def _gather_context_for_monologue(state: dict) -> Dict[str, str]:
     """收集内心独白所需的所有上下文信息。"""
-    chat_buffer: List[BaseMessage] = list(
-        state.get("chat_buffer") or state.get("messages", [])[-RECENT_DIALOGUE_LAST_N:]
-    )
+    # 对话窗口取 RECENT_DIALOGUE_LAST_N 条，内容停滞检测另看最近 20 条
+    chat_buffer: List[BaseMessage] = recent_messages(state, max(RECENT_DIALOGUE_LAST_N, 20))
 
     # 最新用户消息
     latest_user_text_raw = (state.get("user_input") or "").strip()
@@ -66,7 +60,7 @@ def _gather_context_for_monologue(state: dict) -> Dict[str, str]:
     # 近期对话历史
     lines: List[str] = []
     for m in chat_buffer[-RECENT_DIALOGUE_LAST_N:]:
-        role = "User" if _is_user_message(m) else "Bot"
+        role = "User" if is_user_message(m) else "Bot"
         content = (getattr(m, "content", "") or str(m)).strip()
         if len(content) > RECENT_MSG_CONTENT_MAX:
             content = content[:RECENT_MSG_CONTENT_MAX] + "…"
@@ -146,7 +140,7 @@ def _gather_context_for_monologue(state: dict) -> Dict[str, str]:
         _bot_msgs = [
             (getattr(m, "content", "") or str(m)).strip()
             for m in chat_buffer[-20:]
-            if not _is_user_message(m) and (getattr(m, "content", "") or str(m)).strip()
+            if not is_user_message(m) and (getattr(m, "content", "") or str(m)).strip()
         ]
         _stagnation = _content_stagnation(_bot_msgs)  # 0-1，越高越重复
         # stagnation > 0.20 时开始触发，0.37 时触发概率约 75%，线性增长
@@ -11,6 +11,7 @@ from typing import Any, Callable, Dict, List
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from app.prompts.prompt_utils import is_user_message, recent_messages
 from app.state import AgentState
 from src.schemas import JudgeOutput
 from utils.detailed_logging import log_prompt_and_params, log_llm_response
@@ -22,19 +23,12 @@ JUDGE_RECENT_DIALOGUE_N = 5
 JUDGE_MAX_CANDIDATE_CHARS = 200  # 每条候选展示的最大字符数
 
 
-def _is_user_message(m: Any) -> bool:
-    t = getattr(m, "type", "") or ""
-    return "human" in t.lower() or "user" in t.lower()
-
-
 def _build_dialogue_snippet(state: AgentState) -> str:
     """取最近 N 轮对话（只用于 Judge 语境，不需要完整历史）。"""
-    chat_buffer: List[Any] = list(
-        state.get("chat_buffer") or state.get("messages", [])[-JUDGE_RECENT_DIALOGUE_N * 2:]
-    )[-JUDGE_RECENT_DIALOGUE_N * 2:]
+    chat_buffer: List[Any] = recent_messages(state, JUDGE_RECENT_DIALOGUE_N * 2)
     lines: List[str] = []
     for m in chat_buffer:
-        role = "Human" if _is_user_message(m) else "AI"
+        role = "Human" if is_user_message(m) else "AI"
         content = (getattr(m, "content", "") or str(m)).strip()[:200]
         lines.append(f"{role}: {content}")
     return "\n".join(lines) if lines else "（无历史对话）"
@@ -124,13 +118,13 @@ def create_judge_node(llm_judge: Any) -> Callable[[AgentState], Dict[str, Any]]:
         _recent_bot_texts = [
             (getattr(m, "content", "") or str(m)).strip()
             for m in _chat_buf[-8:]
-            if not _is_user_message(m)
+            if not is_user_message(m)
         ][-4:]  # 最多看最近 2 轮 bot 自己的发言
         # 加入最近 1-2 条 Human（对方）消息，防止直接复述对方
         _recent_human_texts = [
             (getattr(m, "content", "") or str(m)).strip()
             for m in _chat_buf[-4:]
-            if _is_user_message(m)
+            if is_user_message(m)
         ][-2:]
         _recent_bot_texts = _recent_bot_texts + _recent_human_texts
         _repetition_warnings: List[str] = []
@@ -1,10 +1,11 @@
 """入口加载节点：优先从 DB 读取状态（Load Early），无 DB 时落本地文件（再无则回退内存）。"""
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
 import logging
 import math
 import os
 import asyncio
+import itertools
 from datetime import datetime, timezone, timedelta
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,8 @@ _TZ_CST = timezone(timedelta(hours=8))  # UTC+8 中国标准时间
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from app.state import AgentState
 
+from app.core.db.singleton import get_db_manager
+from app.services.memory.write_queue import memory_write_queue
 from app.prompts.prompt_utils import sanitize_memory_text, filter_retrieved_memories
 from utils.external_text import sanitize_external_text, detect_internal_leak
 from utils.prompt_helpers import knapp_baseline_momentum
@@ -90,6 +93,10 @@ def get_session_basic_info_pending_task_ids(user_basic_info: Dict[str, Any]) ->
 
 # 距上次消息超过此时长视为新 Session，按 Knapp 阶段重新初始化 conversation_momentum
 COLD_START_THRESHOLD_SEC = 4 * 3600  # 4 小时
+
+# 合并后 chat_buffer 上限：与 DB / LocalStore load_state 读取的最近 60 条窗口一致；
+# 更早的历史仍在库中，由 search_transcripts 按需召回
+CHAT_BUFFER_CAP = max(1, int(os.getenv("CHAT_BUFFER_CAP", "60")))
 # 短期离线残留：指数衰减系数 λ，M_init = M_last * exp(-λ * Δt)，Δt 单位为小时
 MOMENTUM_DECAY_LAMBDA = 0.5
 
@@ -214,13 +221,8 @@ def _ensure_messages_have_timestamp(messages: List[BaseMessage], default_ts: Opt
         if kwargs.get("timestamp"):
             out.append(msg)
             continue
-        new_kwargs = {**kwargs, "timestamp": ts}
-        if isinstance(msg, HumanMessage):
-            out.append(HumanMessage(content=msg.content, additional_kwargs=new_kwargs))
-        elif isinstance(msg, AIMessage):
-            out.append(AIMessage(content=msg.content, additional_kwargs=new_kwargs))
-        else:
-            out.append(SystemMessage(content=msg.content, additional_kwargs=new_kwargs))
+        # live 消息来自 state，不原地改；model_copy 为浅拷贝且不重新校验 content
+        out.append(msg.model_copy(update={"additional_kwargs": {**kwargs, "timestamp": ts}}))
     return out
 
 
@@ -236,50 +238,205 @@ def _merge_and_dedup_buffers(history: List[BaseMessage], live: List[BaseMessage]
         c = getattr(m, "content", str(m)) or ""
         return (str(t), str(c))
 
-    out: List[BaseMessage] = []
-    seen: set[tuple] = set()
-    for m in list(history or []) + list(live or []):
+    # 单趟遍历：chain 不物化中间列表；dict 保序且首条保留
+    seen: Dict[tuple, BaseMessage] = {}
+    for m in itertools.chain(history or (), live or ()):
         k = _key(m)
-        if k in seen:
+        if k not in seen:
+            seen[k] = m
+    return list(seen.values())
+
+
+_ROLE_MAP: Dict[type, str] = {HumanMessage: "user", AIMessage: "bot", SystemMessage: "bot"}
+
+
+def _role(msg: Any) -> str:
+    """常见消息类按类型查表；其它对象再退回 type 字段/类名判断。"""
+    r = _ROLE_MAP.get(type(msg))
+    if r is not None:
+        return r
+    t = str(getattr(msg, "type", "") or type(msg).__name__).lower()
+    return "user" if "human" in t or "user" in t else "bot"
+
+
+def _ts(msg: Any) -> str:
+    kwargs = getattr(msg, "additional_kwargs", None) or {}
+    t = kwargs.get("timestamp") or ""
+    return f" [{t}]" if t else ""
+
+
+def _format_chat(buf: List[BaseMessage], limit: int = 30) -> str:
+    lines = [
+        f"{'User' if _role(m) == 'user' else 'Bot'}{_ts(m)}: {getattr(m, 'content', str(m))}"
+        for m in (buf or [])[-limit:]
+    ]
+    return "\n".join(lines)
+
+
+def _build_memory_context(summary: str, retrieved: List[str], buf: List[BaseMessage]) -> str:
+    sections = (
+        "【近期压缩摘要】\n" + (summary.strip() if summary else "（无）"),
+        "【全量长期记忆召回片段】\n" + ("\n".join(f"- {x}" for x in retrieved) if retrieved else "（无）"),
+        "【当前会话原文窗口】\n" + (_format_chat(buf) if buf else "（无）"),
+    )
+    return "\n\n".join(sections).strip()
+
+
+def _format_retrieved_line(it: Dict[str, Any]) -> str:
+    """单条召回结果 -> 展示行。Store B 为 derived note，其余按 Store A transcript 处理。"""
+    get = it.get
+    if get("store") == "B":
+        return f"[B/{get('note_type') or 'note'}] {get('content') or ''} (src={get('source_pointer') or ''})".strip()
+    ctx = get("short_context") or get("topic") or ""
+    u = str(get("user_text") or "")[:60]
+    b = str(get("bot_text") or "")[:60]
+    return f"[A/{get('created_at')}] {ctx} U:{u} B:{b} (id=transcript:{get('id')})".strip()
+
+
+def _merge_retrieved_lines(notes: List[Dict[str, Any]], trans: List[Dict[str, Any]], limit: int = 8) -> List[str]:
+    """notes 在前、transcripts 在后，按展示行去重，最多 limit 条。"""
+    retrieved: List[str] = []
+    seen: set[str] = set()
+    for it in itertools.chain(notes, trans):
+        line = _format_retrieved_line(it)
+        if not line or line in seen:
             continue
-        seen.add(k)
-        out.append(m)
-    return out
+        seen.add(line)
+        retrieved.append(line)
+        if len(retrieved) >= limit:
+            break
+    return retrieved
+
 
 if TYPE_CHECKING:
     from app.services.memory.base import MemoryBase
 
 
-_DB_MANAGER = None
-
-
-def _get_db_manager():
+async def _finalize_loader_result(
+    state: Dict[str, Any],
+    data: Dict[str, Any],
+    *,
+    user_id: str,
+    bot_id: str,
+    user_input: str,
+    chat_buffer: List[BaseMessage],
+    search_notes: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+    search_transcripts: Callable[[str], Awaitable[List[Dict[str, Any]]]],
+    extra: Dict[str, Any],
+    source: str,
+) -> Dict[str, Any]:
     """
-    懒加载 DBManager。
-    - 未配置 DATABASE_URL 时返回 None
-    - 仅在 loader/writer 触发，符合“早读晚写”
+    DB / LocalStore 两条加载路径的共同收尾：合并缓冲、召回 Store A/B、组装 loader 输出。
+    data 为 load_state 结果；extra 为各后端特有的输出字段（relationship_id、任务池来源不同）。
     """
-    global _DB_MANAGER
-    if _DB_MANAGER is not None:
-        return _DB_MANAGER
-    if not os.getenv("DATABASE_URL"):
-        return None
-    try:
-        from app.core import DBManager
-
-        _DB_MANAGER = DBManager.from_env()
-        return _DB_MANAGER
-    except Exception:
-        return None
-
+    history = data.get("chat_buffer") or []
+    merged_buffer = _merge_and_dedup_buffers(list(history), list(chat_buffer))
+    if len(merged_buffer) > CHAT_BUFFER_CAP:
+        merged_buffer = merged_buffer[-CHAT_BUFFER_CAP:]
+    merged_buffer = _ensure_messages_have_timestamp(merged_buffer, state.get("current_time"))
+    summary = data.get("conversation_summary") or state.get("conversation_summary") or ""
+
+    # 上下文化 query：用户基本信息 + 当前问题 + 近期摘要（多维度召回）
+    user_basic = data.get("user_basic_info") or {}
+    user_profile_hints = []
+    if user_basic.get("name"):
+        user_profile_hints.append(f"名字：{user_basic['name']}")
+    if user_basic.get("occupation"):
+        user_profile_hints.append(f"职业：{user_basic['occupation']}")
+    if user_basic.get("age"):
+        user_profile_hints.append(f"年龄：{user_basic['age']}")
+    if user_basic.get("location"):
+        user_profile_hints.append(f"地区：{user_basic['location']}")
+
+    ctx_query_parts = [
+        "[用户基本信息]",
+        " | ".join(user_profile_hints) if user_profile_hints else "（暂无基本信息）",
+        "[当前消息]",
+        user_input,
+        "[最近对话摘要]",
+        summary if summary else "（暂无摘要）",
+    ]
+    ctx_query = "\n".join(ctx_query_parts).strip()
 
-def _run_async(coro):
-    """在同步节点里执行 async DB 调用。若运行在已有 event loop 中，请改用异步入口。"""
+    retrieved: List[str] = []
     try:
-        asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-    raise RuntimeError("Detected running event loop; please use an async graph entry (ainvoke) for DB operations.")
+        # Store A/B 召回互不依赖：并发发起，省一次往返
+        notes, trans = await asyncio.gather(
+            search_notes(ctx_query),
+            search_transcripts(ctx_query),
+            return_exceptions=True,
+        )
+        if isinstance(notes, BaseException):
+            logger.warning("[Loader] search_notes 失败（%s，忽略继续）: %s", source, notes)
+            notes = []
+        if isinstance(trans, BaseException):
+            logger.warning("[Loader] search_transcripts 失败（%s，忽略继续）: %s", source, trans)
+            trans = []
+        retrieved = _merge_retrieved_lines(notes, trans)
+    except Exception as e:
+        logger.warning("[Loader] 召回失败（%s，忽略继续）: %s", source, e)
+
+    # 记忆卫生：过滤“自称助手/AI”的模板片段，避免污染下游（inner_monologue/reasoner/planner）
+    summary_clean = sanitize_memory_text(summary)
+    retrieved_clean = filter_retrieved_memories(retrieved)
+    memory_context = _build_memory_context(summary_clean, retrieved_clean, merged_buffer)
+
+    seconds_since_last = _seconds_since_last_message(merged_buffer, user_input)
+    current_stage = data.get("current_stage") or state.get("current_stage") or "initiating"
+    conversation_momentum = _resolve_conversation_momentum(
+        seconds_since_last,
+        current_stage,
+        data.get("conversation_momentum") or state.get("conversation_momentum"),
+    )
+    # 消息间隔 >= 4 小时视为新 session，轮次从头计 0
+    new_session = seconds_since_last is None or seconds_since_last >= COLD_START_THRESHOLD_SEC
+    turn_count = 0 if new_session else int(data.get("turn_count_in_session") or 0)
+
+    daily_ctx = _load_daily_context(bot_id=bot_id)
+    out: Dict[str, Any] = {
+        "bot_id": bot_id,
+        "relationship_state": _ensure_rel_scale(data.get("relationship_state") or {}),  # 6D + rel_scale 缺省 0_1
+        "reply_duration_seconds_list": data.get("reply_duration_seconds_list") or [],
+        "mood_state": data.get("mood_state") or {},
+        "current_stage": current_stage,
+        "bot_basic_info": data.get("bot_basic_info") or state.get("bot_basic_info") or {},
+        "bot_big_five": data.get("bot_big_five") or state.get("bot_big_five") or {},
+        "bot_persona": data.get("bot_persona") or state.get("bot_persona") or {},
+        "user_basic_info": data.get("user_basic_info") or state.get("user_basic_info") or {},
+        "user_inferred_profile": data.get("user_inferred_profile") or state.get("user_inferred_profile") or {},
+        "relationship_assets": data.get("relationship_assets") or state.get("relationship_assets") or {},
+        "spt_info": data.get("spt_info") or state.get("spt_info") or {},
+        "conversation_summary": summary_clean,
+        "retrieved_memories": retrieved_clean,
+        "memory_context": memory_context,
+        "external_user_text": user_input,
+        "user_input": user_input,  # 向后兼容：下游请优先使用 external_user_text
+        "chat_buffer": merged_buffer,
+        "seconds_since_last_message": seconds_since_last,
+        "conversation_momentum": conversation_momentum,
+        "user_profile": data.get("user_inferred_profile") or {},
+        "memories": data.get("conversation_summary") or "",
+        "turn_count_in_session": turn_count,
+        "daily_topics": daily_ctx["topics"],
+        "bot_recent_activities": daily_ctx["bot_recent"],
+    }
+    out.update(extra)
+    tag = "[Loader]" if source == "DB" else "[Loader/Local]"
+    if new_session:
+        ra = dict(out.get("relationship_assets") or {})
+        ra["session_basic_info_pending_task_ids"] = get_session_basic_info_pending_task_ids(
+            out.get("user_basic_info") or {}
+        )
+        out["relationship_assets"] = ra
+        logger.info("%s new_session=True, basic_info_tasks=%s", tag, ra["session_basic_info_pending_task_ids"])
+    else:
+        logger.info(
+            "%s new_session=False, existing_basic_info_tasks=%s",
+            tag,
+            (out.get("relationship_assets") or {}).get("session_basic_info_pending_task_ids"),
+        )
+    _apply_busy_fallback_to_output(out, state)
+    return out
 
 
 def create_loader_node(memory_service: "MemoryBase") -> Callable[[AgentState], dict]:
@@ -299,275 +456,56 @@ def create_loader_node(memory_service: "MemoryBase") -> Callable[[AgentState], d
             user_input = ""
         chat_buffer = state.get("chat_buffer") or messages
 
-        def _role(msg) -> str:
-            if hasattr(msg, "type"):
-                t = getattr(msg, "type", "") or ""
-                return "user" if "human" in t.lower() or "user" in t.lower() else "bot"
-            return "user" if "user" in str(type(msg)).lower() else "bot"
-
-        def _ts(msg) -> str:
-            kwargs = getattr(msg, "additional_kwargs", None) or {}
-            t = kwargs.get("timestamp") or ""
-            return f" [{t}]" if t else ""
-
-        def _format_chat(buf: List[BaseMessage], limit: int = 30) -> str:
-            lines = [
-                f"{'User' if _role(m) == 'user' else 'Bot'}{_ts(m)}: {getattr(m, 'content', str(m))}"
-                for m in (buf or [])[-limit:]
-            ]
-            return "\n".join(lines)
-
-        def _build_memory_context(summary: str, retrieved: List[str], buf: List[BaseMessage]) -> str:
-            parts: List[str] = []
-            parts.append("【近期压缩摘要】")
-            parts.append(summary.strip() if summary else "（无）")
-            parts.append("")
-            parts.append("【全量长期记忆召回片段】")
-            if retrieved:
-                parts.extend([f"- {x}" for x in retrieved])
-            else:
-                parts.append("（无）")
-            parts.append("")
-            parts.append("【当前会话原文窗口】")
-            parts.append(_format_chat(buf) if buf else "（无）")
-            return "\n".join(parts).strip()
-
-        db = _get_db_manager()
+        db = get_db_manager()
         if db:
             bot_id = state.get("bot_id") or (state.get("bot_basic_info") or {}).get("name") or "default_bot"
+            # 上一轮 memory_writer 若走后台落盘，先等它提交，避免读到旧状态
+            await memory_write_queue.drain(f"{user_id}:{bot_id}")
             db_data: Dict[str, Any] = await db.load_state(str(user_id), str(bot_id))
             bot_name = (db_data.get("bot_basic_info") or {}).get("name") or "?"
             user_name = (db_data.get("user_basic_info") or {}).get("name") or "?"
             logger.info("[Loader] 从 DB 加载 user_id=%s, bot_id=%s, bot_name=%s, user_name=%s", user_id, bot_id, bot_name, user_name)
-            history = db_data.get("chat_buffer") or []
-            merged_buffer = _merge_and_dedup_buffers(list(history), list(chat_buffer))
-            merged_buffer = _ensure_messages_have_timestamp(merged_buffer, state.get("current_time"))
-            summary = db_data.get("conversation_summary") or state.get("conversation_summary") or ""
-
-            # 上下文化 query：用户基本信息 + 当前问题 + 近期摘要（多维度召回）
-            user_basic = db_data.get("user_basic_info") or {}
-            user_profile_hints = []
-            if user_basic.get("name"):
-                user_profile_hints.append(f"名字：{user_basic['name']}")
-            if user_basic.get("occupation"):
-                user_profile_hints.append(f"职业：{user_basic['occupation']}")
-            if user_basic.get("age"):
-                user_profile_hints.append(f"年龄：{user_basic['age']}")
-            if user_basic.get("location"):
-                user_profile_hints.append(f"地区：{user_basic['location']}")
-
-            ctx_query_parts = [
-                "[用户基本信息]",
-                " | ".join(user_profile_hints) if user_profile_hints else "（暂无基本信息）",
-                "[当前消息]",
-                user_input,
-                "[最近对话摘要]",
-                summary if summary else "（暂无摘要）",
-            ]
-            ctx_query = "\n".join(ctx_query_parts).strip()
-
-            retrieved: List[str] = []
-            try:
-                rel_id = str(db_data.get("relationship_id") or "")
-                notes = await db.search_notes(relationship_id=rel_id, query=ctx_query, limit=6)
-                trans = await db.search_transcripts(relationship_id=rel_id, query=ctx_query, limit=6)
-                merged_items = list(notes) + list(trans)
-                seen: set[str] = set()
-                for it in merged_items:
-                    if it.get("store") == "B":
-                        line = f"[B/{it.get('note_type') or 'note'}] {it.get('content') or ''} (src={it.get('source_pointer') or ''})"
-                    else:
-                        ctx = it.get("short_context") or it.get("topic") or ""
-                        u = str(it.get("user_text") or "")[:60]
-                        b = str(it.get("bot_text") or "")[:60]
-                        line = f"[A/{it.get('created_at')}] {ctx} U:{u} B:{b} (id=transcript:{it.get('id')})"
-                    line = line.strip()
-                    if not line or line in seen:
-                        continue
-                    seen.add(line)
-                    retrieved.append(line)
-                    if len(retrieved) >= 8:
-                        break
-            except Exception as e:
-                logger.warning("[Loader] 召回失败（DB，忽略继续）: %s", e)
-
-            memory_context = _build_memory_context(summary, retrieved, merged_buffer)
-
-            # 记忆卫生：过滤“自称助手/AI”的模板片段，避免污染下游（inner_monologue/reasoner/planner）
-            summary_clean = sanitize_memory_text(summary)
-            retrieved_clean = filter_retrieved_memories(retrieved)
-
-            seconds_since_last = _seconds_since_last_message(merged_buffer, user_input)
-            current_stage = db_data.get("current_stage") or state.get("current_stage") or "initiating"
-            conversation_momentum = _resolve_conversation_momentum(
-                seconds_since_last,
-                current_stage,
-                db_data.get("conversation_momentum") or state.get("conversation_momentum"),
+            rel_id = str(db_data.get("relationship_id") or "")
+            return await _finalize_loader_result(
+                state,
+                db_data,
+                user_id=str(user_id),
+                bot_id=str(bot_id),
+                user_input=user_input,
+                chat_buffer=chat_buffer,
+                search_notes=lambda q: db.search_notes(relationship_id=rel_id, query=q, limit=6),
+                search_transcripts=lambda q: db.search_transcripts(relationship_id=rel_id, query=q, limit=6),
+                extra={
+                    "relationship_id": rel_id,
+                    # 任务池（供 planner/evolver 使用）：必须从 DB 透传回来，否则会一直是空
+                    "bot_task_list": db_data.get("bot_task_list") or state.get("bot_task_list") or [],
+                    "current_session_tasks": db_data.get("current_session_tasks") or state.get("current_session_tasks") or [],
+                },
+                source="DB",
             )
-            # 消息间隔 >= 4 小时视为新 session，轮次从头计 0
-            new_session = seconds_since_last is None or seconds_since_last >= COLD_START_THRESHOLD_SEC
-            turn_count = 0 if new_session else int(db_data.get("turn_count_in_session") or 0)
-
-            out = {
-                "bot_id": str(bot_id),
-                "relationship_id": str(db_data.get("relationship_id") or ""),
-                "relationship_state": _ensure_rel_scale(db_data.get("relationship_state") or {}),  # 6D + rel_scale 缺省 0_1
-                "reply_duration_seconds_list": db_data.get("reply_duration_seconds_list") or [],
-                "mood_state": db_data.get("mood_state") or {},
-                "current_stage": current_stage,
-                "bot_basic_info": db_data.get("bot_basic_info") or state.get("bot_basic_info") or {},
-                "bot_big_five": db_data.get("bot_big_five") or state.get("bot_big_five") or {},
-                "bot_persona": db_data.get("bot_persona") or state.get("bot_persona") or {},
-                "user_basic_info": db_data.get("user_basic_info") or state.get("user_basic_info") or {},
-                "user_inferred_profile": db_data.get("user_inferred_profile") or state.get("user_inferred_profile") or {},
-                "relationship_assets": db_data.get("relationship_assets") or state.get("relationship_assets") or {},
-                "spt_info": db_data.get("spt_info") or state.get("spt_info") or {},
-                "conversation_summary": summary_clean,
-                "retrieved_memories": retrieved_clean,
-                "memory_context": _build_memory_context(summary_clean, retrieved_clean, merged_buffer),
-                # 任务池（供 planner/evolver 使用）：必须从 DB 透传回来，否则会一直是空
-                "bot_task_list": db_data.get("bot_task_list") or state.get("bot_task_list") or [],
-                "current_session_tasks": db_data.get("current_session_tasks") or state.get("current_session_tasks") or [],
-                "external_user_text": user_input,
-                "user_input": user_input,  # 向后兼容：下游请优先使用 external_user_text
-                "chat_buffer": merged_buffer,
-                "seconds_since_last_message": seconds_since_last,
-                "conversation_momentum": conversation_momentum,
-                "user_profile": db_data.get("user_inferred_profile") or {},
-                "memories": db_data.get("conversation_summary") or "",
-                "turn_count_in_session": turn_count,
-                "daily_topics": _load_daily_topics(),
-            }
-            _ctx = _load_daily_context(bot_id=str(bot_id))
-            out["daily_topics"] = _ctx["topics"]
-            out["bot_recent_activities"] = _ctx["bot_recent"]
-            if new_session:
-                ra = dict(out.get("relationship_assets") or {})
-                ra["session_basic_info_pending_task_ids"] = get_session_basic_info_pending_task_ids(
-                    out.get("user_basic_info") or {}
-                )
-                out["relationship_assets"] = ra
-                print(f"[Loader] new_session=True, basic_info_tasks={ra['session_basic_info_pending_task_ids']}")
-            else:
-                _existing_tasks = (out.get("relationship_assets") or {}).get("session_basic_info_pending_task_ids")
-                print(f"[Loader] new_session=False, existing_basic_info_tasks={_existing_tasks}")
-            _apply_busy_fallback_to_output(out, state)
-            return out
 
         try:
             from app.core import LocalStoreManager
             store = LocalStoreManager()
             bot_id = state.get("bot_id") or (state.get("bot_basic_info") or {}).get("name") or "default_bot"
             local_data: Dict[str, Any] = store.load_state(str(user_id), str(bot_id))
-            history = local_data.get("chat_buffer") or []
-            merged_buffer = _merge_and_dedup_buffers(list(history), list(chat_buffer))
-            merged_buffer = _ensure_messages_have_timestamp(merged_buffer, state.get("current_time"))
-            summary = local_data.get("conversation_summary") or state.get("conversation_summary") or ""
-
-            # 上下文化 query：用户基本信息 + 当前问题 + 近期摘要（多维度召回）
-            user_basic = local_data.get("user_basic_info") or {}
-            user_profile_hints = []
-            if user_basic.get("name"):
-                user_profile_hints.append(f"名字：{user_basic['name']}")
-            if user_basic.get("occupation"):
-                user_profile_hints.append(f"职业：{user_basic['occupation']}")
-            if user_basic.get("age"):
-                user_profile_hints.append(f"年龄：{user_basic['age']}")
-            if user_basic.get("location"):
-                user_profile_hints.append(f"地区：{user_basic['location']}")
-
-            ctx_query_parts = [
-                "[用户基本信息]",
-                " | ".join(user_profile_hints) if user_profile_hints else "（暂无基本信息）",
-                "[当前消息]",
-                user_input,
-                "[最近对话摘要]",
-                summary if summary else "（暂无摘要）",
-            ]
-            ctx_query = "\n".join(ctx_query_parts).strip()
-            retrieved: List[str] = []
-            try:
-                notes = store.search_notes(str(user_id), str(bot_id), ctx_query, limit=6)
-                trans = store.search_transcripts(str(user_id), str(bot_id), ctx_query, limit=6)
-                merged_items = list(notes) + list(trans)
-                seen: set[str] = set()
-                for it in merged_items:
-                    if it.get("store") == "B":
-                        line = f"[B/{it.get('note_type') or 'note'}] {it.get('content') or ''} (src={it.get('source_pointer') or ''})"
-                    else:
-                        ctx = it.get("short_context") or it.get("topic") or ""
-                        u = str(it.get("user_text") or "")[:60]
-                        b = str(it.get("bot_text") or "")[:60]
-                        line = f"[A/{it.get('created_at')}] {ctx} U:{u} B:{b} (id=transcript:{it.get('id')})"
-                    line = line.strip()
-                    if not line or line in seen:
-                        continue
-                    seen.add(line)
-                    retrieved.append(line)
-                    if len(retrieved) >= 8:
-                        break
-            except Exception as e:
-                logger.warning("[Loader] 召回失败（LocalStore，忽略继续）: %s", e)
-
-            memory_context = _build_memory_context(summary, retrieved, merged_buffer)
-
-            summary_clean = sanitize_memory_text(summary)
-            retrieved_clean = filter_retrieved_memories(retrieved)
-
-            seconds_since_last = _seconds_since_last_message(merged_buffer, user_input)
-            current_stage = local_data.get("current_stage") or state.get("current_stage") or "initiating"
-            conversation_momentum = _resolve_conversation_momentum(
-                seconds_since_last,
-                current_stage,
-                local_data.get("conversation_momentum") or state.get("conversation_momentum"),
+            local_assets = local_data.get("relationship_assets") or {}
+            return await _finalize_loader_result(
+                state,
+                local_data,
+                user_id=str(user_id),
+                bot_id=str(bot_id),
+                user_input=user_input,
+                chat_buffer=chat_buffer,
+                # 本地 jsonl 读取放到线程池并发执行，避免阻塞事件循环
+                search_notes=lambda q: asyncio.to_thread(store.search_notes, str(user_id), str(bot_id), q, limit=6),
+                search_transcripts=lambda q: asyncio.to_thread(store.search_transcripts, str(user_id), str(bot_id), q, limit=6),
+                extra={
+                    "bot_task_list": local_assets.get("bot_task_list") or [],
+                    "current_session_tasks": local_assets.get("current_session_tasks") or [],
+                },
+                source="LocalStore",
             )
-            # 消息间隔 >= 4 小时视为新 session，轮次从头计 0
-            new_session = seconds_since_last is None or seconds_since_last >= COLD_START_THRESHOLD_SEC
-            turn_count = 0 if new_session else int(local_data.get("turn_count_in_session") or 0)
-
-            out = {
-                "bot_id": str(bot_id),
-                "relationship_state": _ensure_rel_scale(local_data.get("relationship_state") or {}),  # 6D + rel_scale 缺省 0_1
-                "reply_duration_seconds_list": local_data.get("reply_duration_seconds_list") or [],
-                "mood_state": local_data.get("mood_state") or {},
-                "current_stage": current_stage,
-                "bot_basic_info": local_data.get("bot_basic_info") or state.get("bot_basic_info") or {},
-                "bot_big_five": local_data.get("bot_big_five") or state.get("bot_big_five") or {},
-                "bot_persona": local_data.get("bot_persona") or state.get("bot_persona") or {},
-                "user_basic_info": local_data.get("user_basic_info") or state.get("user_basic_info") or {},
-                "user_inferred_profile": local_data.get("user_inferred_profile") or state.get("user_inferred_profile") or {},
-                "relationship_assets": local_data.get("relationship_assets") or state.get("relationship_assets") or {},
-                "bot_task_list": (local_data.get("relationship_assets") or {}).get("bot_task_list") or [],
-                "current_session_tasks": (local_data.get("relationship_assets") or {}).get("current_session_tasks") or [],
-                "spt_info": local_data.get("spt_info") or state.get("spt_info") or {},
-                "conversation_summary": summary_clean,
-                "retrieved_memories": retrieved_clean,
-                "memory_context": _build_memory_context(summary_clean, retrieved_clean, merged_buffer),
-                "external_user_text": user_input,
-                "user_input": user_input,
-                "chat_buffer": merged_buffer,
-                "seconds_since_last_message": seconds_since_last,
-                "conversation_momentum": conversation_momentum,
-                "user_profile": local_data.get("user_inferred_profile") or {},
-                "memories": local_data.get("conversation_summary") or "",
-                "turn_count_in_session": turn_count,
-                "daily_topics": _load_daily_topics(),
-            }
-            _ctx2 = _load_daily_context(bot_id=str(bot_id))
-            out["daily_topics"] = _ctx2["topics"]
-            out["bot_recent_activities"] = _ctx2["bot_recent"]
-            if new_session:
-                ra = dict(out.get("relationship_assets") or {})
-                ra["session_basic_info_pending_task_ids"] = get_session_basic_info_pending_task_ids(
-                    out.get("user_basic_info") or {}
-                )
-                out["relationship_assets"] = ra
-                print(f"[Loader/Local] new_session=True, basic_info_tasks={ra['session_basic_info_pending_task_ids']}")
-            else:
-                _existing_tasks = (out.get("relationship_assets") or {}).get("session_basic_info_pending_task_ids")
-                print(f"[Loader/Local] new_session=False, existing_basic_info_tasks={_existing_tasks}")
-            _apply_busy_fallback_to_output(out, state)
-            return out
         except Exception:
             pass
 
@@ -17,8 +17,9 @@ from __future__ import annotations
 import logging
 import math
 import random
-import re
 from datetime import datetime
+from functools import cached_property
+from operator import itemgetter
 from typing import Any, Callable, Dict, List, Tuple
 
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -59,19 +60,53 @@ BASE_TYPING_SPEED = 1.8
 MIN_BUBBLE_LENGTH = 2
 MIN_SEGMENT_DELAY_SECONDS = 1.2
 
+# 由上面的常量派生，模块加载时算一次
+_SLEEP_START = float(BOT_SCHEDULE["sleep_start"])
+_SLEEP_END = float(BOT_SCHEDULE["sleep_end"])
+_SCHEDULE_LINE = f"作息: {BOT_SCHEDULE.get('sleep_start', 23)}:00 入睡, {BOT_SCHEDULE.get('sleep_end', 7)}:00 起床"
+_LOG_BUSY_MEDIAN_SECONDS = math.log(3600.0)  # busy 缺席 lognormal 的中位数 1h
+# stage → (延迟倍率, ghosting 基础概率)：一次查表代替两处分派
+_STAGE_GHOST_BASE: Dict[str, float] = {"stagnating": 0.50, "avoiding": 0.65, "terminating": 0.65}
+_STAGE_TABLE: Dict[str, Tuple[float, float]] = {
+    stage: (factor, _STAGE_GHOST_BASE.get(stage, 0.0)) for stage, factor in STAGE_DELAY_FACTORS.items()
+}
+_STAGE_TABLE_DEFAULT: Tuple[float, float] = (1.0, 0.0)
+
+
+# 碎片化倾向 frag 的线性权重：Big5 直接加权，PAD / 忙碌 / 关系维度经 _extreme_deadzone 后按 (lo, hi) 加权
+_FRAG_BASE = 0.05
+_FRAG_W_E, _FRAG_W_C, _FRAG_W_N = 1.10, -0.60, 0.55
+_FRAG_DEADZONE_WEIGHTS: Tuple[Tuple[float, float], ...] = (
+    (-0.15, 0.25),   # arousal
+    (0.15, -0.05),   # pleasure
+    (0.10, -0.05),   # dominance
+    (0.0, -0.20),    # busyness（只看高端）
+    (-0.12, 0.22),   # closeness
+    (-0.06, 0.12),   # trust
+    (-0.07, 0.14),   # liking
+    (0.05, -0.10),   # respect
+    (0.08, -0.08),   # power
+)
+
+
+_TRAILING_PUNCT = "，。,.．"
+_TRAILING_PUNCT_CHARS = frozenset(_TRAILING_PUNCT)
+
 
 def _strip_trailing_sentence_punct(text: str) -> str:
     """去掉句尾的逗号、句号（中文/英文），避免气泡末尾出现「……枝叶，」这类问题。问号保留。"""
     if not text or not isinstance(text, str):
         return text
     s = text.rstrip()
-    while s and s[-1] in "，。,.．":
-        s = s[:-1].rstrip()
+    # 绝大多数气泡句尾不是逗号/句号：单次集合判断即跳过循环；否则整段 rstrip 标点 / 空白，不再逐字切片
+    while s and s[-1] in _TRAILING_PUNCT_CHARS:
+        s = s.rstrip(_TRAILING_PUNCT).rstrip()
     return s
 
 
 def _clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
+    # 纯比较分支，省去 min/max 两次内建调用；NaN 与原 max(lo, min(hi, x)) 一样落到 hi
+    return x if lo <= x <= hi else (lo if x < lo else hi)
 
 def _clip01(x: Any) -> float:
     try:
@@ -94,57 +129,160 @@ def _pad_to_01(v: Any, *, pad_scale: str = "m1_1", default: float = 0.5) -> floa
         return _clip01(x)
     return _clip01((x + 1.0) / 2.0)
 
-def _extreme_deadzone(x01: float, *, low: float = 0.2, high: float = 0.8) -> Tuple[float, float]:
+def _deadzone01(x: float, lo: float = 0.2, hi: float = 0.8) -> Tuple[float, float]:
+    """纯 float 内核：调用方保证 x∈[0,1]、0≤lo<hi≤1，不再做类型转换与夹取。"""
+    if x <= lo: return (0.0 if lo <= 0.0 else (lo - x) / lo), 0.0
+    if x >= hi: return 0.0, (0.0 if hi >= 1.0 else (x - hi) / (1.0 - hi))
+    return 0.0, 0.0
+
+def _extreme_deadzone(x01: Any, *, low: float = 0.2, high: float = 0.8) -> Tuple[float, float]:
     x = _clip01(x01)
+    if low == 0.2 and high == 0.8:
+        return _deadzone01(x)
     lo = _clip01(low)
     hi = _clip01(high)
     if hi <= lo: lo, hi = 0.2, 0.8
-    if x <= lo: return (0.0 if lo <= 0.0 else (lo - x) / lo), 0.0
-    if x >= hi: return 0.0, (0.0 if hi >= 1.0 else (x - hi) / (1.0 - hi))
-    return 0.0, 0.0
+    return _deadzone01(x, lo, hi)
+
+def _fallback_latency(
+    read_chars: int, reply_chars: int, speed_factor: float, noise_level: float, rng: random.Random
+) -> Tuple[float, float, float]:
+    """兜底气泡的微观延迟，一次算完 (t_read, t_think, t_type)，全部为 float 运算。"""
+    t_read = 0.5 + read_chars * AVG_READING_SPEED
+    t_think = (1.0 + reply_chars * 0.02) * speed_factor * _clamp(rng.gauss(1.0, noise_level), 0.5, 2.0)
+    if reply_chars:
+        typing_speed = _clamp(BASE_TYPING_SPEED / speed_factor, 0.5, 30.0)
+        t_type = _clamp(reply_chars / typing_speed * rng.uniform(0.9, 1.1), 0.05, 60.0)
+    else:
+        t_type = 0.05
+    return t_read, t_think, t_type
+
+def _humanized_output(
+    segments: List[ResponseSegment],
+    total_latency: float,
+    *,
+    is_macro: bool,
+    macro_delay: float,
+    macro_reason: float,
+    t_read: float = 0.0,
+    t_think: float = 0.0,
+) -> HumanizedOutput:
+    """LLM 路径与兜底路径共用的 HumanizedOutput 组装。"""
+    total = round(total_latency, 2)
+    return {
+        "total_latency_seconds": total,
+        "segments": segments,
+        "is_macro_delay": is_macro,
+        "total_latency_simulated": total,
+        "latency_breakdown": {
+            "macro_delay": round(macro_delay, 3),
+            "t_read": round(t_read, 3),
+            "t_think": round(t_think, 3),
+            "macro_reason": macro_reason,
+        },
+    }
+
+_STAGE_FORMALITY: Dict[str, float] = {
+    "initiating": 0.75, "experimenting": 0.60, "intensifying": 0.40,
+    "integrating": 0.45, "bonding": 0.35, "differentiating": 0.60,
+    "circumscribing": 0.70, "stagnating": 0.80, "avoiding": 0.85,
+    "terminating": 0.85,
+}
 
 def _estimate_formality(state: Dict[str, Any]) -> float:
     rel = state.get("relationship_state") or {}
-    stage = str(state.get("current_stage") or "experimenting")
+    stage = state.get("current_stage") or "experimenting"
+    if type(stage) is not str:
+        stage = str(stage)
     closeness = _clip01(rel.get("closeness", 0.5) or 0.5)
     respect = _clip01(rel.get("respect", 0.5) or 0.5)
 
-    stage_formality_map = {
-        "initiating": 0.75, "experimenting": 0.60, "intensifying": 0.40,
-        "integrating": 0.45, "bonding": 0.35, "differentiating": 0.60,
-        "circumscribing": 0.70, "stagnating": 0.80, "avoiding": 0.85,
-        "terminating": 0.85,
-    }
-    stage_formality = float(stage_formality_map.get(stage, 0.55))
-    f = 0.45 * stage_formality + 0.40 * (1.0 - float(closeness)) + 0.15 * float(respect)
-    return _clamp(float(f), 0.0, 1.0)
+    return _formality01(stage, closeness, respect)
+
+def _formality01(stage: str, closeness: float, respect: float) -> float:
+    stage_formality = float(_STAGE_FORMALITY.get(stage, 0.55))
+    f = 0.45 * stage_formality + 0.40 * (1.0 - closeness) + 0.15 * respect
+    return _clamp(f, 0.0, 1.0)
 
 def _estimate_end_punct_ratio(formality01: float) -> float:
     return _clamp(0.08 + 0.22 * float(formality01), 0.05, 0.35)
 
 
+# 分段 prompt 的 Current State 只注入这些字段（mood_state / relationship_state 可能带 pad_scale、旧字段等无关内容）
+_PROMPT_MOOD_KEYS = ("pleasure", "arousal", "dominance", "busyness")
+_PROMPT_REL_KEYS = ("closeness", "trust", "liking", "respect", "attractiveness", "power")
+
+
+def _prompt_fields(d: Any, keys: Tuple[str, ...]) -> Dict[str, Any]:
+    """按固定 key 顺序取出非空字段，供 prompt 内联展示。"""
+    if not isinstance(d, dict):
+        return {}
+    return {k: d[k] for k in keys if d.get(k) is not None}
+
+
+# 缺省值只构造一次（只读，不要原地修改）
+_DEFAULT_BIG5: Dict[str, float] = {"extraversion": 0.0, "conscientiousness": 0.0, "neuroticism": 0.0}
+_DEFAULT_MOOD: Dict[str, float] = {"arousal": 0.0, "busyness": 0.0, "pleasure": 0.0}
+_DEFAULT_REL: Dict[str, float] = {"closeness": 0.5, "power": 0.5}
+
+_DYN_BIG5_KEYS = ("extraversion", "conscientiousness", "neuroticism")
+_DYN_REL_KEYS = ("closeness", "trust", "liking", "respect", "power")
+_DYN_MOOD_KEYS = ("pleasure", "arousal", "dominance", "busyness")
+# 缺省值合并后一次 itemgetter 取齐（缺键 → 缺省值；None/0 由调用处 `or` 兜底）
+_DYN_BIG5_DEFAULTS = dict.fromkeys(_DYN_BIG5_KEYS, 0.0)
+_DYN_REL_DEFAULTS = dict.fromkeys(_DYN_REL_KEYS, 0.5)
+_DYN_MOOD_DEFAULTS = dict.fromkeys(_DYN_MOOD_KEYS, 0.0)
+_get_big5 = itemgetter(*_DYN_BIG5_KEYS)
+_get_rel = itemgetter(*_DYN_REL_KEYS)
+_get_mood = itemgetter(*_DYN_MOOD_KEYS)
+
+
 class HumanizationProcessor:
     def __init__(self, state: AgentState):
         self.state = state
-        self.big5 = state.get("bot_big_five", {"extraversion": 0.0, "conscientiousness": 0.0, "neuroticism": 0.0})
-        self.mood = state.get("mood_state", {"arousal": 0.0, "busyness": 0.0, "pleasure": 0.0})
-        self.rel = state.get("relationship_state", {"closeness": 0.5, "power": 0.5})
-        self.stage = str(state.get("current_stage", "experimenting"))
+        self.big5 = state.get("bot_big_five", _DEFAULT_BIG5)
+        self.mood = state.get("mood_state", _DEFAULT_MOOD)
+        self.rel = state.get("relationship_state", _DEFAULT_REL)
+        # 空值与 _estimate_formality 一致回落到 experimenting；Knapp 阶段标签本就是 str，跳过 str() 转换
+        stage = state.get("current_stage") or "experimenting"
+        self.stage = stage if type(stage) is str else str(stage)
         self.current_time_str = str(state.get("current_time") or "")
+        # 文本输入只读取/转换一次，_msg_signals、兜底与 LLM 分段门槛共用
+        self.user_input = str(state.get("user_input") or "")
+        self.final_response = str(state.get("final_response") or state.get("draft_response") or "").strip()
+        # 每个实例独立的随机源：并发轮次之间不共享模块级 random 的状态
+        self._rng = random.Random()
+
+        # calculate_dynamics_modifiers 的输入一次解包成属性
+        big5, rel = self.big5, self.rel
+        self._e, self._c, self._n = [_clip01(v or 0.0) for v in _get_big5({**_DYN_BIG5_DEFAULTS, **big5})]
+        self._closeness, self._trust, self._liking, self._respect, self._power = [
+            _clip01(v or 0.5) for v in _get_rel({**_DYN_REL_DEFAULTS, **rel})
+        ]
+        self._stage_factor, self._ghost_base = _STAGE_TABLE.get(self.stage, _STAGE_TABLE_DEFAULT)
+
+    @cached_property
+    def _now(self) -> datetime:
+        """current_time 只在 calculate_absence 用到：首次访问时解析一次，LLM 成功的轮次不解析。"""
+        if self.current_time_str:
+            try:
+                return datetime.fromisoformat(self.current_time_str)
+            except ValueError:
+                pass
+        return datetime.now()
 
     def calculate_dynamics_modifiers(self) -> Dict[str, float]:
         """计算底层动态参数供 LLM 和后续逻辑使用"""
-        e = _clip01(self.big5.get("extraversion", 0.0) or 0.0)
-        c = _clip01(self.big5.get("conscientiousness", 0.0) or 0.0)
-        n = _clip01(self.big5.get("neuroticism", 0.0) or 0.0)
+        e, c, n = self._e, self._c, self._n
 
         pad_scale = "m1_1"
         if self.mood.get("pad_scale") in ("m1_1", "0_1"):
             pad_scale = self.mood["pad_scale"]
 
-        P_raw = float(self.mood.get("pleasure", 0.0) or 0.0)
-        A_raw = float(self.mood.get("arousal", 0.0) or 0.0)
-        D_raw = float(self.mood.get("dominance", 0.0) or 0.0)
+        P_raw, A_raw, D_raw, busy_raw = _get_mood({**_DYN_MOOD_DEFAULTS, **self.mood})
+        P_raw = float(P_raw or 0.0)
+        A_raw = float(A_raw or 0.0)
+        D_raw = float(D_raw or 0.0)
 
         pleasure01 = _pad_to_01(P_raw, pad_scale=pad_scale)
         arousal01 = _pad_to_01(A_raw, pad_scale=pad_scale)
@@ -153,66 +291,45 @@ class HumanizationProcessor:
         if pleasure01 == 0.0 and arousal01 == 0.0 and dominance01 == 0.0:
             pleasure01 = arousal01 = dominance01 = 0.5
 
-        busy = _clip01(self.mood.get("busyness", 0.0) or 0.0)
+        busy = _clip01(busy_raw or 0.0)
 
-        closeness = _clip01(self.rel.get("closeness", 0.5) or 0.5)
-        trust = _clip01(self.rel.get("trust", 0.5) or 0.5)
-        liking = _clip01(self.rel.get("liking", 0.5) or 0.5)
-        respect = _clip01(self.rel.get("respect", 0.5) or 0.5)
-        power = _clip01(self.rel.get("power", 0.5) or 0.5)
+        closeness, trust, liking, respect, power = (
+            self._closeness, self._trust, self._liking, self._respect, self._power
+        )
 
         p_speed = 1.0 - (e * 0.2)
         p_caution = 1.0 + (c * 0.3)
         p_noise = 0.1 + (max(0.0, n) * 0.4)
 
-        m_arousal_boost = 1.0 - (float(arousal01) * 0.3)
+        m_arousal_boost = 1.0 - (arousal01 * 0.3)
         m_busyness_drag = 1.0 + (busy * 1.5)
 
-        stage_factor = float(STAGE_DELAY_FACTORS.get(self.stage, 1.0))
+        stage_factor = self._stage_factor
         total_speed_factor = p_speed * p_caution * m_arousal_boost * m_busyness_drag * stage_factor
 
-        frag = 0.05
-        frag += 1.10 * float(e)
-        frag += -0.60 * float(c)
-        frag += 0.55 * float(n)
-
-        ar_lo, ar_hi = _extreme_deadzone(float(arousal01))
-        p_lo, p_hi = _extreme_deadzone(float(pleasure01))
-        d_lo, d_hi = _extreme_deadzone(float(dominance01))
-        _, busy_hi = _extreme_deadzone(float(busy))
-
-        frag += 0.25 * ar_hi + (-0.15) * ar_lo
-        frag += 0.15 * p_lo + (-0.05) * p_hi
-        frag += 0.10 * d_lo + (-0.05) * d_hi
-        frag += (-0.20) * busy_hi
-
-        clo_lo, clo_hi = _extreme_deadzone(float(closeness))
-        tru_lo, tru_hi = _extreme_deadzone(float(trust))
-        lik_lo, lik_hi = _extreme_deadzone(float(liking))
-        res_lo, res_hi = _extreme_deadzone(float(respect))
-        pow_lo, pow_hi = _extreme_deadzone(float(power))
-
-        frag += 0.22 * clo_hi + (-0.12) * clo_lo
-        frag += 0.12 * tru_hi + (-0.06) * tru_lo
-        frag += 0.14 * lik_hi + (-0.07) * lik_lo
-        frag += (-0.10) * res_hi + 0.05 * res_lo
-        frag += 0.08 * pow_lo + (-0.08) * pow_hi
+        frag = _FRAG_BASE + _FRAG_W_E * e + _FRAG_W_C * c + _FRAG_W_N * n
+        dims = (arousal01, pleasure01, dominance01, busy, closeness, trust, liking, respect, power)
+        for x01, (w_lo, w_hi) in zip(dims, _FRAG_DEADZONE_WEIGHTS):
+            lo, hi = _deadzone01(x01)  # 各维度上面已 _clip01 / _pad_to_01 到 [0,1]
+            frag += w_hi * hi + w_lo * lo
 
         frag_tendency = _clip01(frag)
         momentum = _clip01(float(self.state.get("conversation_momentum", 1.0) or 1.0))
         frag_tendency *= momentum
 
         return {
-            "speed_factor": _clamp(float(total_speed_factor), 0.2, 5.0),
-            "fragmentation_tendency": _clamp(float(frag_tendency), 0.0, 1.0),
-            "noise_level": _clamp(float(p_noise), 0.05, 0.8),
-            "pleasure": _clamp(float(P_raw), -1.0, 1.0),
+            "speed_factor": _clamp(total_speed_factor, 0.2, 5.0),
+            "fragmentation_tendency": _clamp(frag_tendency, 0.0, 1.0),
+            "noise_level": _clamp(p_noise, 0.05, 0.8),
+            "pleasure": _clamp(P_raw, -1.0, 1.0),
             "stage_factor": stage_factor,
+            # 复用本实例已解包的关系维度，prompt 构建时不再从 state 重新提取
+            "formality": _formality01(self.stage, closeness, respect),
         }
 
     def _msg_signals(self) -> Dict[str, Any]:
         """从 user_input 提取消息内容信号（无 LLM，纯文本特征）。"""
-        text = str(self.state.get("user_input") or "")
+        text = self.user_input
         urgency_kws = ["急", "帮我", "快点", "赶紧", "马上", "紧急", "help", "urgent", "asap", "immediately"]
         has_question = ("?" in text) or ("？" in text)
         is_urgent = any(kw in text.lower() for kw in urgency_kws)
@@ -221,7 +338,7 @@ class HumanizationProcessor:
         # 情绪分量：消息越长 + arousal 越高 → 情绪载荷越重
         pad_scale = self.mood.get("pad_scale", "m1_1")
         arousal01 = _pad_to_01(self.mood.get("arousal", 0.0), pad_scale=pad_scale)
-        emotional_weight = min(1.0, msg_len / 200.0) * float(arousal01)
+        emotional_weight = min(1.0, msg_len / 200.0) * arousal01
         return {
             "has_question": has_question,
             "is_urgent": is_urgent,
@@ -239,10 +356,8 @@ class HumanizationProcessor:
         优先级：sleep → ghosting → busy → cooling → online（链式互斥）。
         REAL_MODE 开关由上层 AbsenceGate 控制，此函数不感知。
         """
-        try:
-            now = datetime.fromisoformat(self.current_time_str)
-        except Exception:
-            now = datetime.now()
+        now = self._now
+        rng = self._rng  # 下面多处抽样，绑定为局部变量
 
         E  = _clip01(self.big5.get("extraversion",     self.big5.get("E", 0.5)))
         C  = _clip01(self.big5.get("conscientiousness", self.big5.get("C", 0.5)))
@@ -263,28 +378,22 @@ class HumanizationProcessor:
         msg = self._msg_signals()
 
         # ── 1. SLEEP ───────────────────────────────────────────────────────────
-        s_start_base = float(BOT_SCHEDULE["sleep_start"])
-        s_end_base   = float(BOT_SCHEDULE["sleep_end"])
+        s_start_base = _SLEEP_START
+        s_end_base   = _SLEEP_END
         schedule_noise_h = (1.0 - C) * 0.4 + N * 0.3  # 小时标准差
-        bedtime  = s_start_base + (E - 0.5) * 1.5 + (1.0 - C) * 1.0 + random.gauss(0.0, schedule_noise_h)
-        wakeup   = s_end_base   + (E - 0.5) * 1.0 - C * 0.5            + random.gauss(0.0, schedule_noise_h)
+        bedtime  = s_start_base + (E - 0.5) * 1.5 + (1.0 - C) * 1.0 + rng.gauss(0.0, schedule_noise_h)
+        wakeup   = s_end_base   + (E - 0.5) * 1.0 - C * 0.5            + rng.gauss(0.0, schedule_noise_h)
         bedtime  = bedtime % 24
         wakeup   = max(4.0, min(11.0, wakeup))
 
         current_hour = now.hour + now.minute / 60.0
-        is_sleeping = False
-        if bedtime > wakeup:  # 跨午夜（常见：23→7）
-            is_sleeping = current_hour >= bedtime or current_hour < wakeup
-        else:
-            is_sleeping = bedtime <= current_hour < wakeup
+        # 模 24 统一处理跨午夜（常见：23→7）与不跨午夜：入睡后经过的时长 < 睡眠窗口长度 即在睡
+        is_sleeping = (current_hour - bedtime) % 24 < (wakeup - bedtime) % 24
 
         if is_sleeping:
-            if bedtime > wakeup:
-                hours_to_wake = (wakeup + 24 - current_hour) % 24
-            else:
-                hours_to_wake = wakeup - current_hour
+            hours_to_wake = (wakeup - current_hour) % 24
             # 起床后还要过一会儿才拿手机
-            post_wake_min = random.triangular(5.0, 40.0, 15.0) * (1.0 + N * 0.5) * (1.0 + (1.0 - C) * 0.3)
+            post_wake_min = rng.triangular(5.0, 40.0, 15.0) * (1.0 + N * 0.5) * (1.0 + (1.0 - C) * 0.3)
             # 紧急消息 + 高 attractiveness → 更早翻手机
             if msg["is_urgent"] and attractiveness > 0.6:
                 post_wake_min *= 0.4
@@ -292,11 +401,7 @@ class HumanizationProcessor:
             return total_s, "sleep", "sleep_night"
 
         # ── 2. GHOSTING ────────────────────────────────────────────────────────
-        base_ghost = 0.0
-        if self.stage in ("avoiding", "terminating"):
-            base_ghost = 0.65
-        elif self.stage == "stagnating":
-            base_ghost = 0.50
+        base_ghost = self._ghost_base
 
         # 情绪 & 关系修正
         if pleasure01 < 0.35:          base_ghost += 0.30
@@ -312,16 +417,16 @@ class HumanizationProcessor:
                                        base_ghost += 0.10  # 高开放 + 无聊短句 → 更懒得回
 
         ghost_prob = _clamp(base_ghost, 0.0, 0.92)
-        if random.random() < ghost_prob:
-            mode = random.random()
+        if rng.random() < ghost_prob:
+            mode = rng.random()
             if mode < 0.55:
-                secs = random.triangular(3600.0, 21600.0, 10800.0)   # 1–6h，众数 3h
+                secs = rng.triangular(3600.0, 21600.0, 10800.0)   # 1–6h，众数 3h
                 sub  = "ghost_short"
             elif mode < 0.85:
-                secs = random.triangular(28800.0, 129600.0, 54000.0)  # 8–36h，众数 15h
+                secs = rng.triangular(28800.0, 129600.0, 54000.0)  # 8–36h，众数 15h
                 sub  = "ghost_day"
             else:
-                secs = random.uniform(172800.0, 345600.0)             # 2–4 天
+                secs = rng.uniform(172800.0, 345600.0)             # 2–4 天
                 sub  = "ghost_extended"
             return secs, "ghosting", sub
 
@@ -345,8 +450,8 @@ class HumanizationProcessor:
         if msg["momentum"] > 0.7: busy_base -= 0.08
 
         busy_prob = _clamp(busy_base, 0.0, 0.85)
-        if random.random() < busy_prob:
-            raw = math.exp(random.gauss(math.log(3600.0), 0.65))
+        if rng.random() < busy_prob:
+            raw = math.exp(rng.gauss(_LOG_BUSY_MEDIAN_SECONDS, 0.65))
             secs = _clamp(raw, 900.0, 14400.0)  # 15min–4h，lognormal
             sub = "busy_work" if 9 <= now.hour < 18 else "busy_other"
             return secs, "busy", sub
@@ -361,8 +466,8 @@ class HumanizationProcessor:
             if msg["is_urgent"]:              cool_base -= 0.15
             if msg["has_question"]:           cool_base -= 0.08
             cool_prob = _clamp(cool_base, 0.0, 0.55)
-            if random.random() < cool_prob:
-                secs = random.triangular(300.0, 2700.0, 720.0) * (1.0 + N * 0.4)
+            if rng.random() < cool_prob:
+                secs = rng.triangular(300.0, 2700.0, 720.0) * (1.0 + N * 0.4)
                 return secs, "cooling", "emotion_processing"
 
         return 0.0, "online", "online"
@@ -372,52 +477,33 @@ class HumanizationProcessor:
         极简兜底算法：当 LLM 彻底失败时触发。
         不再使用正则尝试切分气泡，直接将 final_response 作为一条发出，保证流程不中断。
         """
-        user_input = str(self.state.get("user_input") or "")
-        final_response = _strip_trailing_sentence_punct(
-            (str(self.state.get("final_response") or self.state.get("draft_response") or "")).strip()
-        )
+        user_input = self.user_input
+        final_response = _strip_trailing_sentence_punct(self.final_response)
 
         macro_delay, macro_reason, _ = self.calculate_absence(dyn)
         is_macro = macro_delay > 0.0
 
         if is_macro:
-            delay_hours = macro_delay / 3600.0
-            logger.info("[MONITOR-Fallback] macro_delay: reason=%s, delay=%.2fh", macro_reason, delay_hours)
-
-        t_read = 0.5 + (len(user_input) * AVG_READING_SPEED)
-        cognitive_load = len(final_response) * 0.02
-        t_think = (1.0 + cognitive_load) * float(dyn["speed_factor"])
-        noise = random.gauss(1.0, float(dyn["noise_level"]))
-        t_think *= _clamp(float(noise), 0.5, 2.0)
+            logger.info("[MONITOR-Fallback] macro_delay: reason=%s, delay=%.2fh", macro_reason, macro_delay / 3600.0)
 
-        typing_speed = BASE_TYPING_SPEED / float(dyn["speed_factor"])
-        typing_speed = _clamp(float(typing_speed), 0.5, 30.0)
-
-        base_delay = float(macro_delay + t_read + t_think)
-        motor_noise = random.uniform(0.9, 1.1)
-        t_type = (len(final_response) / typing_speed) * motor_noise if final_response else 0.0
-        t_type = _clamp(float(t_type), 0.05, 60.0)
+        t_read, t_think, t_type = _fallback_latency(
+            len(user_input), len(final_response), float(dyn["speed_factor"]), float(dyn["noise_level"]), self._rng
+        )
 
         action: Any = "absence" if macro_delay > 300.0 else "typing"
         segments: List[ResponseSegment] = [
-            {"content": final_response, "delay": round(base_delay + t_type, 2), "action": action}
+            {"content": final_response, "delay": round(float(macro_delay) + t_read + t_think + t_type, 2), "action": action}
         ]
 
-        total_latency = float(segments[0]["delay"])
-
-        out: HumanizedOutput = {
-            "total_latency_seconds": round(total_latency, 2),
-            "segments": segments,
-            "is_macro_delay": bool(is_macro),
-            "total_latency_simulated": round(total_latency, 2),
-            "latency_breakdown": {
-                "macro_delay": round(float(macro_delay), 3),
-                "t_read": round(float(t_read), 3),
-                "t_think": round(float(t_think), 3),
-                "macro_reason": 0.0 if macro_reason == "online" else 1.0,
-            },
-        }
-        return out
+        return _humanized_output(
+            segments,
+            float(segments[0]["delay"]),
+            is_macro=bool(is_macro),
+            macro_delay=float(macro_delay),
+            t_read=t_read,
+            t_think=t_think,
+            macro_reason=0.0 if macro_reason == "online" else 1.0,
+        )
 
 
 def _build_processor_system_prompt(state: Dict[str, Any], dyn: Dict[str, float]) -> str:
@@ -429,13 +515,15 @@ def _build_processor_system_prompt(state: Dict[str, Any], dyn: Dict[str, float])
     system_memory = "\n\n".join(memory_parts) if memory_parts else "（无）"
 
     bot = state.get("bot_basic_info") or {}
-    mood = state.get("mood_state") or {}
+    mood = _prompt_fields(state.get("mood_state"), _PROMPT_MOOD_KEYS)
     stage = state.get("current_stage") or "experimenting"
-    rel = state.get("relationship_state") or {}
+    rel = _prompt_fields(state.get("relationship_state"), _PROMPT_REL_KEYS)
     current_time = state.get("current_time") or ""
-    schedule = f"作息: {BOT_SCHEDULE.get('sleep_start', 23)}:00 入睡, {BOT_SCHEDULE.get('sleep_end', 7)}:00 起床"
+    schedule = _SCHEDULE_LINE
 
-    formality = _estimate_formality(state)
+    formality = dyn.get("formality")
+    if formality is None:
+        formality = _estimate_formality(state)
     end_punct_ratio = _estimate_end_punct_ratio(formality)
     
     tendency = float(dyn.get("fragmentation_tendency", 0.0))
@@ -493,6 +581,57 @@ def _build_processor_system_prompt(state: Dict[str, Any], dyn: Dict[str, float])
 - 不要用破折号做插入语。
 """
 
+_SEGMENT_ACTIONS = ("typing", "absence")  # 元组：LLM 可能给出不可哈希的 action
+
+
+def _data_to_result(data: Dict[str, Any]) -> HumanizedOutput | None:
+    """把 LLM 返回的 segments 结构规整为 HumanizedOutput；无有效气泡时返回 None。"""
+    if not data:
+        return None
+    segments_raw = data.get("segments")
+    if not segments_raw or not isinstance(segments_raw, list):
+        return None
+    segments: List[ResponseSegment] = []
+    total_latency = 0.0  # 边追加边累计，不再对 segments 二次遍历求和
+    append = segments.append
+    strip_punct = _strip_trailing_sentence_punct
+    for item in segments_raw:
+        if not isinstance(item, dict):
+            continue
+        c = item.get("content")
+        if c is None:
+            continue
+        text = strip_punct(str(c).strip())
+        if not text:
+            continue
+        d = item.get("delay")
+        try:
+            delay_val = float(d) if d is not None else 2.5
+        except (TypeError, ValueError):
+            delay_val = 2.5
+        delay_val = max(0.5, min(60.0, delay_val))
+        action = item.get("action")
+        if action not in _SEGMENT_ACTIONS:
+            action = "typing"
+        delay_val = round(delay_val, 2)
+        append({"content": text, "delay": delay_val, "action": action})
+        total_latency += delay_val
+    if not segments:
+        return None
+    is_macro = bool(data.get("is_macro_delay", False))
+    try:
+        macro_sec = float(data.get("macro_delay_seconds", 0) or 0)
+    except Exception:
+        macro_sec = 0.0
+    return _humanized_output(
+        segments,
+        total_latency,
+        is_macro=is_macro,
+        macro_delay=macro_sec,
+        macro_reason=1.0 if is_macro else 0.0,
+    )
+
+
 def _humanize_via_llm(state: AgentState, llm_invoker: Any, dyn: Dict[str, float]) -> HumanizedOutput | None:
     user_input = str(state.get("user_input") or "").strip()
     final_response = str(state.get("final_response") or state.get("draft_response") or "").strip()
@@ -521,53 +660,6 @@ def _humanize_via_llm(state: AgentState, llm_invoker: Any, dyn: Dict[str, float]
         HumanMessage(content=task_content),
     ]
 
-    def _data_to_result(data: Dict[str, Any]):
-        if not data:
-            return None
-        segments_raw = data.get("segments")
-        if not segments_raw or not isinstance(segments_raw, list):
-            return None
-        segments: List[ResponseSegment] = []
-        for item in segments_raw:
-            if not isinstance(item, dict):
-                continue
-            c = item.get("content")
-            if c is None:
-                continue
-            text = _strip_trailing_sentence_punct(str(c).strip())
-            if not text:
-                continue
-            d = item.get("delay")
-            try:
-                delay_val = float(d) if d is not None else 2.5
-            except (TypeError, ValueError):
-                delay_val = 2.5
-            delay_val = max(0.5, min(60.0, delay_val))
-            action = item.get("action")
-            if action not in ("typing", "absence"):
-                action = "typing"
-            segments.append({"content": text, "delay": round(delay_val, 2), "action": action})
-        if not segments:
-            return None
-        is_macro = bool(data.get("is_macro_delay", False))
-        try:
-            macro_sec = float(data.get("macro_delay_seconds", 0) or 0)
-        except Exception:
-            macro_sec = 0.0
-        total_latency = sum(float(s["delay"]) for s in segments)
-        return {
-            "total_latency_seconds": round(total_latency, 2),
-            "segments": segments,
-            "is_macro_delay": is_macro,
-            "total_latency_simulated": round(total_latency, 2),
-            "latency_breakdown": {
-                "macro_delay": round(float(macro_sec), 3),
-                "t_read": 0.0,
-                "t_think": 0.0,
-                "macro_reason": 1.0 if is_macro else 0.0,
-            },
-        }
-
     try:
         data = None
         if hasattr(llm_invoker, "with_structured_output"):
@@ -579,8 +671,15 @@ def _humanize_via_llm(state: AgentState, llm_invoker: Any, dyn: Dict[str, float]
                 data = None
         if data is None:
             response = llm_invoker.invoke(messages)
-            content = getattr(response, "content", "") or ""
-            data = parse_json_from_llm(content)
+            content = str(getattr(response, "content", "") or "").strip()
+            # 快路径：干净 JSON 由 pydantic-core 一次解析+类型校验；代码块/杂文/越界值再走容错解析
+            if content:
+                try:
+                    data = ProcessorOutput.model_validate_json(content).model_dump()
+                except Exception:
+                    data = None
+            if data is None:
+                data = parse_json_from_llm(content)
         if isinstance(data, dict):
             return _data_to_result(data)
     except Exception as e:
@@ -590,6 +689,10 @@ def _humanize_via_llm(state: AgentState, llm_invoker: Any, dyn: Dict[str, float]
 
 def humanize_response_node(state: AgentState, llm_invoker: Any = None) -> Dict[str, Any]:
     processor = HumanizationProcessor(state)
+    if not processor.final_response:
+        # 没有可发送的内容：不算动态参数 / 缺席 / 延迟，直接给空结果（下游会过滤空气泡）
+        empty = _humanized_output([], 0.0, is_macro=False, macro_delay=0.0, macro_reason=0.0)
+        return {"humanized_output": empty, "final_segments": [], "final_delay": 0.0}
     dyn = processor.calculate_dynamics_modifiers()
     
     use_llm = str(state.get("processor_use_llm") or "").strip().lower() in ("1", "true", "yes", "on")
@@ -602,25 +705,27 @@ def humanize_response_node(state: AgentState, llm_invoker: Any = None) -> Dict[s
         # LLM 解析失败或未开启时，触发极简兜底算法（不再切分）
         result = processor.process_fallback(dyn)
 
-    segs = result.get("segments") or []
-    bubbles = [s.get("content", "") for s in segs]
-    first_delay = float(segs[0].get("delay", 0.0)) if segs else 0.0
-    total_latency = float(result.get("total_latency_seconds", 0.0) or 0.0)
-
-    frag_tendency = float(dyn.get("fragmentation_tendency", 0.0))
-    logger.info(
-        "[Processor] 核心动态: 碎片化倾向 tendency=%.2f | 延迟规划: 消息数 %s, 首条延迟 %.2fs, 总延迟 %.2fs",
-        frag_tendency, len(segs), first_delay, total_latency,
-    )
-    for i, seg in enumerate(segs):
-        full = (seg.get("content", "") or "")
-        content_preview = (full[:40] + "...") if len(full) > 40 else full
-        logger.info("  [%s] delay=%.2fs, content=%s", i + 1, float(seg.get("delay", 0.0)), content_preview)
+    # 两条路径都经 _humanized_output 组装：segments 非空且键齐全，直接取值
+    segs = result["segments"]
+    bubbles = [s["content"] for s in segs]
+    first_delay = float(segs[0]["delay"])  # 两条路径组装气泡时已 round(.., 2)，这里不再重复取整
+    total_latency = float(result["total_latency_seconds"])
+
+    # 默认不输出 INFO：整体跳过逐条气泡的截断与格式化
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "[Processor] 核心动态: 碎片化倾向 tendency=%.2f | 延迟规划: 消息数 %s, 首条延迟 %.2fs, 总延迟 %.2fs",
+            float(dyn.get("fragmentation_tendency", 0.0)), len(segs), first_delay, total_latency,
+        )
+        for i, seg in enumerate(segs):
+            full = (seg.get("content", "") or "")
+            content_preview = (full[:40] + "...") if len(full) > 40 else full
+            logger.info("  [%s] delay=%.2fs, content=%s", i + 1, float(seg.get("delay", 0.0)), content_preview)
 
     return {
         "humanized_output": result,
         "final_segments": bubbles,
-        "final_delay": round(first_delay, 2),
+        "final_delay": first_delay,
     }
 
 def create_processor_node(llm_invoker: Any = None) -> Callable[[AgentState], dict]:
@@ -80,6 +80,15 @@ _EMOTION_PAD_TARGET: Dict[str, Dict[str, float]] = {
     "排斥":    {"pleasure": -0.55, "arousal": +0.30, "dominance": +0.20},
 }
 
+# lerp 用的目标向量按 pad_scale 预先展开：m1_1 直接用 [-1,1] 值，其余量纲预先换算到 [0,1]
+_PAD_KEYS = ("pleasure", "arousal", "dominance")
+_PAD_TARGET_M1_1: Dict[str, tuple] = {
+    tag: tuple(t.get(k, 0.0) for k in _PAD_KEYS) for tag, t in _EMOTION_PAD_TARGET.items()
+}
+_PAD_TARGET_01: Dict[str, tuple] = {
+    tag: tuple((x + 1.0) / 2.0 for x in vec) for tag, vec in _PAD_TARGET_M1_1.items()
+}
+
 
 def _clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
@@ -169,14 +178,18 @@ def _update_pad_from_emotion_tag(mood: Dict[str, Any], emotion_tag: str) -> Dict
     公式：new = current + ALPHA * (target - current)
     只修改 pleasure / arousal / dominance，其他字段（busyness, pad_scale 等）不变。
     """
-    target = _EMOTION_PAD_TARGET.get(emotion_tag, {})
+    pad_scale = str(mood.get("pad_scale") or "m1_1")
+    if pad_scale == "m1_1":
+        # 当前值和目标值都在 [-1, 1]，直接 lerp
+        target, lo, hi = _PAD_TARGET_M1_1.get(emotion_tag), -1.0, 1.0
+    else:
+        # 当前值在 [0, 1]，目标值已预先换算到 [0, 1]
+        target, lo, hi = _PAD_TARGET_01.get(emotion_tag), 0.0, 1.0
     if not target:
         return {}
 
-    pad_scale = str(mood.get("pad_scale") or "m1_1")
     result: Dict[str, Any] = {}
-
-    for key in ("pleasure", "arousal", "dominance"):
+    for key, t in zip(_PAD_KEYS, target):
         raw = mood.get(key)
         if raw is None:
             continue
@@ -184,17 +197,7 @@ def _update_pad_from_emotion_tag(mood: Dict[str, Any], emotion_tag: str) -> Dict
             v = float(raw)
         except (TypeError, ValueError):
             continue
-
-        t = target.get(key, 0.0)  # 目标值，[-1, 1] 空间
-
-        if pad_scale == "m1_1":
-            # 当前值和目标值都在 [-1, 1]，直接 lerp
-            v_new = _clamp(v + PAD_LERP_ALPHA * (t - v), -1.0, 1.0)
-        else:
-            # 当前值在 [0, 1]，目标值转换到 [0, 1] 再 lerp
-            t_01 = (t + 1.0) / 2.0
-            v_new = _clamp(v + PAD_LERP_ALPHA * (t_01 - v), 0.0, 1.0)
-        result[key] = v_new
+        result[key] = _clamp(v + PAD_LERP_ALPHA * (t - v), lo, hi)
 
     return result
 
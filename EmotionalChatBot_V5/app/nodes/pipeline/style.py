@@ -81,12 +81,27 @@ def _det_jitter(momentum01: float, topic_appeal01: float) -> float:
 def _parse_01(x: Any, default: float = 0.5) -> float:
     if x is None:
         return default
+    if type(x) is float:  # state 里绝大多数已是 float：跳过 try/float()
+        return clip01(x)
     try:
         return clip01(float(x))
     except (TypeError, ValueError):
         return default
 
 
+def _rel_to_01(rv: Any, rel_scale: str, default: float = 0.5) -> float:
+    """关系维度映射到 [0, 1]：m1_1 尺度下 [-1,1] 内的值线性映射，其余直接夹取。"""
+    if rv is None:
+        return default
+    try:
+        f = float(rv)
+    except (TypeError, ValueError):
+        return default
+    if rel_scale == "m1_1" and -1.0 <= f <= 1.0:
+        return clip01((f + 1.0) / 2.0)
+    return clip01(f)
+
+
 def _pad_to_01(
     x: Any,
     *,
@@ -519,26 +534,15 @@ def create_style_node(llm_invoker: Any = None) -> Callable[[AgentState], Dict[st
         elif state.get("relationship_scale") in ("m1_1", "0_1"):
             rel_scale = state["relationship_scale"]
 
-        def _get_rel(key: str, default: float = 0.5) -> float:
-            rv = rel.get(key)
-            if rv is None and key == "attractiveness":
-                rv = rel.get("warmth", rel.get("liking"))
-            if rv is None:
-                return default
-            try:
-                f = float(rv)
-            except (TypeError, ValueError):
-                return default
-            if rel_scale == "m1_1" and -1.0 <= f <= 1.0:
-                return clip01((f + 1.0) / 2.0)
-            return clip01(f)
-
-        closeness = _get_rel("closeness", 0.5)
-        trust = _get_rel("trust", 0.5)
-        liking = _get_rel("liking", 0.5)
-        respect = _get_rel("respect", 0.5)
-        attractiveness = _get_rel("attractiveness", 0.5)
-        power = _get_rel("power", 0.5)
+        attractiveness_raw = rel.get("attractiveness")
+        if attractiveness_raw is None:
+            attractiveness_raw = rel.get("warmth", rel.get("liking"))
+        closeness = _rel_to_01(rel.get("closeness"), rel_scale)
+        trust = _rel_to_01(rel.get("trust"), rel_scale)
+        liking = _rel_to_01(rel.get("liking"), rel_scale)
+        respect = _rel_to_01(rel.get("respect"), rel_scale)
+        attractiveness = _rel_to_01(attractiveness_raw, rel_scale)
+        power = _rel_to_01(rel.get("power"), rel_scale)
 
         # momentum：从 state 读
         momentum = _parse_01(state.get("conversation_momentum", mood.get("momentum")), 0.5)
@@ -19,13 +19,14 @@ evolver.py
 
 from __future__ import annotations
 
-import json
 import logging
 import re
+from collections import ChainMap
 from datetime import datetime, timezone
 from typing import Any, Callable, Dict, List
 
 from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import TypeAdapter
 
 from app.state import AgentState
 from src.schemas import RelationshipAnalysis
@@ -119,7 +120,30 @@ def _stage_key(x: Any) -> str:
     return s
 
 
+_REQUIRED_KEYS = frozenset({"user_input", "relationship_state", "mood_state", "current_stage"})
+
+
+def _is_normalized_rel(rel: Any) -> bool:
+    """relationship_state 已是 _fill_relationship_defaults 的输出形态（六维 float、已收口、已 round 4 位）。"""
+    if not isinstance(rel, dict) or "rel_scale" not in rel:
+        return False
+    for k in REL_DIMS:
+        v = rel.get(k)
+        if type(v) is not float or not (0.0 <= v <= REL_HI_CAP) or round(v, 4) != v:
+            return False
+    return True
+
+
 def _ensure_relationship_defaults(state: Dict[str, Any]) -> Dict[str, Any]:
+    """补齐关系/情绪默认值。state 已完整且已规范化时原样返回（调用方只读，不做整份 state 拷贝）。"""
+    if all(k in state for k in _REQUIRED_KEYS):
+        mood = state["mood_state"]
+        if (not isinstance(mood, dict) or "pad_scale" in mood) and _is_normalized_rel(state["relationship_state"]):
+            return state
+    return _fill_relationship_defaults(state)
+
+
+def _fill_relationship_defaults(state: Dict[str, Any]) -> Dict[str, Any]:
     s = dict(state)
     rel = dict(s.get("relationship_state") or {})
     rel.setdefault("closeness", 0.3)
@@ -226,6 +250,10 @@ def _is_low_info_greeting(text: str) -> bool:
 # -------------------------------------------------------------------
 
 
+# 复用同一个 pydantic-core 校验器：validate_json 从原始文本一步到模型，validate_python 处理容错解析后的 dict
+_ANALYSIS_ADAPTER: TypeAdapter[RelationshipAnalysis] = TypeAdapter(RelationshipAnalysis)
+
+
 def create_relationship_analyzer_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
     @trace_if_enabled(
         name="Relationship/Analyzer",
@@ -233,7 +261,7 @@ def create_relationship_analyzer_node(llm_invoker: Any) -> Callable[[AgentState]
         tags=["node", "relationship", "analyzer"],
         metadata={"state_outputs": ["latest_relationship_analysis", "relationship_deltas"]},
     )
-    def node(state: AgentState) -> dict:
+    async def node(state: AgentState) -> dict:
         safe = _ensure_relationship_defaults(state)
 
         sys_prompt = build_analyzer_prompt(safe)
@@ -248,21 +276,29 @@ def create_relationship_analyzer_node(llm_invoker: Any) -> Callable[[AgentState]
         try:
             if hasattr(llm_invoker, "with_structured_output"):
                 structured = llm_invoker.with_structured_output(RelationshipAnalysis)
-                analysis = structured.invoke(
+                analysis = await structured.ainvoke(
                     [SystemMessage(content=sys_prompt), *body_messages, HumanMessage(content=user_msg)]
                 )
         except Exception:
             analysis = None
         if analysis is None:
             try:
-                resp = llm_invoker.invoke(
+                resp = await llm_invoker.ainvoke(
                     [SystemMessage(content=sys_prompt), *body_messages, HumanMessage(content=user_msg)]
                 )
                 raw = (getattr(resp, "content", str(resp)) or "").strip()
                 raw = str(raw) if raw else ""
+            except Exception:
+                raw = ""
+            # 快路径：干净 JSON 直接由 pydantic-core 一次完成解析+校验，不经中间 dict
+            if raw:
+                try:
+                    analysis = _ANALYSIS_ADAPTER.validate_json(raw)
+                except Exception:
+                    analysis = None
+        if analysis is None:
+            try:
                 data = parse_json_from_llm(raw) if raw else None
-                if data is None and raw:
-                    data = json.loads(raw)
             except Exception:
                 data = None
 
@@ -277,13 +313,11 @@ def create_relationship_analyzer_node(llm_invoker: Any) -> Callable[[AgentState]
                     "attempted_task_ids": [],
                 }
 
-            try:
-                analysis = RelationshipAnalysis.model_validate(data)
-            except Exception:
-                analysis = RelationshipAnalysis.parse_obj(data)  # type: ignore[attr-defined]
+            analysis = _ANALYSIS_ADAPTER.validate_python(data)
 
+        # 一次 model_dump 已递归导出 deltas，不再对子模型单独 dump
         analysis_dict = analysis.model_dump() if hasattr(analysis, "model_dump") else analysis.dict()
-        deltas_dict = analysis.deltas.model_dump() if hasattr(analysis.deltas, "model_dump") else analysis.deltas.dict()
+        deltas_dict = dict(analysis_dict.get("deltas") or {})
 
         return {
             "latest_relationship_analysis": analysis_dict,
@@ -363,7 +397,7 @@ def create_relationship_updater_node() -> Callable[[AgentState], dict]:
             applied[dim] = round(real_change, 4)
 
         if greeting_gate:
-            print(f"[Evolver] greeting_gate applied (stage={stage}, conv_len={conv_len}, user_input={user_text!r})")
+            logger.info("[Evolver] greeting_gate applied (stage=%s, conv_len=%s, user_input=%r)", stage, conv_len, user_text)
         return {"relationship_state": rel, "relationship_deltas_applied": applied}
 
     return node
@@ -391,12 +425,11 @@ def create_relationship_engine_node(llm_invoker: Any) -> Callable[[AgentState],
             ]
         },
     )
-    def node(state: AgentState) -> dict:
+    async def node(state: AgentState) -> dict:
         out: Dict[str, Any] = {}
-        out.update(analyzer(state))
-        merged = dict(state)
-        merged.update(out)
-        out.update(updater(merged))
+        out.update(await analyzer(state))
+        # updater 只读：用 ChainMap 叠加本轮产出，不拷贝整份 state（chat_buffer 等大字段）
+        out.update(updater(ChainMap(out, state)))
         return out
 
     return node
@@ -441,14 +474,12 @@ def _detect_completed_tasks_and_replenish(state: Dict[str, Any]) -> Dict[str, An
 
     completed_ids, attempted_ids = _get_task_completion_from_state(state)
 
-    current_session_tasks = [t for t in current_session_tasks if str(t.get("id")) not in completed_ids]
-
-    cleaned: List[Dict[str, Any]] = []
-    for t in current_session_tasks:
-        tt = str(t.get("task_type") or "").strip()
-        if tt in ("backlog", "immediate"):
-            cleaned.append(t)
-    current_session_tasks = cleaned
+    current_session_tasks = [
+        t
+        for t in current_session_tasks
+        if str(t.get("id")) not in completed_ids
+        and str(t.get("task_type") or "").strip() in ("backlog", "immediate")
+    ]
 
     now_iso = datetime.now(timezone.utc).isoformat(timespec="seconds")
     bumped = 0
@@ -496,11 +527,21 @@ def _detect_completed_tasks_and_replenish(state: Dict[str, Any]) -> Dict[str, An
 
     current_session_tasks = _dec_ttl_and_filter(current_session_tasks)
 
-    for tid in completed_ids:
-        for t in list(bot_task_list):
-            if str(t.get("id")) == tid and str(t.get("task_type") or "").strip() == "backlog":
-                bot_task_list.remove(t)
-                break
+    # 单次遍历：每个已完成 id 只移除第一条匹配的 backlog 任务（与逐 id 查找语义一致）
+    if completed_ids:
+        removed_ids: set = set()
+        kept_tasks: List[Dict[str, Any]] = []
+        for t in bot_task_list:
+            tid = str(t.get("id"))
+            if (
+                tid in completed_ids
+                and tid not in removed_ids
+                and str(t.get("task_type") or "").strip() == "backlog"
+            ):
+                removed_ids.add(tid)
+                continue
+            kept_tasks.append(t)
+        bot_task_list = kept_tasks
 
     backlog_items = [t for t in current_session_tasks if str(t.get("task_type") or "").strip() == "backlog"]
     immediate_items = [t for t in current_session_tasks if str(t.get("task_type") or "").strip() == "immediate"]
@@ -554,11 +595,17 @@ def _detect_completed_tasks_and_replenish(state: Dict[str, Any]) -> Dict[str, An
         current_session_tasks = current_session_tasks[-CURRENT_SESSION_TASKS_CAP:]
 
     try:
-        if completed_ids or added_backlog or trimmed_backlog or bumped:
-            print(
-                f"[Evolver] completed(DB)={len(completed_ids)} bumped={bumped} "
-                f"backlog_pool={backlog_in_pool}->{sum(1 for t in current_session_tasks if str(t.get('task_type') or '').strip() == 'backlog')}, "
-                f"trimmed_backlog={trimmed_backlog}, added_backlog={added_backlog}, session_tasks={len(current_session_tasks)}"
+        # 计数需遍历任务池：INFO 未开启时整段跳过
+        if (completed_ids or added_backlog or trimmed_backlog or bumped) and logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[Evolver] completed(DB)=%d bumped=%s backlog_pool=%s->%d, trimmed_backlog=%s, added_backlog=%s, session_tasks=%d",
+                len(completed_ids),
+                bumped,
+                backlog_in_pool,
+                sum(1 for t in current_session_tasks if str(t.get("task_type") or "").strip() == "backlog"),
+                trimmed_backlog,
+                added_backlog,
+                len(current_session_tasks),
             )
     except Exception:
         pass
@@ -588,11 +635,9 @@ def create_evolver_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
             ]
         },
     )
-    def node(state: AgentState) -> dict:
-        out = base_engine(state)
-        merged = dict(state)
-        merged.update(out)
-        out.update(_detect_completed_tasks_and_replenish(merged))
+    async def node(state: AgentState) -> dict:
+        out = await base_engine(state)
+        out.update(_detect_completed_tasks_and_replenish(ChainMap(out, state)))
         return out
 
     return node
\ No newline at end of file
@@ -17,12 +17,16 @@ Knapp 阶段管理器节点：在 evolver 之后执行阶段迁移判定。
 from __future__ import annotations
 
 import logging
+import operator
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import yaml
 
+from app.prompts.prompt_utils import is_user_message
 from app.state import AgentState
 from src.state_schema import StageManagerInput
 from utils.yaml_loader import get_project_root
@@ -30,37 +34,126 @@ from utils.yaml_loader import get_project_root
 logger = logging.getLogger(__name__)
 
 
-def _safe_check_condition(condition: str, *, closeness: float) -> bool:
+def _clamp01(x: Any) -> float:
+    return max(0.0, min(1.0, float(x)))
+
+
+def _approx_eq(a: float, b: float) -> bool:
+    return abs(a - b) < 0.01  # 浮点比较容差
+
+
+def _approx_ne(a: float, b: float) -> bool:
+    return abs(a - b) >= 0.01
+
+
+# 按匹配优先级排列：先匹配双字符运算符，避免 ">=" 被拆成 ">"
+_CONDITION_OPS = (
+    (">=", operator.ge),
+    ("<=", operator.le),
+    ("==", _approx_eq),
+    ("!=", _approx_ne),
+    (">", operator.gt),
+    ("<", operator.lt),
+)
+
+
+def _never(closeness: float) -> bool:
+    return False
+
+
+@lru_cache(maxsize=64)
+def _compile_condition(condition: str) -> Callable[[float], bool]:
     """
-    仅支持极简条件：形如 'closeness > 0.7' / 'closeness >= 0.7' 等。
-    避免使用 eval。
+    将 YAML 中的条件串一次性编译成比较函数（仅支持 'closeness > 0.7' / 'closeness >= 0.7' 等极简形式）。
+    避免使用 eval；无法识别的条件编译为恒 False。
     注意：closeness 参数和阈值都是 0-1 范围。
     """
     s = (condition or "").strip()
-    closeness_val = max(0.0, min(1.0, float(closeness)))
-    
-    for op in (">=", "<=", "==", "!=", ">", "<"):
+    for op, fn in _CONDITION_OPS:
         if op in s:
             left, right = [x.strip() for x in s.split(op, 1)]
             if left != "closeness":
-                return False
+                return _never
             try:
-                threshold = max(0.0, min(1.0, float(right)))
+                threshold = _clamp01(right)
             except Exception:
-                return False
-            if op == ">=":
-                return closeness_val >= threshold
-            if op == "<=":
-                return closeness_val <= threshold
-            if op == "==":
-                return abs(closeness_val - threshold) < 0.01  # 浮点比较容差
-            if op == "!=":
-                return abs(closeness_val - threshold) >= 0.01
-            if op == ">":
-                return closeness_val > threshold
-            if op == "<":
-                return closeness_val < threshold
-    return False
+                return _never
+
+            def check(closeness: float) -> bool:
+                return fn(_clamp01(closeness), threshold)
+
+            return check
+    return _never
+
+
+def _all_at_least(scores: Dict[str, Any], limits: Tuple[Tuple[str, float], ...]) -> bool:
+    """所有维度（clamp 后）均不低于阈值；短路求值，遇到首个不满足即返回。"""
+    return all(_clamp01(scores.get(dim, 0.0) or 0.0) >= lim for dim, lim in limits)
+
+
+def _score_limits(d: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, float], ...]:
+    return tuple((str(dim), _clamp01(v)) for dim, v in (d or {}).items())
+
+
+@dataclass(frozen=True)
+class _StageRules:
+    """单个阶段的判定表（由 knapp_rules.yaml 预编译，阈值已 clamp 到 0-1）。"""
+
+    next_up: Optional[str]
+    next_down: Optional[str]
+    # decay_triggers
+    decay_max_scores: Tuple[Tuple[str, float], ...]
+    has_conditional_drop: bool
+    drop_condition: str
+    drop_check: Callable[[float], bool]
+    drop_triggers: Tuple[Tuple[str, float], ...]
+    drop_min_triggered: int
+    spt_behavior: Optional[str]
+    # up_entry
+    up_entry: Dict[str, Any]
+    up_min_scores: Tuple[Tuple[str, float], ...]
+    min_user_turns: int
+    min_spt_depth: int
+    min_topic_breadth: int
+    min_profile_fields: int
+    # up_min_scores
+    guard_min_scores: Tuple[Tuple[str, float], ...]
+    check_power_balance: bool
+
+
+def _compile_stage_rules(conf: Dict[str, Any]) -> _StageRules:
+    triggers = conf.get("decay_triggers", {}) or {}
+    cd = triggers.get("conditional_drop") or {}
+    entry_req = conf.get("up_entry", {}) or {}
+    # up_min_scores: 额外的"最低要求"（不得低于），不满足则阻止升级
+    min_scores_req = conf.get("up_min_scores", {}) or {}
+    return _StageRules(
+        next_up=conf.get("next_up"),
+        next_down=conf.get("next_down"),
+        decay_max_scores=_score_limits(triggers.get("max_scores")),
+        has_conditional_drop="conditional_drop" in triggers,
+        drop_condition=str(cd.get("condition") or ""),
+        drop_check=_compile_condition(str(cd.get("condition") or "")),
+        drop_triggers=_score_limits(cd.get("triggers")),
+        drop_min_triggered=int(cd.get("min_triggered", 1) or 1),  # 默认至少 1 项
+        spt_behavior=triggers.get("spt_behavior"),
+        up_entry=entry_req,
+        up_min_scores=_score_limits(entry_req.get("min_scores")),
+        min_user_turns=int(entry_req.get("min_user_turns", 0) or 0),
+        min_spt_depth=int(entry_req.get("min_spt_depth", 0) or 0),
+        min_topic_breadth=int(entry_req.get("min_topic_breadth", 0) or 0),
+        min_profile_fields=int(entry_req.get("min_profile_fields", 0) or 0),
+        guard_min_scores=_score_limits(min_scores_req.get("min_scores")),
+        check_power_balance=bool(min_scores_req.get("check_power_balance")),
+    )
+
+
+@lru_cache(maxsize=8)
+def _load_rules_cached(path: str, mtime: float) -> Dict[str, Any]:
+    """按 (path, mtime) 缓存解析结果：每次建图不再重复 yaml.safe_load；文件改动后 mtime 变化自动重新加载。
+    返回的 dict 为多个 manager 共享，只读使用。"""
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
 
 
 class KnappStageManager:
@@ -72,14 +165,28 @@ class KnappStageManager:
         self.config = self._load_config(config_path)
         self.settings = self.config.get("settings", {}) or {}
         self.stages = self.config.get("stages", {}) or {}
+        # 阈值在加载时一次性归一化，判定时不再逐轮 .get / float / clamp
+        self._jump_threshold = _clamp01(self.settings.get("jump_delta_threshold", 0.25))
+        self._decay_confirm_turns = int(self.settings.get("decay_confirm_turns", 3) or 3)
+        self._growth_confirm_turns = int(self.settings.get("growth_confirm_turns", 2) or 2)
+        self._power_balance_threshold = _clamp01(self.settings.get("power_balance_threshold", 0.3) or 0.3)
+        self._rules: Dict[str, _StageRules] = {
+            str(name): _compile_stage_rules(conf or {}) for name, conf in self.stages.items()
+        }
 
     def _load_config(self, path: str) -> Dict[str, Any]:
-        with open(path, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+        return _load_rules_cached(path, os.path.getmtime(path))
 
-    def evaluate_transition(self, current_stage: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    def evaluate_transition(
+        self,
+        current_stage: str,
+        state: Dict[str, Any],
+        *,
+        user_turns: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
         Main Entry Point: 决定是否变迁
+        user_turns: 调用方已算好的用户轮次（node 内复用，避免重复遍历 chat_buffer）；None 时自行计算
         Returns:
           { "new_stage": str, "reason": str, "transition_type": "JUMP"|"DECAY"|"GROWTH"|"STAY" }
         """
@@ -87,7 +194,8 @@ class KnappStageManager:
             return {"new_stage": current_stage, "reason": "ablation_mode", "transition_type": "STAY"}
         parsed = StageManagerInput.model_validate(state)  # pydantic v2
         scores = parsed.relationship_state.model_dump()
-        user_turns = self._count_user_turns(state)
+        if user_turns is None:
+            user_turns = self._count_user_turns(state)
 
         # deltas：优先用 applied；否则用 raw
         deltas_applied = dict(parsed.relationship_deltas_applied or {})
@@ -146,11 +254,7 @@ class KnappStageManager:
                 pass
         # 兜底：从 chat_buffer 数 human 条数
         buf = state.get("chat_buffer") or []
-        n = sum(
-            1 for m in buf
-            if "human" in str(getattr(m, "type", "") or "").lower()
-            or "user" in str(getattr(m, "type", "") or "").lower()
-        )
+        n = sum(1 for m in buf if is_user_message(m))
         if str(state.get("user_input") or "").strip():
             n = max(n, 1)
         return int(n)
@@ -185,23 +289,23 @@ class KnappStageManager:
         spt: Dict[str, Any],
     ) -> Optional[Dict[str, Any]]:
         # 阈值（0-1 范围）
-        threshold = max(0.0, min(1.0, float(self.settings.get("jump_delta_threshold", 0.25))))
+        threshold = self._jump_threshold
         
         trust_delta = self._normalize_delta_points(deltas.get("trust", 0))
         respect_delta = self._normalize_delta_points(deltas.get("respect", 0))
 
         # 监控 JUMP 检查过程
-        print(f"[MONITOR] stage_jump_check: current_stage={current_stage}, threshold={threshold:.3f}, trust_delta={trust_delta:.3f}, respect_delta={respect_delta:.3f}")
+        logger.debug("[MONITOR] stage_jump_check: current_stage=%s, threshold=%.3f, trust_delta=%.3f, respect_delta=%.3f", current_stage, threshold, trust_delta, respect_delta)
 
         if trust_delta <= -threshold:
-            print(f"[MONITOR] stage_jump_triggered: trust_delta={trust_delta:.3f} <= -threshold={-threshold:.3f}")
+            logger.info("[MONITOR] stage_jump_triggered: trust_delta=%.3f <= -threshold=%.3f", trust_delta, -threshold)
             return {
                 "new_stage": "terminating",
                 "reason": f"Catastrophic trust failure (Event Driven). trust_delta={trust_delta:.3f}",
                 "transition_type": "JUMP",
             }
         if respect_delta <= -threshold:
-            print(f"[MONITOR] stage_jump_triggered: respect_delta={respect_delta:.3f} <= -threshold={-threshold:.3f}")
+            logger.info("[MONITOR] stage_jump_triggered: respect_delta=%.3f <= -threshold=%.3f", respect_delta, -threshold)
             return {
                 "new_stage": "differentiating",
                 "reason": f"Sudden loss of respect. respect_delta={respect_delta:.3f}",
@@ -210,9 +314,9 @@ class KnappStageManager:
 
         if current_stage == "initiating" and int(spt.get("depth", 1) or 1) >= 3:
             liking_score = max(0.0, min(1.0, float(scores.get("liking", 0.0) or 0.0)))
-            print(f"[MONITOR] stage_jump_check_rapid_intimacy: depth={spt.get('depth', 1)}, liking_score={liking_score:.3f}")
+            logger.debug("[MONITOR] stage_jump_check_rapid_intimacy: depth=%s, liking_score=%.3f", spt.get('depth', 1), liking_score)
             if liking_score > 0.4:
-                print(f"[MONITOR] stage_jump_triggered: rapid_intimacy_acceleration, depth={spt.get('depth', 1)}, liking_score={liking_score:.3f}")
+                logger.info("[MONITOR] stage_jump_triggered: rapid_intimacy_acceleration, depth=%s, liking_score=%.3f", spt.get('depth', 1), liking_score)
                 return {
                     "new_stage": "intensifying",
                     "reason": f"Rapid intimacy acceleration. depth={spt.get('depth', 1)}, liking={liking_score:.3f}",
@@ -228,66 +332,61 @@ class KnappStageManager:
         *,
         state: Optional[Dict[str, Any]] = None,
     ) -> Optional[Dict[str, Any]]:
-        stage_conf = self.stages.get(current_stage) or {}
-        next_stage = stage_conf.get("next_down")
+        rules = self._rules.get(current_stage)
+        next_stage = rules.next_down if rules else None
         if not next_stage:
             return None
 
-        triggers = stage_conf.get("decay_triggers", {}) or {}
-        decay_confirm_turns = int(self.settings.get("decay_confirm_turns", 3) or 3)
+        decay_confirm_turns = self._decay_confirm_turns
 
         # 监控 DECAY 检查过程
-        print(f"[MONITOR] stage_decay_check: current_stage={current_stage}, next_down={next_stage}")
+        logger.debug("[MONITOR] stage_decay_check: current_stage=%s, next_down=%s", current_stage, next_stage)
 
         # 检查 max_scores（OR 语义：任一维度 ≤ 阈值）
-        max_scores = triggers.get("max_scores") or {}
         decay_triggered = False
         decay_reason = ""
-        for dim, limit in (max_scores or {}).items():
-            limit_val = max(0.0, min(1.0, float(limit)))
-            score_val = max(0.0, min(1.0, float(scores.get(dim, 0.0) or 0.0)))
-            print(f"[MONITOR] stage_decay_check_max_score: dim={dim}, score={score_val:.3f}, limit={limit_val:.3f}")
+        for dim, limit_val in rules.decay_max_scores:
+            score_val = _clamp01(scores.get(dim, 0.0) or 0.0)
+            logger.debug("[MONITOR] stage_decay_check_max_score: dim=%s, score=%.3f, limit=%.3f", dim, score_val, limit_val)
             if score_val <= limit_val:
                 decay_triggered = True
                 decay_reason = f"Score {dim} dropped below {limit_val:.2f} (actual={score_val:.3f})."
                 break
 
         # 检查 conditional_drop（bonding 的特殊逻辑：三项里满足 2 项）
-        if not decay_triggered and "conditional_drop" in triggers:
-            cd = triggers.get("conditional_drop") or {}
-            cond_str = str(cd.get("condition") or "")
+        if not decay_triggered and rules.has_conditional_drop:
+            cond_str = rules.drop_condition
             closeness_raw = float(scores.get("closeness", 0.0) or 0.0)
-            cond_met = _safe_check_condition(cond_str, closeness=closeness_raw)
-            print(f"[MONITOR] stage_decay_check_conditional: condition={cond_str}, closeness={closeness_raw:.3f}, condition_met={cond_met}")
+            cond_met = rules.drop_check(closeness_raw)
+            logger.debug("[MONITOR] stage_decay_check_conditional: condition=%s, closeness=%.3f, condition_met=%s", cond_str, closeness_raw, cond_met)
             if cond_met:
-                sub = cd.get("triggers") or {}
-                min_triggered = int(cd.get("min_triggered", 1) or 1)  # 默认至少 1 项
+                sub = rules.drop_triggers
+                min_triggered = rules.drop_min_triggered
                 triggered_count = 0
                 triggered_dims = []
-                for dim, limit in sub.items():
-                    limit_val = max(0.0, min(1.0, float(limit)))
-                    score_val = max(0.0, min(1.0, float(scores.get(dim, 0.0) or 0.0)))
-                    print(f"[MONITOR] stage_decay_check_conditional_sub: dim={dim}, score={score_val:.3f}, limit={limit_val:.3f}")
+                for dim, limit_val in sub:
+                    score_val = _clamp01(scores.get(dim, 0.0) or 0.0)
+                    logger.debug("[MONITOR] stage_decay_check_conditional_sub: dim=%s, score=%.3f, limit=%.3f", dim, score_val, limit_val)
                     if score_val < limit_val:
                         triggered_count += 1
                         triggered_dims.append(f"{dim}={score_val:.3f}")
-                print(f"[MONITOR] stage_decay_check_conditional_count: triggered={triggered_count}/{len(sub)}, required={min_triggered}")
+                logger.debug("[MONITOR] stage_decay_check_conditional_count: triggered=%s/%s, required=%s", triggered_count, len(sub), min_triggered)
                 if triggered_count >= min_triggered:
                     decay_triggered = True
                     decay_reason = f"High intimacy but {triggered_count} dimension(s) too low: {', '.join(triggered_dims)}. closeness={closeness_raw:.3f}"
 
         # 检查 spt_behavior
         if not decay_triggered:
-            behavior_required = triggers.get("spt_behavior")
+            behavior_required = rules.spt_behavior
             if behavior_required == "depth_reduction":
                 depth_trend = str(spt.get("depth_trend") or "stable")
-                print(f"[MONITOR] stage_decay_check_spt_behavior: behavior_required=depth_reduction, depth_trend={depth_trend}")
+                logger.debug("[MONITOR] stage_decay_check_spt_behavior: behavior_required=depth_reduction, depth_trend=%s", depth_trend)
                 if depth_trend == "decreasing":
                     decay_triggered = True
                     decay_reason = f"User is withdrawing (Depenetration). depth_trend={depth_trend}"
             elif behavior_required == "breadth_reduction":
                 breadth = int(spt.get("breadth", 0) or 0)
-                print(f"[MONITOR] stage_decay_check_spt_behavior: behavior_required=breadth_reduction, breadth={breadth}")
+                logger.debug("[MONITOR] stage_decay_check_spt_behavior: behavior_required=breadth_reduction, breadth=%s", breadth)
                 if breadth <= 1:
                     decay_triggered = True
                     decay_reason = f"Topic breadth collapsed (breadth reduction). breadth={breadth}"
@@ -297,14 +396,14 @@ class KnappStageManager:
             confirm_key = f"decay_{current_stage}_{next_stage}"
             current_count = self._get_confirm_count(state or {}, confirm_key) if state else 0
             new_count = current_count + 1
-            print(f"[MONITOR] stage_decay_confirm_count: {confirm_key}={current_count} -> {new_count}, required={decay_confirm_turns}")
+            logger.debug("[MONITOR] stage_decay_confirm_count: %s=%s -> %s, required=%s", confirm_key, current_count, new_count, decay_confirm_turns)
             
             if state:
                 updated_assets = self._update_confirm_count(state, confirm_key, new_count)
                 state["relationship_assets"] = updated_assets
             
             if new_count >= decay_confirm_turns:
-                print(f"[MONITOR] stage_decay_triggered: {decay_reason}")
+                logger.info("[MONITOR] stage_decay_triggered: %s", decay_reason)
                 # 重置 confirm count
                 if state:
                     updated_assets = self._update_confirm_count(state, confirm_key, 0)
@@ -315,7 +414,7 @@ class KnappStageManager:
                     "transition_type": "DECAY",
                 }
             else:
-                print(f"[MONITOR] stage_decay_pending: need {decay_confirm_turns - new_count} more turn(s)")
+                logger.debug("[MONITOR] stage_decay_pending: need %s more turn(s)", decay_confirm_turns - new_count)
                 return None
         else:
             # 条件不满足，重置 confirm count
@@ -335,115 +434,105 @@ class KnappStageManager:
         state: Optional[Dict[str, Any]] = None,
         user_turns: int = 0,
     ) -> Optional[Dict[str, Any]]:
-        stage_conf = self.stages.get(current_stage) or {}
-        next_stage = stage_conf.get("next_up")
+        rules = self._rules.get(current_stage)
+        next_stage = rules.next_up if rules else None
         if not next_stage:
             return None
 
-        entry_req = stage_conf.get("up_entry", {}) or {}
-        # up_min_scores: 额外的"最低要求"（不得低于），不满足则阻止升级
-        # 注意：这里的 min_scores 是"不得低于"语义，不是"达到即否决"
-        # 例如：min_scores: { respect: 0.08 } 表示 respect < 0.08 时阻止升级
-        min_scores_req = stage_conf.get("up_min_scores", {}) or {}
+        entry_req = rules.up_entry
 
         # Debug: 明确本轮判定使用的是当前阶段的 up_entry（A 方案：current_stage 的配置决定能否升到 next_up）
-        print(f"[MONITOR] stage_growth_up_entry_source: current_stage={current_stage}, next_stage={next_stage}, using_up_entry_from=current_stage")
-        print(f"[MONITOR] stage_growth_up_entry_config: {entry_req}")
+        logger.debug("[MONITOR] stage_growth_up_entry_source: current_stage=%s, next_stage=%s, using_up_entry_from=current_stage", current_stage, next_stage)
+        logger.debug("[MONITOR] stage_growth_up_entry_config: %s", entry_req)
 
         # min_user_turns：由 YAML up_entry 配置，无配置则不检查
-        min_user_turns = int(entry_req.get("min_user_turns", 0) or 0)
+        min_user_turns = rules.min_user_turns
         if min_user_turns > 0:
             ut = int(user_turns or 0)
-            print(f"[MONITOR] stage_growth_check_user_turns: user_turns={ut}, required={min_user_turns}")
+            logger.debug("[MONITOR] stage_growth_check_user_turns: user_turns=%s, required=%s", ut, min_user_turns)
             if ut < min_user_turns:
-                print(f"[MONITOR] stage_growth_blocked: user_turns={ut} < required={min_user_turns}")
+                logger.debug("[MONITOR] stage_growth_blocked: user_turns=%s < required=%s", ut, min_user_turns)
                 return None
 
         # 检查所有 entry 条件
-        growth_conditions_met = True
-        
-        for dim, min_val in (entry_req.get("min_scores") or {}).items():
-            min_val_norm = max(0.0, min(1.0, float(min_val)))
-            score_val = max(0.0, min(1.0, float(scores.get(dim, 0.0) or 0.0)))
-            if score_val < min_val_norm:
-                growth_conditions_met = False
-                break
+        growth_conditions_met = _all_at_least(scores, rules.up_min_scores)
 
         if growth_conditions_met:
-            min_spt_depth = int(entry_req.get("min_spt_depth", 0) or 0)
+            min_spt_depth = rules.min_spt_depth
             spt_depth = int(spt.get("depth", 1) or 1)
-            print(f"[MONITOR] stage_growth_check_spt_depth: depth={spt_depth}, required={min_spt_depth}")
+            logger.debug("[MONITOR] stage_growth_check_spt_depth: depth=%s, required=%s", spt_depth, min_spt_depth)
             if spt_depth < min_spt_depth:
-                print(f"[MONITOR] stage_growth_blocked: spt_depth={spt_depth} < required={min_spt_depth}")
+                logger.debug("[MONITOR] stage_growth_blocked: spt_depth=%s < required=%s", spt_depth, min_spt_depth)
                 growth_conditions_met = False
 
         if growth_conditions_met:
-            min_breadth = int(entry_req.get("min_topic_breadth", 0) or 0)
+            min_breadth = rules.min_topic_breadth
             spt_breadth = int(spt.get("breadth", 0) or 0)
-            print(f"[MONITOR] stage_growth_check_spt_breadth: breadth={spt_breadth}, required={min_breadth}")
+            logger.debug("[MONITOR] stage_growth_check_spt_breadth: breadth=%s, required=%s", spt_breadth, min_breadth)
             if spt_breadth < min_breadth:
-                print(f"[MONITOR] stage_growth_blocked: spt_breadth={spt_breadth} < required={min_breadth}")
+                logger.debug("[MONITOR] stage_growth_blocked: spt_breadth=%s < required=%s", spt_breadth, min_breadth)
                 growth_conditions_met = False
 
         if growth_conditions_met:
             # 检查 min_profile_fields（up_entry）
-            min_profile = int(entry_req.get("min_profile_fields", 0) or 0)
+            min_profile = rules.min_profile_fields
             if min_profile > 0:
                 if state is None:
-                    print(f"[MONITOR] stage_growth_blocked: min_profile_fields required but state not passed")
+                    logger.debug("[MONITOR] stage_growth_blocked: min_profile_fields required but state not passed")
                     growth_conditions_met = False
                 else:
                     profile_count = self._count_profile_fields(state)
-                    print(f"[MONITOR] stage_growth_check_profile_fields: count={profile_count}, required={min_profile}")
+                    logger.debug("[MONITOR] stage_growth_check_profile_fields: count=%s, required=%s", profile_count, min_profile)
                     if profile_count < min_profile:
-                        print(f"[MONITOR] stage_growth_blocked: profile_fields={profile_count} < required={min_profile}")
+                        logger.debug("[MONITOR] stage_growth_blocked: profile_fields=%s < required=%s", profile_count, min_profile)
                         growth_conditions_met = False
 
         if growth_conditions_met:
             # 检查 up_min_scores：额外的"不得低于"要求（不满足则阻止升级）
-            for dim, min_val in (min_scores_req.get("min_scores") or {}).items():
-                min_val_norm = max(0.0, min(1.0, float(min_val)))
-                score_val = max(0.0, min(1.0, float(scores.get(dim, 0.0) or 0.0)))
-                print(f"[MONITOR] stage_growth_check_min_score: dim={dim}, score={score_val:.3f}, required_min={min_val_norm:.3f}")
+            # 注意：这里的 min_scores 是"不得低于"语义，不是"达到即否决"
+            # 例如：min_scores: { respect: 0.08 } 表示 respect < 0.08 时阻止升级
+            for dim, min_val_norm in rules.guard_min_scores:
+                score_val = _clamp01(scores.get(dim, 0.0) or 0.0)
+                logger.debug("[MONITOR] stage_growth_check_min_score: dim=%s, score=%.3f, required_min=%.3f", dim, score_val, min_val_norm)
                 if score_val < min_val_norm:
-                    print(f"[MONITOR] stage_growth_blocked: {dim}={score_val:.3f} < required_min={min_val_norm:.3f}")
+                    logger.debug("[MONITOR] stage_growth_blocked: %s=%.3f < required_min=%.3f", dim, score_val, min_val_norm)
                     growth_conditions_met = False
                     break
 
         if growth_conditions_met:
             # 检查 power_balance：power = Bot 眼中用户强势程度，不平衡则阻止升级
-            if bool(min_scores_req.get("check_power_balance")):
+            if rules.check_power_balance:
                 # power：用户越强势越高；0.5 为平衡点，计算偏离度（0-1 范围）
                 power = max(0.0, min(1.0, float(scores.get("power", 0.5) or 0.5)))
                 imbalance = abs(power - 0.5) * 2.0  # 0-1 范围
-                limit = max(0.0, min(1.0, float(self.settings.get("power_balance_threshold", 0.3) or 0.3)))
-                print(f"[MONITOR] stage_growth_check_power_balance: power={power:.3f}, imbalance={imbalance:.3f}, threshold={limit:.3f}")
+                limit = self._power_balance_threshold
+                logger.debug("[MONITOR] stage_growth_check_power_balance: power=%.3f, imbalance=%.3f, threshold=%.3f", power, imbalance, limit)
                 if imbalance > limit:
-                    print(f"[MONITOR] stage_growth_vetoed: power_imbalance={imbalance:.3f} > threshold={limit:.3f}")
+                    logger.debug("[MONITOR] stage_growth_vetoed: power_imbalance=%.3f > threshold=%.3f", imbalance, limit)
                     growth_conditions_met = False
 
         # Hysteresis: 需要连续多轮满足条件才触发
-        growth_confirm_turns = int(self.settings.get("growth_confirm_turns", 2) or 2)
+        growth_confirm_turns = self._growth_confirm_turns
         confirm_key = f"growth_{current_stage}_{next_stage}"
         
         if growth_conditions_met:
             current_count = self._get_confirm_count(state or {}, confirm_key) if state else 0
             new_count = current_count + 1
-            print(f"[MONITOR] stage_growth_confirm_count: {confirm_key}={current_count} -> {new_count}, required={growth_confirm_turns}")
+            logger.debug("[MONITOR] stage_growth_confirm_count: %s=%s -> %s, required=%s", confirm_key, current_count, new_count, growth_confirm_turns)
             
             if state:
                 updated_assets = self._update_confirm_count(state, confirm_key, new_count)
                 state["relationship_assets"] = updated_assets
             
             if new_count >= growth_confirm_turns:
-                print(f"[MONITOR] stage_growth_triggered: all_entry_criteria_met")
+                logger.info("[MONITOR] stage_growth_triggered: all_entry_criteria_met")
                 # 重置 confirm count
                 if state:
                     updated_assets = self._update_confirm_count(state, confirm_key, 0)
                     state["relationship_assets"] = updated_assets
                 return {"new_stage": next_stage, "reason": "All entry criteria met.", "transition_type": "GROWTH"}
             else:
-                print(f"[MONITOR] stage_growth_pending: need {growth_confirm_turns - new_count} more turn(s)")
+                logger.debug("[MONITOR] stage_growth_pending: need %s more turn(s)", growth_confirm_turns - new_count)
                 return None
         else:
             # 条件不满足，重置 confirm count
@@ -468,6 +557,31 @@ class KnappStageManager:
         }
 
 
+def _monitor_on() -> bool:
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+def _log_stage_snapshot(
+    rel_state: Dict[str, Any],
+    rel_deltas: Dict[str, Any],
+    spt_info: Dict[str, Any],
+    user_turns: int,
+) -> None:
+    """阶段判定时的关系/SPT 快照，仅 DEBUG 下输出。"""
+    logger.debug(
+        "  relationship_state: closeness=%.3f, trust=%.3f, liking=%.3f, respect=%.3f, attractiveness=%.3f, power=%.3f\n"
+        "  relationship_deltas: %s\n"
+        "  spt_info: depth=%s, breadth=%s, depth_trend=%s, recent_signals=%s\n"
+        "  user_turns=%s",
+        rel_state.get("closeness", 0), rel_state.get("trust", 0), rel_state.get("liking", 0),
+        rel_state.get("respect", 0), rel_state.get("attractiveness", 0), rel_state.get("power", 0),
+        rel_deltas,
+        spt_info.get("depth", 1), spt_info.get("breadth", 0), spt_info.get("depth_trend", "stable"),
+        spt_info.get("recent_signals", []),
+        user_turns,
+    )
+
+
 def create_stage_manager_node(config_path: Optional[str] = None):
     manager = KnappStageManager(config_path=config_path)
 
@@ -509,7 +623,7 @@ def create_stage_manager_node(config_path: Optional[str] = None):
 
         # 创建 state 副本用于 evaluate_transition（会修改 relationship_assets）
         state_for_eval = {**state, "spt_info": spt_info}
-        result = manager.evaluate_transition(current, state_for_eval)
+        result = manager.evaluate_transition(current, state_for_eval, user_turns=user_turns)
         new_stage = result.get("new_stage", current)
         ttype = result.get("transition_type", "STAY")
         reason = result.get("reason", "")
@@ -520,17 +634,14 @@ def create_stage_manager_node(config_path: Optional[str] = None):
         # ### 6.2 需要监控的参数 - stage 变化触发的详细信息
         if ttype != "STAY" and new_stage != current:
             # Stage 变化发生
-            print(f"[MONITOR] stage_transition_triggered:")
-            print(f"  from_stage={current}")
-            print(f"  to_stage={new_stage}")
-            print(f"  transition_type={ttype}")
-            print(f"  reason={reason}")
-            print(f"  relationship_state: closeness={rel_state.get('closeness', 0):.3f}, trust={rel_state.get('trust', 0):.3f}, liking={rel_state.get('liking', 0):.3f}, respect={rel_state.get('respect', 0):.3f}, attractiveness={rel_state.get('attractiveness', 0):.3f}, power={rel_state.get('power', 0):.3f}")
-            print(f"  relationship_deltas: {rel_deltas}")
-            print(f"  spt_info: depth={spt_info.get('depth', 1)}, breadth={spt_info.get('breadth', 0)}, depth_trend={spt_info.get('depth_trend', 'stable')}, recent_signals={spt_info.get('recent_signals', [])}")
-            print(f"  user_turns={user_turns}")
-            print(f"🚀 STAGE CHANGE: {current} -> {new_stage} ({reason})")
-            print("[StageManager] done")
+            logger.info(
+                "[MONITOR] stage_transition_triggered:\n  from_stage=%s\n  to_stage=%s\n  transition_type=%s\n  reason=%s",
+                current, new_stage, ttype, reason,
+            )
+            if _monitor_on():
+                _log_stage_snapshot(rel_state, rel_deltas, spt_info, user_turns)
+            logger.info("🚀 STAGE CHANGE: %s -> %s (%s)", current, new_stage, reason)
+            logger.debug("[StageManager] done")
             return {
                 "current_stage": new_stage,
                 "stage_narrative": reason,
@@ -539,16 +650,14 @@ def create_stage_manager_node(config_path: Optional[str] = None):
                 "relationship_assets": updated_assets,
             }
         else:
-            # Stage 保持不变，也记录当前状态
-            print(f"[MONITOR] stage_no_change:")
-            print(f"  current_stage={current}")
-            print(f"  transition_type={ttype}")
-            print(f"  reason={reason}")
-            print(f"  relationship_state: closeness={rel_state.get('closeness', 0):.3f}, trust={rel_state.get('trust', 0):.3f}, liking={rel_state.get('liking', 0):.3f}, respect={rel_state.get('respect', 0):.3f}, attractiveness={rel_state.get('attractiveness', 0):.3f}, power={rel_state.get('power', 0):.3f}")
-            print(f"  relationship_deltas: {rel_deltas}")
-            print(f"  spt_info: depth={spt_info.get('depth', 1)}, breadth={spt_info.get('breadth', 0)}, depth_trend={spt_info.get('depth_trend', 'stable')}, recent_signals={spt_info.get('recent_signals', [])}")
-            print(f"  user_turns={user_turns}")
-        print("[StageManager] done")
+            # Stage 保持不变，也记录当前状态（DEBUG 未开启时整段跳过格式化）
+            if _monitor_on():
+                logger.debug(
+                    "[MONITOR] stage_no_change:\n  current_stage=%s\n  transition_type=%s\n  reason=%s",
+                    current, ttype, reason,
+                )
+                _log_stage_snapshot(rel_state, rel_deltas, spt_info, user_turns)
+        logger.debug("[StageManager] done")
         return {
             "spt_info": spt_info,
             "relationship_assets": updated_assets,
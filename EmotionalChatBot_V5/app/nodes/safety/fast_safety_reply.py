@@ -6,15 +6,16 @@
 from __future__ import annotations
 
 import logging
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Optional
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
-from app.prompts.prompt_utils import safe_text
+from app.prompts.prompt_utils import is_user_message, recent_messages, safe_text
 from app.state import AgentState
 from utils.detailed_logging import log_prompt_and_params, log_llm_response
 from utils.tracing import trace_if_enabled
-from utils.yaml_loader import get_strategy_by_id
+from utils.yaml_loader import get_strategy_by_id, load_strategies_cached
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +25,33 @@ LATEST_USER_TEXT_MAX = 600
 FAST_SAFETY_WORD_LIMIT = 40
 
 
-def _is_user_message(m: Any) -> bool:
-    t = getattr(m, "type", "") or ""
-    return "human" in t.lower() or "user" in t.lower()
+def _load_strategy_prompt(strategy_id: str) -> str:
+    """
+    策略 prompt 只取决于 strategies.yaml：解析结果按 (path, mtime) 缓存，文件修改后下次触发即生效。
+    按 id 查找不缓存，策略缺失时返回空串，补上后无需重启。
+    """
+    strategy = get_strategy_by_id(strategy_id, load_strategies_cached())
+    return (strategy.get("prompt") or "").strip() if strategy else ""
+
+
+@lru_cache(maxsize=64)
+def _build_system_message(bot_name: str, strategy_prompt: str) -> SystemMessage:
+    """系统提示只依赖 bot 名与策略 prompt，同一组合复用同一个 SystemMessage。"""
+    return SystemMessage(content=f"""你是 {bot_name}，一个拟人化的聊天伙伴。
+此刻需要根据下面的「当前策略指令」做出回应，不超过 {FAST_SAFETY_WORD_LIMIT} 字。
+
+## 当前策略指令（必须遵守）
+{strategy_prompt}
+
+## 规则
+- 以第一人称（我）自然说话，不要暴露你是AI
+- 不要使用"作为AI"、"根据您的请求"等客服套话
+- 回复简短自然，{FAST_SAFETY_WORD_LIMIT} 字以内
+""")
 
 
 def create_fast_safety_reply_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
-    """创建安全快速回复节点。"""
+    """创建安全快速回复节点（async 节点，LLM 调用走 ainvoke）。"""
 
     @trace_if_enabled(
         name="Response/FastSafetyReply",
@@ -38,16 +59,14 @@ def create_fast_safety_reply_node(llm_invoker: Any) -> Callable[[AgentState], di
         tags=["node", "fast_safety_reply", "safety"],
         metadata={"state_outputs": ["final_response"]},
     )
-    def fast_safety_reply_node(state: AgentState) -> Dict[str, Any]:
+    async def fast_safety_reply_node(state: AgentState) -> Dict[str, Any]:
         strategy_id = str(state.get("safety_strategy_id") or "anti_ai_defense")
         user_input = (state.get("user_input") or "").strip()[:LATEST_USER_TEXT_MAX]
 
         # 获取策略 prompt
         strategy_prompt = ""
         try:
-            strategy = get_strategy_by_id(strategy_id)
-            if strategy:
-                strategy_prompt = (strategy.get("prompt") or "").strip()
+            strategy_prompt = _load_strategy_prompt(strategy_id)
         except Exception as e:
             logger.warning("[FastSafetyReply] 获取策略 %s 失败: %s", strategy_id, e)
 
@@ -56,13 +75,11 @@ def create_fast_safety_reply_node(llm_invoker: Any) -> Callable[[AgentState], di
             strategy_prompt = "【安全响应】无法处理此请求，请换一种方式交流。"
 
         # 收集最近几轮对话作为语境
-        chat_buffer: List[BaseMessage] = list(
-            state.get("chat_buffer") or state.get("messages", [])[-RECENT_DIALOGUE_LAST_N * 2:]
-        )[-RECENT_DIALOGUE_LAST_N * 2:]
+        chat_buffer: List[BaseMessage] = recent_messages(state, RECENT_DIALOGUE_LAST_N * 2)
 
         lines: List[str] = []
-        for m in chat_buffer[-RECENT_DIALOGUE_LAST_N * 2:]:
-            role = "Human" if _is_user_message(m) else "AI"
+        for m in chat_buffer:
+            role = "Human" if is_user_message(m) else "AI"
             content = (getattr(m, "content", "") or str(m)).strip()
             if len(content) > RECENT_MSG_CONTENT_MAX:
                 content = content[:RECENT_MSG_CONTENT_MAX] + "…"
@@ -72,18 +89,6 @@ def create_fast_safety_reply_node(llm_invoker: Any) -> Callable[[AgentState], di
         bot_basic_info = state.get("bot_basic_info") or {}
         bot_name = safe_text((bot_basic_info or {}).get("name") or "Bot").strip() or "Bot"
 
-        system_content = f"""你是 {bot_name}，一个拟人化的聊天伙伴。
-此刻需要根据下面的「当前策略指令」做出回应，不超过 {FAST_SAFETY_WORD_LIMIT} 字。
-
-## 当前策略指令（必须遵守）
-{strategy_prompt}
-
-## 规则
-- 以第一人称（我）自然说话，不要暴露你是AI
-- 不要使用"作为AI"、"根据您的请求"等客服套话
-- 回复简短自然，{FAST_SAFETY_WORD_LIMIT} 字以内
-"""
-
         user_content = f"""【最近对话】
 {recent_dialogue}
 
@@ -92,11 +97,11 @@ def create_fast_safety_reply_node(llm_invoker: Any) -> Callable[[AgentState], di
 
 请直接输出你的回复（纯文本，不要JSON，不要标题）："""
 
-        messages = [SystemMessage(content=system_content), HumanMessage(content=user_content)]
+        messages = [_build_system_message(bot_name, strategy_prompt), HumanMessage(content=user_content)]
         log_prompt_and_params("FastSafetyReply", messages=messages)
 
         try:
-            msg = llm_invoker.invoke(messages)
+            msg = await llm_invoker.ainvoke(messages)
             response = (getattr(msg, "content", "") or str(msg)).strip()
             # 硬截断
             if len(response) > FAST_SAFETY_WORD_LIMIT * 3:
@@ -11,19 +11,20 @@
 from __future__ import annotations
 
 import logging
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from app.prompts.prompt_utils import safe_text
+from app.prompts.prompt_utils import is_user_message, recent_messages, safe_text
 from app.state import AgentState
 from src.schemas import SafetyOutput, StrategyRouterOutput
 from utils.detailed_logging import log_prompt_and_params
 from utils.llm_json import parse_json_from_llm
 from utils.prompt_helpers import format_relationship_for_llm, format_stage_for_llm, stage_to_knapp_index
-from utils.security import detect_manipulation_attempts, detect_injection_attempt
+from utils.security import is_manipulation_or_injection
 from utils.tracing import trace_if_enabled
-from utils.yaml_loader import load_strategies
+from utils.yaml_loader import load_strategies_cached, strategies_mtime
 
 logger = logging.getLogger(__name__)
 
@@ -41,29 +42,40 @@ RECENT_MSG_CONTENT_MAX = 500
 LATEST_USER_TEXT_MAX = 800
 RECENT_DIALOGUE_CHARS = 2500
 
+_SYSTEM_PROMPT_HEAD = "\n".join([
+    "你是高危意图分类器。判断当前用户消息是否命中下列高危情形之一。",
+    "宁可漏报，不可误报。仅当非常确定时才输出命中 id，否则一律 triggered=false。",
+    "",
+    "## 检测条件",
+])
+_SYSTEM_PROMPT_TAIL = "\n".join([
+    "",
+    "（输出格式由系统约束：triggered=true/false，strategy_id 为命中的 id 或 null。）",
+])
 
-def _is_user_message(m: Any) -> bool:
-    t = getattr(m, "type", "") or ""
-    return "human" in t.lower() or "user" in t.lower()
 
+# 取不到用户新句时 _pick_latest_user_text 的返回值：没有可检测的内容，规则层与 LLM 层都跳过
+_NO_USER_TEXT = frozenset({"", "（无用户新句）"})
 
-def _gather_context(state: Dict[str, Any]) -> Dict[str, Any]:
-    raw_buffer = state.get("chat_buffer") or state.get("messages") or []
-    chat_buffer = list(raw_buffer)[-RECENT_DIALOGUE_LAST_N:]
 
+def _pick_latest_user_text(state: Dict[str, Any], chat_buffer: List[Any]) -> str:
     latest_user_text_raw = (state.get("user_input") or "").strip()
     if not latest_user_text_raw and chat_buffer:
         for m in reversed(chat_buffer):
-            if _is_user_message(m):
+            if is_user_message(m):
                 latest_user_text_raw = (getattr(m, "content", "") or str(m)).strip()
                 break
         if not latest_user_text_raw:
             latest_user_text_raw = "（无用户新句）"
+    return latest_user_text_raw
+
+
+def _gather_context(state: Dict[str, Any], chat_buffer: List[Any], latest_user_text_raw: str) -> Dict[str, Any]:
     latest_user_text = (latest_user_text_raw or "（无用户消息）")[:LATEST_USER_TEXT_MAX]
 
     lines: List[str] = []
     for m in chat_buffer:
-        role = "Human" if _is_user_message(m) else "AI"
+        role = "Human" if is_user_message(m) else "AI"
         content = (getattr(m, "content", "") or str(m)).strip()
         if len(content) > RECENT_MSG_CONTENT_MAX:
             content = content[:RECENT_MSG_CONTENT_MAX] + "…"
@@ -72,30 +84,21 @@ def _gather_context(state: Dict[str, Any]) -> Dict[str, Any]:
 
     stage_id = str(state.get("current_stage") or "initiating")
     relationship_state = state.get("relationship_state") or {}
-    rel_desc = format_relationship_for_llm(relationship_state)
-    stage_desc = format_stage_for_llm(stage_id, include_judge_hints=False)
-
-    bot_basic_info = state.get("bot_basic_info") or {}
-    user_basic_info = state.get("user_basic_info") or {}
 
+    # 只收 _llm_check 实际拼进 prompt 的四段，按 prompt 中的截断长度截好
     return {
         "latest_user_text": latest_user_text,
-        "latest_user_text_raw": latest_user_text_raw,
-        "recent_dialogue": recent_dialogue,
-        "rel_desc": rel_desc,
-        "stage_desc": stage_desc,
-        "bot_basic_info": bot_basic_info,
-        "user_basic_info": user_basic_info,
-        "stage_id": stage_id,
+        "recent_dialogue": recent_dialogue[-RECENT_DIALOGUE_CHARS:],
+        "rel_desc": format_relationship_for_llm(relationship_state)[:400],
+        "stage_desc": format_stage_for_llm(stage_id, include_judge_hints=False)[:300],
     }
 
 
 def _rule_based_check(latest_user_text: str) -> Optional[str]:
     """规则层（不调用 LLM）：检测注入 / 操控尝试，返回 strategy_id 或 None。"""
     try:
-        manipulation_flags = detect_manipulation_attempts(latest_user_text)
-        is_injection, _ = detect_injection_attempt(latest_user_text)
-        if any(manipulation_flags.values()) or is_injection:
+        # 命中即走固定策略 anti_ai_defense，跳过 LLM 层；只需 bool，用合并正则单次扫描
+        if is_manipulation_or_injection(latest_user_text):
             logger.info("[Safety] 规则层检测到注入/操控")
             return "anti_ai_defense"
     except Exception as e:
@@ -128,56 +131,70 @@ def _filter_strategies(strategies: List[Dict[str, Any]], stage_index: int) -> Li
     return out
 
 
-def _llm_check(
+@lru_cache(maxsize=32)
+def _build_stage_system_message(stage_index: int, strategies_version: float) -> Optional[SystemMessage]:
+    filtered = _filter_strategies(load_strategies_cached(), stage_index)
+    if not filtered:
+        return None
+    return SystemMessage(
+        content="\n".join([_SYSTEM_PROMPT_HEAD, _build_conditions_block(filtered), _SYSTEM_PROMPT_TAIL])
+    )
+
+
+def _stage_system_message(stage_index: int) -> Optional[SystemMessage]:
+    """
+    按 Knapp 阶段缓存 LLM 层的 SystemMessage（只依赖策略配置与阶段，与用户无关）。
+    缓存以 strategies.yaml 的 mtime 为版本：文件修改后下一轮即重新构建；该阶段无可用策略时返回 None（跳过 LLM 层）。
+    """
+    return _build_stage_system_message(stage_index, strategies_mtime())
+
+
+async def _llm_check(
     llm_invoker: Any,
+    structured: Any,
     ctx: Dict[str, Any],
-    strategies: List[Dict[str, Any]],
     stage_index: int,
 ) -> Optional[str]:
     """LLM 层：在过滤后的 HIGH_STAKES 策略中做路由，返回 strategy_id 或 None。"""
-    filtered = _filter_strategies(strategies, stage_index)
-    if not filtered:
+    system_msg = _stage_system_message(stage_index)
+    if system_msg is None:
         return None
 
-    conditions_block = _build_conditions_block(filtered)
-    system_prompt = "\n".join([
-        "你是高危意图分类器。判断当前用户消息是否命中下列高危情形之一。",
-        "宁可漏报，不可误报。仅当非常确定时才输出命中 id，否则一律 triggered=false。",
-        "",
-        "## 检测条件",
-        conditions_block,
-        "",
-        "（输出格式由系统约束：triggered=true/false，strategy_id 为命中的 id 或 null。）",
-    ])
-
     user_content = f"""## 背景
-- 关系：{ctx['rel_desc'][:400]}
-- 阶段：{ctx['stage_desc'][:300]}
+- 关系：{ctx['rel_desc']}
+- 阶段：{ctx['stage_desc']}
 
 ## 历史对话（保留最近部分）
-{(ctx['recent_dialogue'] or '')[-RECENT_DIALOGUE_CHARS:]}
+{ctx['recent_dialogue']}
 
 ## 当前用户消息
 {ctx['latest_user_text']}
 
 请判断是否命中检测条件。"""
 
-    messages = [SystemMessage(content=system_prompt), HumanMessage(content=user_content)]
+    messages = [system_msg, HumanMessage(content=user_content)]
     log_prompt_and_params("Safety/LLM", messages=messages)
     try:
-        if hasattr(llm_invoker, "with_structured_output"):
+        if structured is not None:
             try:
-                structured = llm_invoker.with_structured_output(SafetyOutput)
-                obj = structured.invoke(messages)
+                obj = await structured.ainvoke(messages)
                 if obj.triggered and obj.strategy_id in HIGH_STAKES_IDS:
                     return obj.strategy_id
                 return None
             except Exception:
                 pass
         # fallback: parse JSON
-        msg = llm_invoker.invoke(messages)
+        msg = await llm_invoker.ainvoke(messages)
         raw = (getattr(msg, "content", "") or str(msg)).strip()
-        parsed = parse_json_from_llm(raw)
+        parsed = None
+        # 快路径：干净 JSON 由 pydantic-core 一次解析+类型校验；代码块/杂文/多余字段再走容错解析
+        if raw:
+            try:
+                parsed = SafetyOutput.model_validate_json(raw).model_dump()
+            except Exception:
+                parsed = None
+        if parsed is None:
+            parsed = parse_json_from_llm(raw)
         if isinstance(parsed, dict):
             if parsed.get("triggered") and parsed.get("strategy_id") in HIGH_STAKES_IDS:
                 return str(parsed["strategy_id"])
@@ -187,7 +204,15 @@ def _llm_check(
 
 
 def create_safety_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
-    """创建安全层 + 守门层节点。"""
+    """创建安全层 + 守门层节点。返回 async 节点：LLM 层走 ainvoke，等待期间不阻塞事件循环。"""
+
+    # 结构化输出包装只依赖 schema，创建节点时构建一次，每轮复用
+    structured = None
+    if hasattr(llm_invoker, "with_structured_output"):
+        try:
+            structured = llm_invoker.with_structured_output(SafetyOutput)
+        except Exception:
+            structured = None
 
     @trace_if_enabled(
         name="Safety",
@@ -195,21 +220,25 @@ def create_safety_node(llm_invoker: Any) -> Callable[[AgentState], dict]:
         tags=["node", "safety"],
         metadata={"state_outputs": ["safety_triggered", "safety_strategy_id"]},
     )
-    def safety_node(state: AgentState) -> dict:
-        ctx = _gather_context(state)
+    async def safety_node(state: AgentState) -> dict:
+        chat_buffer = recent_messages(state, RECENT_DIALOGUE_LAST_N)
+        latest_user_text_raw = _pick_latest_user_text(state, chat_buffer)
+        if latest_user_text_raw in _NO_USER_TEXT:
+            logger.info("[Safety] 无用户新句，跳过检测")
+            return {"safety_triggered": False, "safety_strategy_id": None}
 
         # 1. 规则层（快速，无 LLM）
-        rule_hit = _rule_based_check(ctx["latest_user_text_raw"])
+        rule_hit = _rule_based_check(latest_user_text_raw)
         if rule_hit:
             logger.info("[Safety] 触发（规则层）: %s", rule_hit)
             return {"safety_triggered": True, "safety_strategy_id": rule_hit}
 
-        # 2. LLM 层（HIGH_STAKES 路由）
+        # 2. LLM 层（HIGH_STAKES 路由）；关系/阶段/历史描述只在需要调用 LLM 时才拼
         if llm_invoker is not None:
             try:
-                strategies = load_strategies()
+                ctx = _gather_context(state, chat_buffer, latest_user_text_raw)
                 stage_index = stage_to_knapp_index(state.get("current_stage"))
-                llm_hit = _llm_check(llm_invoker, ctx, strategies, stage_index)
+                llm_hit = await _llm_check(llm_invoker, structured, ctx, stage_index)
                 if llm_hit:
                     logger.info("[Safety] 触发（LLM 层）: %s", llm_hit)
                     return {"safety_triggered": True, "safety_strategy_id": llm_hit}
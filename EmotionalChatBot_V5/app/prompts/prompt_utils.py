@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from collections import deque
 from typing import Any, Dict, List, Tuple
 
 from utils.prompt_helpers import format_stage_act_for_llm
@@ -11,6 +12,8 @@ _ASSISTANT_IDENTITY_PATTERNS = [
     r"(我叫|我是|叫我)[\s\S]{0,18}(一个|位)?[\s\S]{0,18}(ai|人工智能|智能助手|机器人助手|chatbot|聊天助手|助手)",
     r"小池是一个聊天助手",
 ]
+# 合并为单条预编译正则（匹配前统一 lower()，与逐条 re.search 等价）
+_ASSISTANT_IDENTITY_RE = re.compile("|".join(f"(?:{p})" for p in _ASSISTANT_IDENTITY_PATTERNS))
 
 
 def sanitize_memory_text(text: str) -> str:
@@ -22,17 +25,7 @@ def sanitize_memory_text(text: str) -> str:
     if not t.strip():
         return ""
     # 按行过滤
-    lines = [ln for ln in t.splitlines() if ln.strip()]
-    kept: List[str] = []
-    for ln in lines:
-        low = ln.lower()
-        bad = False
-        for pat in _ASSISTANT_IDENTITY_PATTERNS:
-            if re.search(pat, low):
-                bad = True
-                break
-        if not bad:
-            kept.append(ln)
+    kept = [ln for ln in t.splitlines() if ln.strip() and not _ASSISTANT_IDENTITY_RE.search(ln.lower())]
     return "\n".join(kept).strip()
 
 
@@ -43,10 +36,7 @@ def filter_retrieved_memories(items: Any) -> List[str]:
     out: List[str] = []
     for x in items:
         s = safe_text(x).strip()
-        if not s:
-            continue
-        low = s.lower()
-        if any(re.search(p, low) for p in _ASSISTANT_IDENTITY_PATTERNS):
+        if not s or _ASSISTANT_IDENTITY_RE.search(s.lower()):
             continue
         out.append(s)
     return out
@@ -206,6 +196,14 @@ def build_style_profile(state: Dict[str, Any]) -> Any:
     return ""
 
 
+def recent_messages(state: Dict[str, Any], limit: int) -> List[Any]:
+    """chat_buffer（为空时退回 messages）末尾 limit 条：list 直接切片，其它可迭代用 deque(maxlen) 单遍截尾，不拷贝整段历史。"""
+    buf = state.get("chat_buffer") or state.get("messages") or ()
+    if isinstance(buf, (list, tuple)):
+        return list(buf[-limit:])
+    return list(deque(buf, maxlen=limit))
+
+
 def get_chat_buffer_body_messages(state: Dict[str, Any], limit: int = 20):
     """Return chat_buffer as message objects for LLM body."""
     chat_buffer = state.get("chat_buffer") or []
@@ -234,7 +232,24 @@ def get_chat_buffer_body_messages_with_time_slices(state: Dict[str, Any], limit:
     return inject_time_slices_into_messages(window)
 
 
+# LangChain 消息的 type 是固定标签：常见几类直接查表，其余（ChatMessage 自定义 role、非消息对象）再做子串判断
+_USER_BY_MESSAGE_TYPE = {"human": True, "ai": False, "system": False, "tool": False}
+
+
+def is_user_message(m: Any) -> bool:
+    """是否为用户消息：type 含 human / user（大小写不敏感）。"""
+    t = getattr(m, "type", "") or ""
+    hit = _USER_BY_MESSAGE_TYPE.get(t)
+    if hit is not None:
+        return hit
+    t = t.lower()
+    return "human" in t or "user" in t
+
+
 def safe_text(x: Any) -> str:
+    # 绝大多数入参已是 str：先做精确类型判断直接返回（不做 lru_cache：入参可能是 dict 等不可哈希对象，且缓存比原样返回更慢）
+    if type(x) is str:
+        return x
     if x is None:
         return ""
     if isinstance(x, str):
@@ -1,4 +1,5 @@
 from app.services.memory.base import MemoryBase
 from app.services.memory.mock import MockMemory
+from app.services.memory.write_queue import MemoryWriteQueue, memory_write_queue
 
-__all__ = ["MemoryBase", "MockMemory"]
+__all__ = ["MemoryBase", "MockMemory", "MemoryWriteQueue", "memory_write_queue"]
@@ -0,0 +1,69 @@
+"""memory_writer 的后台落盘队列：save_turn 不阻塞图返回，同一 user/bot 的写入严格按提交顺序执行。
+
+- 每个 key（"{user_id}:{bot_id}"）维护一条任务链：新写入排在上一条之后
+- loader 在 load_state 前 drain(key)，保证读到上一轮已提交的状态
+- 在途任务超过 max_pending 时 submit 返回 False，调用方改为同步 await（背压）
+- 任务绑定创建它的事件循环；每轮 asyncio.run 的调用方不要开启后台模式，否则循环关闭时写入会被取消
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryWriteQueue:
+    def __init__(self, max_pending: int = 1024) -> None:
+        self.max_pending = max_pending
+        self._tails: Dict[str, "asyncio.Task[None]"] = {}
+        self._pending = 0
+
+    def submit(self, key: str, write: Callable[[], Awaitable[None]]) -> bool:
+        """在当前事件循环排入一次写入；队列已满返回 False（由调用方直接 await）。"""
+        if self._pending >= self.max_pending:
+            return False
+        loop = asyncio.get_running_loop()
+        prev = self._tails.get(key)
+        if prev is not None and prev.get_loop() is not loop:
+            prev = None
+
+        async def _run() -> None:
+            try:
+                if prev is not None:
+                    # 上一条失败已在其自身任务里记录，这里只保证顺序
+                    await asyncio.gather(prev, return_exceptions=True)
+                await write()
+            except Exception:
+                logger.exception("[MemoryWriteQueue] 后台写入失败 key=%s", key)
+            finally:
+                self._pending -= 1
+                if self._tails.get(key) is task:
+                    del self._tails[key]
+
+        self._pending += 1
+        task = loop.create_task(_run())
+        self._tails[key] = task
+        return True
+
+    async def drain(self, key: str) -> None:
+        """等待 key 上已提交的写入全部完成（loader 读库前调用）。"""
+        task = self._tails.get(key)
+        if task is None:
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            self._tails.pop(key, None)
+            return
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def drain_all(self) -> None:
+        """进程退出前调用，等待所有在途写入完成。"""
+        loop = asyncio.get_running_loop()
+        tasks = [t for t in self._tails.values() if t.get_loop() is loop]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 进程级实例：memory_writer 提交，loader 读前 drain
+memory_write_queue = MemoryWriteQueue()
@@ -114,7 +114,7 @@ async def run_console_chat_async(
 ):
     """控制台多轮对话（async）：用 ainvoke 跑图；所有 log 同时写入按时间命名的日志文件。"""
     import asyncio
-    from app.nodes.loader import _get_db_manager
+    from app.core.db.singleton import get_db_manager
 
     loop = asyncio.get_running_loop()
     app = build_graph()
@@ -132,7 +132,7 @@ async def run_console_chat_async(
     # - 过去这里只清 messages，但 summary/transcripts/notes 仍会被召回，导致“助手模板记忆”反复污染生成
     # - 默认清空全部记忆资产（可用环境变量关闭）
     clear_all = str(os.getenv("CONSOLE_CLEAR_ALL_MEMORY_ON_START", "1")).lower() not in ("0", "false", "no", "off")
-    db = _get_db_manager()
+    db = get_db_manager()
     if db:
         try:
             if clear_all and hasattr(db, "clear_all_memory_for"):
@@ -65,8 +65,22 @@ ANALYZER_SYSTEM_PROMPT = """
 （输出格式由系统约束。）"""
 
 
+# 静态前缀（角色 + 信号标准 rubric）只 format 一次；每轮只 format 动态上下文之后的部分。
+# 前缀逐字节稳定，provider 侧的前缀缓存（prompt caching）也能命中。
+_DYNAMIC_SECTION_MARKER = "### 2. 动态上下文"
+_static_tpl, _dynamic_tpl = ANALYZER_SYSTEM_PROMPT.split(_DYNAMIC_SECTION_MARKER, 1)
+ANALYZER_STATIC_PREFIX = _static_tpl.format(rubric=STATIC_RUBRIC)
+_ANALYZER_DYNAMIC_TEMPLATE = _DYNAMIC_SECTION_MARKER + _dynamic_tpl
+del _static_tpl, _dynamic_tpl
+
+
 def build_analyzer_prompt(state: Dict[str, Any]) -> str:
     """将 State 和 Static YAML 组装成最终 Prompt（含 summary + retrieved 记忆，不含 chat_buffer；chat_buffer 由调用方放正文）"""
+    return ANALYZER_STATIC_PREFIX + build_analyzer_dynamic_suffix(state)
+
+
+def build_analyzer_dynamic_suffix(state: Dict[str, Any]) -> str:
+    """Prompt 中随 State 变化的部分（动态上下文、记忆、任务判定）。"""
     # 优先使用 user_inferred_profile；没有则兼容 loader 的 user_profile
     user_profile = state.get("user_inferred_profile") or state.get("user_profile") or {}
     summary = state.get("conversation_summary") or ""
@@ -93,8 +107,7 @@ def build_analyzer_prompt(state: Dict[str, Any]) -> str:
         tasks_for_lats_str = "（无）"
     bot_reply_this_turn = (state.get("final_response") or state.get("draft_response") or "").strip() or "（无）"
 
-    return ANALYZER_SYSTEM_PROMPT.format(
-        rubric=STATIC_RUBRIC,
+    return _ANALYZER_DYNAMIC_TEMPLATE.format(
         current_scores=state.get("relationship_state") or {},
         current_stage=state.get("current_stage") or "experimenting",
         mood_state=state.get("mood_state") or {},
@@ -0,0 +1,139 @@
+"""
+DBManager.append_transcript_with_notes：transcript 与 notes 在同一 session / 同一事务写入，
+任一步失败整体回滚；notes 未带 source_pointer 时默认指向本条 transcript。
+
+用假的 AsyncSession 记录事务边界（Postgres 专有列类型无法落到 sqlite），只验证写入路径本身。
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.core.db.database import DBManager, DerivedNote, Transcript
+
+
+class _FakeTx:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        self.session.tx_count += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.session.committed.extend(self.session.pending)
+        else:
+            self.session.rolled_back = True
+        self.session.pending = []
+        return False
+
+
+class _FakeSession:
+    def __init__(self, fail_flush=False):
+        self.fail_flush = fail_flush
+        self.pending = []
+        self.committed = []
+        self.rolled_back = False
+        self.tx_count = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def begin(self):
+        return _FakeTx(self)
+
+    def add(self, obj):
+        self.pending.append(obj)
+
+    def add_all(self, objs):
+        self.pending.extend(objs)
+
+    async def flush(self):
+        if self.fail_flush:
+            raise RuntimeError("flush failed")
+        for obj in self.pending:
+            if getattr(obj, "id", None) is None:
+                obj.id = uuid.uuid4()
+
+
+def _make_db(session):
+    db = DBManager.__new__(DBManager)
+    db._memory_schema_ready = True
+    sessions = []
+
+    def factory():
+        sessions.append(session)
+        return session
+
+    db.Session = factory
+    return db, sessions
+
+
+def _write(db, rid, notes):
+    return asyncio.run(
+        db.append_transcript_with_notes(
+            relationship_id=rid,
+            notes=notes,
+            user_text="今天去爬山了",
+            bot_text="累不累呀",
+            session_id="s1",
+            turn_index=3,
+        )
+    )
+
+
+def test_transcript_and_notes_commit_together():
+    session = _FakeSession()
+    db, sessions = _make_db(session)
+    rid = str(uuid.uuid4())
+    notes = [
+        {"content": "用户喜欢爬山", "note_type": "preference", "importance": 0.6},
+        {"content": "  ", "note_type": "fact"},  # 空内容不写
+        {"content": "周末常出门", "type": "activity", "source_pointer": "manual:1"},
+    ]
+
+    tid, n = _write(db, rid, notes)
+
+    assert len(sessions) == 1 and session.tx_count == 1
+    assert not session.rolled_back
+    transcripts = [o for o in session.committed if isinstance(o, Transcript)]
+    derived = [o for o in session.committed if isinstance(o, DerivedNote)]
+    assert len(transcripts) == 1 and n == len(derived) == 2
+    tr = transcripts[0]
+    assert tid == str(tr.id)
+    assert str(tr.user_id) == rid and tr.session_id == "s1" and tr.turn_index == 3
+    assert all(d.transcript_id == tr.id and str(d.user_id) == rid for d in derived)
+    # 未指定 source_pointer：默认指向本条 transcript；显式值原样保留
+    assert derived[0].source_pointer == f"transcript:{tr.id}"
+    assert derived[1].source_pointer == "manual:1"
+    assert derived[1].note_type == "activity"
+
+
+def test_failure_rolls_back_transcript_and_notes():
+    session = _FakeSession(fail_flush=True)
+    db, _ = _make_db(session)
+
+    with pytest.raises(RuntimeError):
+        _write(db, str(uuid.uuid4()), [{"content": "用户喜欢爬山"}])
+
+    assert session.rolled_back
+    assert session.committed == []
+
+
+def test_invalid_relationship_id_opens_no_session():
+    session = _FakeSession()
+    db, sessions = _make_db(session)
+
+    with pytest.raises(ValueError):
+        _write(db, "not-a-uuid", [{"content": "x"}])
+
+    assert sessions == []
@@ -0,0 +1,127 @@
+"""
+MemoryWriteQueue：同 key 写入按提交顺序执行、队列满时背压、跨事件循环的残留任务不阻塞新循环。
+"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services.memory.write_queue import MemoryWriteQueue
+
+
+def test_same_key_writes_run_in_submit_order():
+    q = MemoryWriteQueue()
+    order = []
+
+    def make_write(i, delay):
+        async def write():
+            await asyncio.sleep(delay)
+            order.append(i)
+        return write
+
+    async def main():
+        # 先提交的写入更慢：仍须先完成
+        for i, delay in enumerate((0.03, 0.01, 0.0)):
+            assert q.submit("u:b", make_write(i, delay))
+        await q.drain("u:b")
+
+    asyncio.run(main())
+    assert order == [0, 1, 2]
+    assert q._pending == 0
+    assert "u:b" not in q._tails
+
+
+def test_failed_write_does_not_block_next():
+    q = MemoryWriteQueue()
+    done = []
+
+    async def bad():
+        raise RuntimeError("boom")
+
+    async def good():
+        done.append(True)
+
+    async def main():
+        q.submit("k", bad)
+        q.submit("k", good)
+        await q.drain("k")
+
+    asyncio.run(main())
+    assert done == [True]
+    assert q._pending == 0
+
+
+def test_submit_returns_false_when_full():
+    q = MemoryWriteQueue(max_pending=1)
+    ran = []
+
+    async def write():
+        ran.append(1)
+
+    async def main():
+        assert q.submit("a", write) is True
+        # 在途已达上限：调用方应改为同步 await
+        assert q.submit("b", write) is False
+        await q.drain_all()
+        assert q.submit("b", write) is True
+        await q.drain_all()
+
+    asyncio.run(main())
+    assert ran == [1, 1]
+    assert q._pending == 0
+
+
+def _stuck_tail_on_other_loop(q):
+    """在另一个事件循环上留下一个永不完成的写入，返回 (loop, task)。"""
+    loop = asyncio.new_event_loop()
+
+    async def stuck():
+        await asyncio.Event().wait()
+
+    async def submit_stuck():
+        q.submit("k", stuck)
+
+    loop.run_until_complete(submit_stuck())
+    return loop, q._tails["k"]
+
+
+def _close(loop, task):
+    task.cancel()
+    loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+    loop.close()
+
+
+def test_drain_drops_tail_from_other_loop():
+    q = MemoryWriteQueue()
+    old_loop, old_task = _stuck_tail_on_other_loop(q)
+
+    async def main():
+        # 上一个循环遗留的任务：drain 直接丢弃，不跨循环等待
+        await asyncio.wait_for(q.drain("k"), timeout=1)
+
+    try:
+        asyncio.run(main())
+        assert "k" not in q._tails
+    finally:
+        _close(old_loop, old_task)
+
+
+def test_submit_does_not_chain_on_tail_from_other_loop():
+    q = MemoryWriteQueue()
+    old_loop, old_task = _stuck_tail_on_other_loop(q)
+    ran = []
+
+    async def write():
+        ran.append(1)
+
+    async def main():
+        assert q.submit("k", write)
+        await asyncio.wait_for(q.drain("k"), timeout=1)
+
+    try:
+        asyncio.run(main())
+        assert ran == [1]
+    finally:
+        _close(old_loop, old_task)
@@ -0,0 +1,69 @@
+"""
+memory_writer 只把 _PERSISTED_KEYS 里的字段交给 save_turn：
+校验 DBManager.save_turn / LocalStoreManager.save_turn 读取的 state key 都在白名单内，
+避免 save_turn 新增读取字段后被 memory_writer 静默丢掉。
+
+用 AST 静态提取（不 import 模块本身，免去 DB / langchain 依赖）。
+"""
+import ast
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse(rel_path):
+    with open(os.path.join(ROOT, rel_path), encoding="utf-8") as f:
+        return ast.parse(f.read())
+
+
+def _persisted_keys():
+    tree = _parse("app/nodes/memory/memory_writer.py")
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "_PERSISTED_KEYS" for t in node.targets
+        ):
+            return set(ast.literal_eval(node.value))
+    raise AssertionError("_PERSISTED_KEYS not found")
+
+
+def _save_turn_state_keys(rel_path, class_name):
+    """save_turn 中 state.get("x") / state["x"] 读取的全部字面量 key。"""
+    tree = _parse(rel_path)
+    for cls in ast.walk(tree):
+        if not (isinstance(cls, ast.ClassDef) and cls.name == class_name):
+            continue
+        for fn in cls.body:
+            if not (isinstance(fn, (ast.FunctionDef, ast.AsyncFunctionDef)) and fn.name == "save_turn"):
+                continue
+            keys = set()
+            for n in ast.walk(fn):
+                if (
+                    isinstance(n, ast.Call)
+                    and isinstance(n.func, ast.Attribute)
+                    and isinstance(n.func.value, ast.Name)
+                    and n.func.value.id == "state"
+                    and n.args
+                    and isinstance(n.args[0], ast.Constant)
+                ):
+                    keys.add(n.args[0].value)
+                elif (
+                    isinstance(n, ast.Subscript)
+                    and isinstance(n.value, ast.Name)
+                    and n.value.id == "state"
+                    and isinstance(n.slice, ast.Constant)
+                ):
+                    keys.add(n.slice.value)
+            return keys
+    raise AssertionError(f"{class_name}.save_turn not found in {rel_path}")
+
+
+def test_db_save_turn_keys_are_persisted():
+    keys = _save_turn_state_keys("app/core/db/database.py", "DBManager")
+    assert keys, "no state reads found in DBManager.save_turn"
+    assert keys <= _persisted_keys(), sorted(keys - _persisted_keys())
+
+
+def test_local_store_save_turn_keys_are_persisted():
+    keys = _save_turn_state_keys("app/core/db/local_store.py", "LocalStoreManager")
+    assert keys, "no state reads found in LocalStoreManager.save_turn"
+    assert keys <= _persisted_keys(), sorted(keys - _persisted_keys())
@@ -0,0 +1,73 @@
+"""
+stage_manager._compile_condition：conditional_drop 条件串编译后的比较语义
+（两侧 clamp 到 0-1、== / != 带 0.01 容差、无法识别的条件恒 False）。
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.nodes.relation.stage_manager import KnappStageManager, _compile_condition, _never
+
+
+@pytest.mark.parametrize(
+    "condition, closeness, expected",
+    [
+        ("closeness > 0.7", 0.71, True),
+        ("closeness > 0.7", 0.7, False),
+        ("closeness >= 0.7", 0.7, True),
+        ("closeness >= 0.7", 0.69, False),
+        ("closeness < 0.3", 0.29, True),
+        ("closeness < 0.3", 0.3, False),
+        ("closeness <= 0.3", 0.3, True),
+        ("closeness <= 0.3", 0.31, False),
+        ("closeness>0.5", 0.6, True),  # 无空格
+    ],
+)
+def test_ordering_operators(condition, closeness, expected):
+    assert _compile_condition(condition)(closeness) is expected
+
+
+@pytest.mark.parametrize(
+    "closeness, eq_expected",
+    [
+        (0.5, True),
+        (0.509, True),
+        (0.491, True),
+        (0.511, False),
+        (0.489, False),
+    ],
+)
+def test_equality_uses_tolerance(closeness, eq_expected):
+    assert _compile_condition("closeness == 0.5")(closeness) is eq_expected
+    assert _compile_condition("closeness != 0.5")(closeness) is (not eq_expected)
+
+
+def test_both_sides_are_clamped():
+    # 阈值 1.5 clamp 为 1.0；closeness 1.2 clamp 为 1.0
+    assert _compile_condition("closeness >= 1.5")(1.2) is True
+    assert _compile_condition("closeness > 1.5")(1.2) is False
+    # closeness -0.3 clamp 为 0.0
+    assert _compile_condition("closeness <= -2")(-0.3) is True
+    assert _compile_condition("closeness == 0")(-0.3) is True
+
+
+@pytest.mark.parametrize(
+    "condition",
+    ["", "   ", "closeness", "trust > 0.5", "closeness > abc", "closeness ~ 0.5", None],
+)
+def test_unparseable_condition_is_never(condition):
+    fn = _compile_condition(condition)
+    assert fn is _never
+    assert fn(0.0) is False and fn(1.0) is False
+
+
+def test_stage_rules_carry_compiled_condition():
+    manager = KnappStageManager()
+    bonding = manager._rules["bonding"]
+    assert bonding.has_conditional_drop
+    assert bonding.drop_check is _compile_condition(bonding.drop_condition)
+    assert manager._rules["initiating"].drop_check is _never
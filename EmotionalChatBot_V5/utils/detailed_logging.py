@@ -23,6 +23,11 @@ def _truncate_limit_params() -> int:
     return 500_000 if _full_logs() else 200
 
 
+def _emit_block(lines: List[str]) -> None:
+    """整块拼好后一次写出：逐行 print 每行都要经过 sys.stdout（main / web_app 可能换成 tee / 文件 writer）"""
+    print("\n".join(lines))
+
+
 def log_prompt_and_params(
     node_name: str,
     system_prompt: Optional[str] = None,
@@ -32,24 +37,26 @@ def log_prompt_and_params(
     prefix: str = "",
 ):
     """记录提示词和参数"""
+    out: List[str] = []
+    emit = out.append
     indent = "  "
-    print(f"{prefix}[{node_name}] ========== 提示词与参数 ==========")
+    emit(f"{prefix}[{node_name}] ========== 提示词与参数 ==========")
     
     if system_prompt:
-        print(f"{prefix}{indent}【System Prompt】")
-        print(f"{prefix}{indent}{'=' * 60}")
-        print(f"{prefix}{indent}{system_prompt}")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【System Prompt】")
+        emit(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}{system_prompt}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
     if user_prompt:
-        print(f"{prefix}{indent}【User Prompt / Task】")
-        print(f"{prefix}{indent}{'=' * 60}")
-        print(f"{prefix}{indent}{user_prompt}")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【User Prompt / Task】")
+        emit(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}{user_prompt}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
     if messages:
-        print(f"{prefix}{indent}【Messages (Body)】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【Messages (Body)】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         limit = _truncate_limit()
         for i, msg in enumerate(messages):
             msg_type = getattr(msg, "type", type(msg).__name__)
@@ -58,12 +65,12 @@ def log_prompt_and_params(
                 content_preview = content[:limit] + f"\n{indent}... (截断，总长度: {len(content)} 字符)"
             else:
                 content_preview = content
-            print(f"{prefix}{indent}[{i+1}] {msg_type}: {content_preview}")
-        print(f"{prefix}{indent}{'=' * 60}")
+            emit(f"{prefix}{indent}[{i+1}] {msg_type}: {content_preview}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
     if params:
-        print(f"{prefix}{indent}【输入参数】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【输入参数】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         limit = _truncate_limit_params()
         for key, value in params.items():
             if isinstance(value, (dict, list)):
@@ -77,10 +84,11 @@ def log_prompt_and_params(
                 value_str = str(value)
                 if len(value_str) > limit:
                     value_str = value_str[:limit] + "... (截断)"
-            print(f"{prefix}{indent}  {key}: {value_str}")
-        print(f"{prefix}{indent}{'=' * 60}")
+            emit(f"{prefix}{indent}  {key}: {value_str}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
-    print(f"{prefix}[{node_name}] ==========================================")
+    emit(f"{prefix}[{node_name}] ==========================================")
+    _emit_block(out)
 
 
 def log_llm_response(
@@ -90,44 +98,47 @@ def log_llm_response(
     prefix: str = "",
 ):
     """记录 LLM 响应"""
+    out: List[str] = []
+    emit = out.append
     indent = "  "
-    print(f"{prefix}[{node_name}] ========== LLM 响应 ==========")
+    emit(f"{prefix}[{node_name}] ========== LLM 响应 ==========")
     
     raw_content = getattr(raw_response, "content", str(raw_response))
     limit = _truncate_limit_response()
-    print(f"{prefix}{indent}【原始响应 (Raw)】")
-    print(f"{prefix}{indent}{'=' * 60}")
+    emit(f"{prefix}{indent}【原始响应 (Raw)】")
+    emit(f"{prefix}{indent}{'=' * 60}")
     if len(raw_content) > limit:
-        print(f"{prefix}{indent}{raw_content[:limit]}")
-        print(f"{prefix}{indent}... (截断，总长度: {len(raw_content)} 字符)")
+        emit(f"{prefix}{indent}{raw_content[:limit]}")
+        emit(f"{prefix}{indent}... (截断，总长度: {len(raw_content)} 字符)")
     else:
-        print(f"{prefix}{indent}{raw_content}")
-    print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}{raw_content}")
+    emit(f"{prefix}{indent}{'=' * 60}")
     
     if parsed_result is not None:
-        print(f"{prefix}{indent}【解析结果 (Parsed)】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【解析结果 (Parsed)】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         try:
             if isinstance(parsed_result, (dict, list)):
                 result_str = json.dumps(parsed_result, ensure_ascii=False, indent=2)
                 if len(result_str) > limit:
-                    print(f"{prefix}{indent}{result_str[:limit]}")
-                    print(f"{prefix}{indent}... (截断，总长度: {len(result_str)} 字符)")
+                    emit(f"{prefix}{indent}{result_str[:limit]}")
+                    emit(f"{prefix}{indent}... (截断，总长度: {len(result_str)} 字符)")
                 else:
-                    print(f"{prefix}{indent}{result_str}")
+                    emit(f"{prefix}{indent}{result_str}")
             else:
                 result_str = str(parsed_result)
                 if len(result_str) > limit:
-                    print(f"{prefix}{indent}{result_str[:limit]}")
-                    print(f"{prefix}{indent}... (截断)")
+                    emit(f"{prefix}{indent}{result_str[:limit]}")
+                    emit(f"{prefix}{indent}... (截断)")
                 else:
-                    print(f"{prefix}{indent}{result_str}")
+                    emit(f"{prefix}{indent}{result_str}")
         except Exception as e:
-            print(f"{prefix}{indent}[解析失败] {e}")
-            print(f"{prefix}{indent}{str(parsed_result)[:limit]}")
-        print(f"{prefix}{indent}{'=' * 60}")
+            emit(f"{prefix}{indent}[解析失败] {e}")
+            emit(f"{prefix}{indent}{str(parsed_result)[:limit]}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
-    print(f"{prefix}[{node_name}] ==========================================")
+    emit(f"{prefix}[{node_name}] ==========================================")
+    _emit_block(out)
 
 
 def log_computation(
@@ -139,36 +150,39 @@ def log_computation(
     prefix: str = "",
 ):
     """记录计算过程"""
+    out: List[str] = []
+    emit = out.append
     indent = "  "
-    print(f"{prefix}[{node_name}] ========== 计算过程: {step_name} ==========")
+    emit(f"{prefix}[{node_name}] ========== 计算过程: {step_name} ==========")
     
     if inputs:
-        print(f"{prefix}{indent}【输入】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【输入】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         for key, value in inputs.items():
             value_str = _format_value(value)
-            print(f"{prefix}{indent}  {key}: {value_str}")
-        print(f"{prefix}{indent}{'=' * 60}")
+            emit(f"{prefix}{indent}  {key}: {value_str}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
     if intermediate_steps:
-        print(f"{prefix}{indent}【中间步骤】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【中间步骤】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         for i, step in enumerate(intermediate_steps):
-            print(f"{prefix}{indent}步骤 {i+1}:")
+            emit(f"{prefix}{indent}步骤 {i+1}:")
             for key, value in step.items():
                 value_str = _format_value(value)
-                print(f"{prefix}{indent}    {key}: {value_str}")
-        print(f"{prefix}{indent}{'=' * 60}")
+                emit(f"{prefix}{indent}    {key}: {value_str}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
     if outputs:
-        print(f"{prefix}{indent}【输出】")
-        print(f"{prefix}{indent}{'=' * 60}")
+        emit(f"{prefix}{indent}【输出】")
+        emit(f"{prefix}{indent}{'=' * 60}")
         for key, value in outputs.items():
             value_str = _format_value(value)
-            print(f"{prefix}{indent}  {key}: {value_str}")
-        print(f"{prefix}{indent}{'=' * 60}")
+            emit(f"{prefix}{indent}  {key}: {value_str}")
+        emit(f"{prefix}{indent}{'=' * 60}")
     
-    print(f"{prefix}[{node_name}] ==========================================")
+    emit(f"{prefix}[{node_name}] ==========================================")
+    _emit_block(out)
 
 
 def _format_value(value: Any, max_length: Optional[int] = None) -> str:
@@ -28,16 +28,20 @@ _INTERNAL_LEAK_PATTERNS: List[re.Pattern] = [
     re.compile(r"\[Evaluator\b|\[LATS\b|\[ReplyPlanner\b", re.IGNORECASE),
 ]
 
+# 合并为单条交替式：干净文本（绝大多数情况）只扫一遍即可放行，命中后再逐条收集 reasons
+_INTERNAL_LEAK_ANY: re.Pattern = re.compile(
+    "|".join(f"(?:{p.pattern})" for p in _INTERNAL_LEAK_PATTERNS), re.IGNORECASE
+)
+
 
 def detect_internal_leak(text: str) -> Tuple[bool, List[str]]:
     """
     Returns: (is_leak, reasons)
     """
     s = str(text or "")
-    reasons: List[str] = []
-    for pat in _INTERNAL_LEAK_PATTERNS:
-        if pat.search(s):
-            reasons.append(pat.pattern)
+    if not _INTERNAL_LEAK_ANY.search(s):
+        return False, []
+    reasons = [pat.pattern for pat in _INTERNAL_LEAK_PATTERNS if pat.search(s)]
     return (len(reasons) > 0), reasons
 
 
@@ -5,6 +5,28 @@ import json
 import re
 from typing import Any, Dict, List, Optional
 
+try:  # orjson 为 langsmith 的依赖，通常已安装；缺失时退回标准库
+    import orjson as _orjson
+except ImportError:  # pragma: no cover
+    _orjson = None
+
+_TRAILING_COMMA_OBJ = re.compile(r",\s*}")
+_TRAILING_COMMA_ARR = re.compile(r",\s*]")
+_CODE_BLOCK_PATTERNS = (
+    re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```"),
+    re.compile(r"```\s*([\s\S]*?)\s*```"),
+)
+
+
+def _loads(s: str) -> Any:
+    """优先 orjson；orjson 更严格（如 NaN、超 64 位整数）解析失败时再交给 json 兜底。"""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(s)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
 
 def _normalize_parsed(obj: Any) -> Optional[Dict[str, Any]]:
     """
@@ -31,19 +53,20 @@ def _fix_smart_quotes(s: str) -> str:
 def _try_parse_one(s: str) -> Optional[Dict[str, Any]]:
     """对单段字符串尝试解析为 JSON 并规范为 Dict；支持去除尾部逗号、智能引号修复后重试。"""
     s = s.strip()
-    if not s:
+    # _normalize_parsed 只接受对象 / 数组：开头不是 { 或 [（代码块围栏、前置杂文）时三轮解析必然失败，直接跳过
+    if not s or s[0] not in "{[":
         return None
     # 1. 直接解析
     try:
-        obj = json.loads(s)
+        obj = _loads(s)
         return _normalize_parsed(obj)
     except json.JSONDecodeError:
         pass
     # 2. 去除尾部逗号后重试（LLM 常犯）
-    s2 = re.sub(r",\s*}", "}", s)
-    s2 = re.sub(r",\s*]", "]", s2)
+    s2 = _TRAILING_COMMA_OBJ.sub("}", s)
+    s2 = _TRAILING_COMMA_ARR.sub("]", s2)
     try:
-        obj = json.loads(s2)
+        obj = _loads(s2)
         return _normalize_parsed(obj)
     except json.JSONDecodeError:
         pass
@@ -51,7 +74,7 @@ def _try_parse_one(s: str) -> Optional[Dict[str, Any]]:
     s3 = _fix_smart_quotes(s2)
     if s3 != s2:
         try:
-            obj = json.loads(s3)
+            obj = _loads(s3)
             return _normalize_parsed(obj)
         except json.JSONDecodeError:
             pass
@@ -82,11 +105,8 @@ def parse_json_from_llm(text: str) -> Optional[Dict[str, Any]]:
         return out
 
     # 2. 从 markdown 代码块提取（非贪婪，取第一个完整块）
-    for pattern in (
-        r"```(?:json)?\s*([\s\S]*?)\s*```",
-        r"```\s*([\s\S]*?)\s*```",
-    ):
-        m = re.search(pattern, raw)
+    for pattern in _CODE_BLOCK_PATTERNS:
+        m = pattern.search(raw)
         if m:
             out = _try_parse_one(m.group(1))
             if out is not None:
@@ -5,6 +5,7 @@ Prompt Helper Functions
 含 6 维关系属性的详细数值说明加载与 LLM 提示词格式化。
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -190,8 +191,12 @@ def format_stage_for_llm(stage_id: str, include_judge_hints: bool = True) -> str
     return _format_stage_impl(stage_id, include_judge_hints=include_judge_hints)
 
 
+@lru_cache(maxsize=64)
 def _format_stage_impl(stage_id: str, include_judge_hints: bool) -> str:
-    """内部实现：act 块为怎么演（role / stage_goal / system_prompt）；可选追加 judge.content_coding_criteria 为怎么判。"""
+    """
+    内部实现：act 块为怎么演（role / stage_goal / system_prompt）；可选追加 judge.content_coding_criteria 为怎么判。
+    结果只取决于 (stage_id, include_judge_hints) 与 stages.yaml：按进程缓存，避免 safety / detection / 独白等节点每轮重新解析 YAML。
+    """
     if load_stage_by_id is None:
         return f"阶段ID: {stage_id}"
 
@@ -55,6 +55,10 @@ _INJECTION_PATTERNS = [
     r"运行.*代码",
     r"run.*code",
 ]
+# 模块加载时编译一次；每轮 safety 规则层都会调用，避免逐次走 re 模块缓存
+_INJECTION_RES = [(p, re.compile(p, re.IGNORECASE)) for p in _INJECTION_PATTERNS]
+# 所有注入模式合成一条交替式：绝大多数正常输入一次扫描即可判定"无命中"
+_INJECTION_ANY = re.compile("|".join(f"(?:{p})" for p in _INJECTION_PATTERNS), re.IGNORECASE)
 
 
 def sanitize_user_input(text: str, *, max_length: int = 2000, log_suspicious: bool = True) -> str:
@@ -82,12 +86,13 @@ def sanitize_user_input(text: str, *, max_length: int = 2000, log_suspicious: bo
     
     # 2. 检测注入尝试
     detected_patterns = []
-    for pattern in _INJECTION_PATTERNS:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            detected_patterns.append(pattern)
-            # 替换为占位符（保留上下文但移除指令）
-            text = text[:match.start()] + "[已过滤]" + text[match.end():]
+    if _INJECTION_ANY.search(text):
+        for pattern, pattern_re in _INJECTION_RES:
+            # 替换为占位符（保留上下文但移除指令）；subn 一次完成查找+替换，
+            # 不再在 finditer 过程中改写 text（原写法在多次命中时偏移会错位）
+            text, n = pattern_re.subn("[已过滤]", text)
+            if n:
+                detected_patterns.extend([pattern] * n)
     
     # 3. 记录可疑输入
     if detected_patterns and log_suspicious:
@@ -141,6 +146,17 @@ def build_safe_user_input_prompt(
     return prompt
 
 
+_STATE_CONTROL_RES = [
+    (p, re.compile(p, re.IGNORECASE))
+    for p in (
+        r"(closeness|trust|liking|respect|attractiveness|power)\s*[=:]\s*[\d.]+",
+        r"(stage|mode)\s*[=:]\s*\w+",
+        r"设置.*(closeness|trust|liking|stage|mode)",
+        r"set.*(closeness|trust|liking|stage|mode)",
+    )
+]
+
+
 def validate_state_transition(
     current_state: Dict[str, Any],
     proposed_state: Dict[str, Any],
@@ -158,15 +174,8 @@ def validate_state_transition(
         (is_valid, reason)
     """
     # 1. 检查用户输入是否包含状态操控指令
-    state_control_patterns = [
-        r"(closeness|trust|liking|respect|attractiveness|power)\s*[=:]\s*[\d.]+",
-        r"(stage|mode)\s*[=:]\s*\w+",
-        r"设置.*(closeness|trust|liking|stage|mode)",
-        r"set.*(closeness|trust|liking|stage|mode)",
-    ]
-    
-    for pattern in state_control_patterns:
-        if re.search(pattern, user_input, re.IGNORECASE):
+    for pattern, pattern_re in _STATE_CONTROL_RES:
+        if pattern_re.search(user_input):
             return False, f"用户输入包含状态操控指令: {pattern}"
     
     # 2. 检查 stage 变更是否过快
@@ -204,6 +213,19 @@ def validate_state_transition(
     return True, ""
 
 
+_SYSTEM_INFO_RES = [
+    (p, re.compile(p, re.IGNORECASE))
+    for p in (
+        r"OPENAI_API_KEY",
+        r"DATABASE_URL",
+        r"SECRET",
+        r"PASSWORD",
+        r"系统提示词",
+        r"system prompt",
+    )
+]
+
+
 def validate_llm_output(
     output: Any,
     user_input: str,
@@ -240,17 +262,8 @@ def validate_llm_output(
             return False, f"输出可能被用户操控: 包含 '{keyword}'"
     
     # 检查输出是否包含明显的系统信息泄露
-    system_info_patterns = [
-        r"OPENAI_API_KEY",
-        r"DATABASE_URL",
-        r"SECRET",
-        r"PASSWORD",
-        r"系统提示词",
-        r"system prompt",
-    ]
-    
-    for pattern in system_info_patterns:
-        if re.search(pattern, output_str, re.IGNORECASE):
+    for pattern, pattern_re in _SYSTEM_INFO_RES:
+        if pattern_re.search(output_str):
             return False, f"输出包含可能的系统信息泄露: {pattern}"
     
     return True, ""
@@ -278,10 +291,9 @@ def detect_injection_attempt(text: str) -> Tuple[bool, list[str]]:
     Returns:
         (is_injection, detected_patterns)
     """
-    detected = []
-    for pattern in _INJECTION_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            detected.append(pattern)
+    if not _INJECTION_ANY.search(text):
+        return False, []
+    detected = [pattern for pattern, pattern_re in _INJECTION_RES if pattern_re.search(text)]
     
     return len(detected) > 0, detected
 
@@ -317,6 +329,16 @@ _MANIPULATION_PATTERNS = {
         r"按照.*方式",
     ],
 }
+# 每个类别只需 bool：类别内模式合成一条交替式，一次 search 代替逐条扫描
+_MANIPULATION_RES = {
+    category: re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+    for category, patterns in _MANIPULATION_PATTERNS.items()
+}
+# 只需「是否命中任一类别」时用的合并正则（safety 规则层）
+_MANIPULATION_ANY = re.compile(
+    "|".join(f"(?:{p})" for patterns in _MANIPULATION_PATTERNS.values() for p in patterns),
+    re.IGNORECASE,
+)
 
 
 def detect_manipulation_attempts(text: str) -> Dict[str, bool]:
@@ -339,16 +361,17 @@ def detect_manipulation_attempts(text: str) -> Dict[str, bool]:
     text_lower = text.lower()
     
     return {
-        "style_mimicry": any(
-            re.search(p, text_lower, re.IGNORECASE) 
-            for p in _MANIPULATION_PATTERNS["style_mimicry"]
-        ),
-        "personality_change": any(
-            re.search(p, text_lower, re.IGNORECASE) 
-            for p in _MANIPULATION_PATTERNS["personality_change"]
-        ),
-        "behavior_control": any(
-            re.search(p, text_lower, re.IGNORECASE) 
-            for p in _MANIPULATION_PATTERNS["behavior_control"]
-        ),
+        category: category_re.search(text_lower) is not None
+        for category, category_re in _MANIPULATION_RES.items()
     }
+
+
+def is_manipulation_or_injection(text: str) -> bool:
+    """
+    规则层快速判定：是否命中任一操控类别或注入模式。
+    等价于 any(detect_manipulation_attempts(text).values()) or detect_injection_attempt(text)[0]，
+    但各只做一次合并正则扫描，不构造类别字典与命中列表。
+    """
+    if not text:
+        return False
+    return _MANIPULATION_ANY.search(text.lower()) is not None or _INJECTION_ANY.search(text) is not None
@@ -12,6 +12,9 @@ How to use:
 
 Notes:
 - Even if LANGCHAIN_TRACING_V2 is true, we can still force-disable tracing via this flag.
+- If the flag is unset, nodes are only wrapped when LangSmith's own tracing env
+  (LANGSMITH_TRACING / LANGCHAIN_TRACING_V2) is on when the graph is built; otherwise
+  the node function is returned as-is (no per-call traceable overhead).
 """
 
 from __future__ import annotations
@@ -40,6 +43,14 @@ def is_langsmith_enabled(default: bool = True) -> bool:
     return _truthy(raw)
 
 
+_LANGSMITH_TRACING_ENV = ("LANGSMITH_TRACING", "LANGSMITH_TRACING_V2", "LANGCHAIN_TRACING_V2", "LANGCHAIN_TRACING")
+
+
+def _langsmith_env_tracing() -> bool:
+    """LangSmith SDK's own switch: traceable only records runs when one of these is truthy."""
+    return any(_truthy(os.getenv(k)) for k in _LANGSMITH_TRACING_ENV)
+
+
 def trace_if_enabled(
     *,
     name: str,
@@ -51,12 +62,13 @@ def trace_if_enabled(
     A decorator factory.
     - If tracing disabled -> returns identity decorator.
     - If tracing enabled  -> returns langsmith.traceable(...) decorator.
+    Decided once per decoration (node creation), never per call.
     """
 
     def _identity(fn: Callable[..., Any]) -> Callable[..., Any]:
         return fn
 
-    if not is_langsmith_enabled(default=True):
+    if not is_langsmith_enabled(default=_langsmith_env_tracing()):
         return _identity
 
     try:
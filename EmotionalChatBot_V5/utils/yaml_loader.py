@@ -1,5 +1,6 @@
 """配置文件读取工具"""
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -131,20 +132,37 @@ def load_momentum_formula_config(config_path: Union[str, Path, None] = None) ->
         return defaults
 
 
+def _strategies_path(config_path: Union[str, Path, None] = None) -> Path:
+    if config_path is None:
+        return get_project_root() / "config" / "strategies.yaml"
+    return Path(config_path)
+
+
 def load_strategies(config_path: Union[str, Path, None] = None) -> List[Dict[str, Any]]:
     """加载拟人化策略矩阵（config/strategies.yaml），返回策略列表。"""
-    if config_path is None:
-        root = get_project_root()
-        config_path = root / "config" / "strategies.yaml"
-    else:
-        config_path = Path(config_path)
-    data = load_yaml(config_path)
+    data = load_yaml(_strategies_path(config_path))
     strategies = data.get("strategies")
     if not isinstance(strategies, list):
         return []
     return strategies
 
 
+@lru_cache(maxsize=4)
+def _load_strategies_at(path: str, mtime: float) -> List[Dict[str, Any]]:
+    return load_strategies(path)
+
+
+def strategies_mtime(config_path: Union[str, Path, None] = None) -> float:
+    """strategies.yaml 的修改时间：调用方缓存由策略派生的内容时用作版本 key，文件修改后自动失效。"""
+    return os.path.getmtime(_strategies_path(config_path))
+
+
+def load_strategies_cached(config_path: Union[str, Path, None] = None) -> List[Dict[str, Any]]:
+    """同 load_strategies，但按 (path, mtime) 缓存解析结果；文件修改后下次调用重新加载。返回值共享，只读使用。"""
+    path = _strategies_path(config_path)
+    return _load_strategies_at(str(path), os.path.getmtime(path))
+
+
 def get_strategy_by_id(strategy_id: str, strategies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """根据 id 从策略列表中取出对应策略；strategies 为 None 时自动加载。"""
     if strategies is None:
@@ -174,14 +192,16 @@ def load_content_moves(config_path: Union[str, Path, None] = None) -> List[Dict[
         return []
 
 
+def _content_moves_path(config_path: Union[str, Path, None] = None) -> Path:
+    if config_path is None:
+        return get_project_root() / "config" / "content_moves.yaml"
+    return Path(config_path)
+
+
 def load_pure_content_transformations(config_path: Union[str, Path, None] = None) -> List[Dict[str, Any]]:
     """加载 config/content_moves.yaml 中的 moves，供 inner_monologue 选当轮可执行的 content move。
     返回列表，每项含 id, name, content_operation（兼容旧字段名）。"""
-    if config_path is None:
-        root = get_project_root()
-        config_path = root / "config" / "content_moves.yaml"
-    else:
-        config_path = Path(config_path)
+    config_path = _content_moves_path(config_path)
     if not config_path.exists():
         return []
     try:
@@ -211,6 +231,29 @@ def load_pure_content_transformations(config_path: Union[str, Path, None] = None
     except Exception:
         return []
 
+# (path, mtime) -> moves；只保留非空结果，缺文件 / 解析失败时下次调用重试
+_PURE_CONTENT_TRANSFORMATIONS_CACHE: Dict[Tuple[str, float], List[Dict[str, Any]]] = {}
+
+
+def load_pure_content_transformations_cached(config_path: Union[str, Path, None] = None) -> List[Dict[str, Any]]:
+    """同 load_pure_content_transformations，但按 (path, mtime) 缓存：extract / generate 共用同一版 move 表，
+    文件修改后下次调用重新加载。空结果不缓存。返回值共享，只读使用。"""
+    path = _content_moves_path(config_path)
+    try:
+        key = (str(path), os.path.getmtime(path))
+    except OSError:
+        return []
+    hit = _PURE_CONTENT_TRANSFORMATIONS_CACHE.get(key)
+    if hit is not None:
+        return hit
+    moves = load_pure_content_transformations(path)
+    if moves:
+        # 只保留最新版本（文件每改一次换一个 key）
+        _PURE_CONTENT_TRANSFORMATIONS_CACHE.clear()
+        _PURE_CONTENT_TRANSFORMATIONS_CACHE[key] = moves
+    return moves
+
+
 def get_content_move_for_best_id(
     best_id: int,
     config_path: Union[str, Path, None] = None,
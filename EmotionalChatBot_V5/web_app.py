@@ -16,6 +16,7 @@ import html
 import zipfile
 from typing import Any, Optional
 import uuid
+from contextlib import asynccontextmanager
 
 # 加载 .env（若存在）
 root = Path(__file__).resolve().parent
@@ -44,7 +45,9 @@ from app.core import (
     generate_bot_profile,
     get_random_relationship_template,
 )
+from app.core.db.singleton import get_db_manager as get_shared_db_manager
 from app.services.llm import LLMAPIError
+from app.services.memory import memory_write_queue
 from app.web.session import (
     create_session,
     get_session,
@@ -58,8 +61,15 @@ from sqlalchemy import text
 from utils.yaml_loader import get_project_root
 import sys
 
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    yield
+    # MEMORY_WRITER_ASYNC=1 时 save_turn 在后台队列：退出 / reload 前等在途写入落盘，避免丢轮次
+    await memory_write_queue.drain_all()
+
+
 # 初始化 FastAPI 应用
-app = FastAPI(title="EmotionalChatBot Web", version="5.0")
+app = FastAPI(title="EmotionalChatBot Web", version="5.0", lifespan=_lifespan)
 
 # 日志文件管理
 _log_files: dict[str, tuple] = {}  # {session_id: (file_handle, path)}
@@ -363,7 +373,6 @@ class PushSubscribeRequest(BaseModel):
 _graph = None
 _graph_fast = None
 _graph_tail = None
-_db_manager = None
 
 
 def get_graph():
@@ -394,14 +403,12 @@ def get_graph_tail():
     return _graph_tail
 
 
-def get_db_manager():
-    """懒加载 DBManager"""
-    global _db_manager
-    if _db_manager is None:
-        if not os.getenv("DATABASE_URL"):
-            raise RuntimeError("DATABASE_URL 未设置")
-        _db_manager = DBManager.from_env()
-    return _db_manager
+def get_db_manager() -> DBManager:
+    """进程级 DBManager：与图内节点共用 app.core.db.singleton 的同一个引擎与连接池。"""
+    db = get_shared_db_manager()
+    if db is None:
+        raise RuntimeError("DATABASE_URL 未设置或 DBManager 初始化失败")
+    return db
 
 
 def _get_vapid_keys() -> tuple[str, str, str]: